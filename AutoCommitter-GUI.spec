@@ -1,8 +1,20 @@
 # -*- mode: python ; coding: utf-8 -*-
+# Startup-optimized build: python build_exe.py (or pyinstaller AutoCommitter-GUI.spec)
+#
+# onedir instead of onefile: a onefile exe unpacks the whole bundle to a temp
+# directory on every launch; a onedir build starts straight from dist/.
+# UPX is off because decompressing the DLLs costs more at startup than it saves.
+
+# Never used by the GUI, its headless mode or the daemon it can serve
+EXCLUDES = [
+    'asyncio', 'async_scheduler', 'schedule', 'multi_repo', 'multiprocessing', 'concurrent',
+    'unittest', 'doctest', 'pydoc', 'pdb', 'test', 'tkinter.test', 'lib2to3', 'idlelib',
+    'turtle', 'turtledemo', 'curses', 'sqlite3', 'xmlrpc', 'distutils', 'setuptools', 'pip',
+]
 
 
 a = Analysis(
-    ['C:\\Users\\user\\OneDrive\\Desktop\\Projects\\github-scipt\\auto-commiter\\auto_committer_gui.py'],
+    ['auto_committer_gui.py'],
     pathex=[],
     binaries=[],
     datas=[],
@@ -10,25 +22,22 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=EXCLUDES,
     noarchive=False,
-    optimize=0,
+    optimize=1,
 )
 pyz = PYZ(a.pure)
 
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='AutoCommitter-GUI',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
+    upx=False,
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -36,3 +45,13 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='AutoCommitter-GUI',
+)
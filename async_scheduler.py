@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Asyncio scheduler for the auto-committer
+Sleeps until the next due time of one or more cron schedules and runs each
+cycle as an asyncio subprocess, so a long cycle never blocks the scheduler.
+"""
+
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+OVERLAP_POLICIES = ('skip', 'queue', 'concurrent')
+
+# Longest single sleep; the due time is recomputed afterwards so clock jumps are caught
+MAX_SLEEP = 3600
+# How long running cycles get to finish after a shutdown signal
+SHUTDOWN_GRACE = 30
+
+# Cycles get their own session (process group on Windows), so a Ctrl+C in the
+# terminal reaches only the scheduler and the cycles can finish in the grace period
+if sys.platform == 'win32':
+    CHILD_OPTIONS = {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+else:
+    CHILD_OPTIONS = {'start_new_session': True}
+
+FIELD_RANGES = (
+    ('minute', 0, 59),
+    ('hour', 0, 23),
+    ('day', 1, 31),
+    ('month', 1, 12),
+    ('weekday', 0, 7),
+)
+
+NAMED_SCHEDULES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+
+
+def parse_field(text, low, high):
+    """Expand one cron field (`*`, `a-b`, `*/n`, `a,b,c`) into a set of values"""
+    values = set()
+    for part in text.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"Invalid cron step: {text}")
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(v) for v in part.split('-', 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"Cron field out of range: {text}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """A five-field cron expression: minute hour day-of-month month day-of-week"""
+
+    def __init__(self, expression):
+        self.expression = expression
+        fields = NAMED_SCHEDULES.get(expression, expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        parsed = [parse_field(field, low, high)
+                  for field, (_, low, high) in zip(fields, FIELD_RANGES)]
+        self.minutes, self.hours, self.days, self.months, self.weekdays = parsed
+        # Cron allows 7 for Sunday
+        if 7 in self.weekdays:
+            self.weekdays = (self.weekdays - {7}) | {0}
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    def _day_matches(self, moment):
+        day_ok = moment.day in self.days
+        # Python: Monday=0; cron: Sunday=0
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day:
+            return weekday_ok
+        if self.any_weekday:
+            return day_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment):
+        """Return the first matching minute strictly after `moment`"""
+        moment = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+        while moment < limit:
+            if moment.month not in self.months:
+                year = moment.year + (moment.month == 12)
+                moment = moment.replace(year=year, month=moment.month % 12 + 1, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+                continue
+            if moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+                continue
+            return moment
+        raise ValueError(f"Cron expression never fires: {self.expression}")
+
+
+class AsyncScheduler:
+    """Runs a command whenever any of its cron schedules is due
+
+    overlap decides what happens when a slot comes up while a cycle runs:
+      skip        drop the new slot
+      queue       run it as soon as the current cycle finishes (at most one waits)
+      concurrent  start another cycle alongside the running one
+    """
+
+    def __init__(self, command, schedules, overlap='skip', cwd=None, log_callback=None):
+        if overlap not in OVERLAP_POLICIES:
+            raise ValueError(f"Unknown overlap policy: {overlap}")
+        self.command = command
+        self.schedules = [s if isinstance(s, CronSchedule) else CronSchedule(s) for s in schedules]
+        self.overlap = overlap
+        self.cwd = cwd
+        self.log_callback = log_callback
+        self.running = set()
+        self.processes = set()
+        self.queued = False
+        self.stopping = None
+        self.runs_started = 0
+
+    def log(self, message):
+        """Log a message"""
+        if self.log_callback:
+            self.log_callback(message)
+        else:
+            print(message, flush=True)
+
+    async def run_cycle(self, reason):
+        """Run one cycle as a subprocess and stream its output"""
+        self.runs_started += 1
+        run_id = self.runs_started
+        self.log(f"[run {run_id}] starting ({reason})")
+        process = await asyncio.create_subprocess_exec(
+            *self.command, cwd=self.cwd,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT, **CHILD_OPTIONS)
+        self.processes.add(process)
+        try:
+            async for line in process.stdout:
+                self.log(f"[run {run_id}] {line.decode('utf-8', 'replace').rstrip()}")
+            returncode = await process.wait()
+        finally:
+            self.processes.discard(process)
+        self.log(f"[run {run_id}] finished with exit code {returncode}")
+        return returncode
+
+    def trigger(self, reason):
+        """Start a cycle according to the overlap policy"""
+        if self.running and self.overlap == 'skip':
+            self.log(f"Skipping {reason}: a cycle is still running")
+            return
+        if self.running and self.overlap == 'queue':
+            if self.queued:
+                self.log(f"Skipping {reason}: a cycle is already queued")
+            else:
+                self.log(f"Queueing {reason} until the running cycle finishes")
+                self.queued = True
+            return
+        task = asyncio.ensure_future(self.run_cycle(reason))
+        self.running.add(task)
+        task.add_done_callback(self._cycle_done)
+
+    def _cycle_done(self, task):
+        self.running.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.log(f"Cycle failed: {task.exception()}")
+        if self.queued and not self.stopping.is_set():
+            self.queued = False
+            self.trigger("queued slot")
+
+    async def watch(self, schedule):
+        """Sleep until each due time of one schedule and trigger a cycle"""
+        while not self.stopping.is_set():
+            due = schedule.next_after(datetime.now())
+            self.log(f"Next run for '{schedule.expression}' at {due:%Y-%m-%d %H:%M}")
+            while not self.stopping.is_set():
+                remaining = (due - datetime.now()).total_seconds()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), min(remaining, MAX_SLEEP))
+                except asyncio.TimeoutError:
+                    pass
+            if not self.stopping.is_set():
+                self.trigger(f"schedule '{schedule.expression}'")
+
+    def request_stop(self):
+        """Ask the scheduler to shut down (safe to call from a signal handler)"""
+        if not self.stopping.is_set():
+            self.log("Shutdown requested, waiting for running cycles...")
+            self.stopping.set()
+
+    def _install_signal_handlers(self, loop):
+        for name in ('SIGINT', 'SIGTERM'):
+            sig = getattr(signal, name, None)
+            if sig is None:
+                continue
+            try:
+                loop.add_signal_handler(sig, self.request_stop)
+            except (NotImplementedError, RuntimeError):
+                # Windows event loops have no add_signal_handler
+                signal.signal(sig, lambda *_: loop.call_soon_threadsafe(self.request_stop))
+
+    def terminate(self, process):
+        """Stop a cycle, and on POSIX the git processes it started (its whole session)"""
+        try:
+            if hasattr(os, 'killpg'):
+                os.killpg(process.pid, signal.SIGTERM)
+            else:
+                process.terminate()
+        except ProcessLookupError:
+            pass
+
+    async def run(self):
+        """Run until a shutdown signal arrives, then let cycles finish gracefully"""
+        self.stopping = asyncio.Event()
+        self._install_signal_handlers(asyncio.get_running_loop())
+        watchers = [asyncio.ensure_future(self.watch(s)) for s in self.schedules]
+
+        await self.stopping.wait()
+        for watcher in watchers:
+            watcher.cancel()
+        await asyncio.gather(*watchers, return_exceptions=True)
+
+        if self.running:
+            done, pending = await asyncio.wait(self.running, timeout=SHUTDOWN_GRACE)
+            if pending:
+                self.log("Cycles still running after the grace period, terminating them")
+                for process in list(self.processes):
+                    self.terminate(process)
+                await asyncio.gather(*pending, return_exceptions=True)
+        self.log("Scheduler stopped")
+
+
+def run_scheduler(command, schedules, overlap='skip', cwd=None, log_callback=None):
+    """Blocking entry point: run an AsyncScheduler until it is signalled to stop"""
+    scheduler = AsyncScheduler(command, schedules, overlap, cwd, log_callback)
+    asyncio.run(scheduler.run())
+    return scheduler
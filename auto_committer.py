@@ -8,154 +8,1201 @@ Runs automatically at 6 AM daily.
 import os
 import sys
 import time
-import random
 import subprocess
+import argparse
+import threading
 from datetime import datetime
-import schedule
+from fast_import import FastImportEngine, FastImportError
+from change_writer import FSYNC_POLICIES
+from content_generators import TimestampLines, parse_generator
+from push_policy import PushPolicy
+from pusher import DEFAULT_CHUNK_COMMITS, DEFAULT_RETRIES, Pusher, PushError
+from maintenance import MaintenanceError, RepoMaintenance, parse_thresholds
+from git_backend import GitBackend, GitError
+from memory_backend import MEMORY_ENGINES
+from object_writer import ObjectStore, ObjectStoreError
+from pack_writer import PackWriter
+from metrics import Metrics, MetricsServer
+from profiler import TOP_FUNCTIONS, CycleProfiler
+from daemon_client import DaemonError, ensure_daemon, follow_run
+from journal import Journal
+from run_lock import BUSY_POLICIES, RunLock, RunLockError
+from rotation import ARCHIVE_DIR, RotationPolicy
+from sparse_worktree import SparseWorktree, WorktreeError
+from timeline import (generate_timeline, timeline_path, describe as describe_timeline,
+                      parse_date, parse_range, parse_weights)
+
+ENGINES = ('subprocess', 'pipeline', 'objects', 'pack', 'fast-import')
 
 class AutoCommitter:
-    def __init__(self):
+    def __init__(self, engine='subprocess', fsync='cycle', stage_all=False,
+                 push_policy=None, commit_delay=0, repo_dir=None,
+                 target_file='changes.txt', max_commits=150, log_callback=None,
+                 metrics=None, resume=True, rotation=None, progress_callback=None,
+                 generator=None, backend=None):
         self.script_path = os.path.abspath(__file__)
-        self.target_file = os.path.join(os.path.dirname(self.script_path), 'changes.txt')
+        if backend is not None and repo_dir is None:
+            repo_dir = backend.repo_dir
+        self.repo_dir = os.path.abspath(repo_dir or os.path.dirname(self.script_path))
+        self.target_file = os.path.join(self.repo_dir, target_file)
+        # target_file follows the generator when it spreads changes over several files
+        self.base_target = self.target_file
         self.commit_count = 0
-        self.max_commits = 150
+        self.max_commits = max_commits
+        self.engine = engine
+        self.fsync = fsync
+        self.initial_content = "change me 100 times."
+        self.change_writer = None
+        # Open writer per target file; change_writer is the one for the current target
+        self.change_writers = {}
+        # What each change appends, and where (ContentGenerator)
+        self.generator = generator or TimestampLines()
+        self.stage_all = stage_all
+        self.push_policy = push_policy or PushPolicy()
+        self.commit_delay = commit_delay
+        # GitBackend, or a MemoryBackend to run without a repository
+        self.backend = backend or GitBackend(self.repo_dir)
+        self.object_store = None
+        self.log_callback = log_callback
+        # Optional lock/semaphore shared between committers to limit concurrent pushes
+        self.push_limiter = None
+        self.last_push_ok = None
+        self.metrics = metrics or Metrics()
+        # Retries, non-fast-forward rebases and chunking; its settings may be changed before a cycle
+        self.pusher = Pusher(self.backend, metrics=self.metrics, log=self.log,
+                             before_rebase=self.prepare_rebase, after_rebase=self.finish_rebase)
+        # Journal of the running cycle; an interrupted cycle is resumed unless resume is False
+        self.journal = None
+        self.resume = resume
+        self.start_index = 0
+        # Reads HEAD from the ref files for the journal, without starting git
+        self.head_store = None
+        # Optional RotationPolicy for changes.txt, applied at the start of each cycle
+        self.rotation = rotation
+        # Optional RepoMaintenance, run at the end of each cycle
+        self.maintenance = None
+        # What to do when another cycle holds the repository's run lock, and for how long to wait
+        self.on_busy = 'wait'
+        self.lock_timeout = None
+        self.run_lock = None
+        # Seconds the last cycle waited for the run lock
+        self.last_lock_wait = 0.0
+        # Front ends (GUI, daemon) get (done, total, pending) after every change
+        self.progress_callback = progress_callback
+        self.progress_done = 0
+        # Set from another thread to end the cycle after the current change
+        self.stop_event = threading.Event()
         
+    def log(self, message):
+        """Print a message, or hand it to the log callback when one is set"""
+        if self.log_callback:
+            self.log_callback(message)
+        else:
+            print(message)
+    
+    def report_progress(self, done=None):
+        """Hand the cycle's progress to the progress callback, if any"""
+        if done is not None:
+            self.progress_done = done
+        else:
+            done = self.progress_done
+        if self.progress_callback:
+            self.progress_callback(done, self.max_commits, self.push_policy.pending)
+        if self.run_lock is not None:
+            self.run_lock.heartbeat()
+    
+    def request_stop(self):
+        """Ask the running cycle to stop after the current change; pending commits are still pushed"""
+        self.stop_event.set()
+    
+    def stop_requested(self, index):
+        """Return True (and log it) if a stop was requested before change `index`"""
+        if not self.stop_event.is_set():
+            return False
+        self.log(f"Stop requested; ending the cycle before change {index + 1}")
+        return True
+    
+    def metric_totals(self, **overrides):
+        """Running spawn and byte totals of the cycle, for the metrics recorder"""
+        totals = {'spawns': self.backend.spawns}
+        if self.change_writers:
+            totals['change_bytes'] = sum(w.bytes_written for w in self.change_writers.values())
+        if self.object_store is not None:
+            totals['object_bytes'] = self.object_store.bytes_written
+        totals.update(overrides)
+        return totals
+    
+    def open_change_writer(self):
+        """Open the append-only writer for the current target file; it stays open for the cycle"""
+        self.change_writer = self.change_writers.get(self.target_file)
+        if self.change_writer is None:
+            self.change_writer = self.backend.change_writer(self.target_file, self.initial_content,
+                                                            fsync=self.fsync).open()
+            self.change_writers[self.target_file] = self.change_writer
+    
+    def close_change_writer(self):
+        """Flush and close every writer the cycle opened"""
+        for writer in self.change_writers.values():
+            writer.close()
+        self.change_writers = {}
+        self.change_writer = None
+    
+    def select_target(self, index):
+        """Point target_file at the file change `index` goes to"""
+        path = self.generator.target(index)
+        self.target_file = os.path.join(self.repo_dir, path) if path else self.base_target
+    
+    def build_commit_message(self):
+        """Build the commit message for the current change"""
+        return f"Auto-commit #{self.commit_count + 1} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+    
     def modify_target_file(self):
-        """Modify the changes.txt file by adding a timestamp line"""
+        """Append the generator's line for the current change to its target file"""
         try:
-            # Read existing content
-            if os.path.exists(self.target_file):
-                with open(self.target_file, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-            else:
-                content = "change me 100 times."
-            
-            # Add a timestamp line
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            random_num = random.randint(1000, 9999)
-            new_line = f"Change #{self.commit_count + 1}: {timestamp} - Random: {random_num}"
-            
-            # Append the new line
-            modified_content = content + "\n" + new_line
-            
-            with open(self.target_file, 'w', encoding='utf-8') as f:
-                f.write(modified_content)
+            with self.metrics.stage('modify'):
+                # The line is streamed to the file in the generator's chunks
+                chunks = self.generator.chunks(self.commit_count)
+                if self.change_writers and self.change_writer.path != self.target_file:
+                    # The cycle moved on to another target file; open (or reuse) its writer
+                    self.open_change_writer()
+                
+                if self.change_writer is not None:
+                    self.change_writer.append_chunks(chunks)
+                else:
+                    with self.backend.change_writer(self.target_file, self.initial_content,
+                                                    fsync=self.fsync) as writer:
+                        writer.append_chunks(chunks)
+                    self.metrics.add('change_bytes', writer.bytes_written)
                 
-            print(f"Modified changes.txt (change #{self.commit_count + 1})")
+            self.log(f"Modified {os.path.relpath(self.target_file, self.repo_dir)} "
+                     f"(change #{self.commit_count + 1})")
             return True
             
         except Exception as e:
-            print(f"Error modifying changes.txt: {e}")
+            self.log(f"Error modifying changes.txt: {e}")
             return False
     
+    def stage_changes(self):
+        """Stage changes.txt only, or the whole tree when stage_all is set"""
+        if self.stage_all:
+            self.backend.run('add', '.', check=True, capture=False)
+        else:
+            # Hashes the one file and rewrites its index entry; no working-tree scan
+            target = os.path.relpath(self.target_file, self.repo_dir)
+            self.backend.run('update-index', '--add', '--', target, check=True, capture=False)
+    
     def git_commit_only(self):
         """Commit changes locally (no push)"""
         try:
-            # Get current directory
-            repo_dir = os.path.dirname(self.script_path)
-            
-            # Add changes
-            subprocess.run(['git', 'add', '.'], cwd=repo_dir, check=True)
+            commit_msg = self.build_commit_message()
             
-            # Commit with message
-            commit_msg = f"Auto-commit #{self.commit_count + 1} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-            subprocess.run(['git', 'commit', '-m', commit_msg], cwd=repo_dir, check=True)
+            if self.engine == 'pipeline' and not self.stage_all:
+                # Blob, tree, commit and ref update all go through persistent git helpers
+                with self.metrics.stage('commit'):
+                    self.backend.commit_file(self.target_file, commit_msg)
+            elif self.engine == 'objects' and not self.stage_all:
+                # Objects and ref are written in-process; the index is refreshed after the cycle
+                if self.object_store is None:
+                    self.object_store = ObjectStore(self.repo_dir)
+                with self.metrics.stage('commit'):
+                    self.object_store.commit_file(self.target_file, commit_msg)
+                self.backend.stage_path(self.target_file)
+            else:
+                # Stage changes
+                with self.metrics.stage('stage'):
+                    self.stage_changes()
+                
+                # Commit with message
+                with self.metrics.stage('commit'):
+                    if self.stage_all:
+                        self.backend.run('commit', '-m', commit_msg, check=True, capture=False)
+                    else:
+                        # Only changes.txt is staged, so skip the untracked-file scan too
+                        self.backend.run('commit', '--untracked-files=no', '-m', commit_msg,
+                                         check=True, capture=False)
             
-            print(f"Committed change #{self.commit_count + 1}")
+            self.log(f"Committed change #{self.commit_count + 1}")
             return True
             
-        except subprocess.CalledProcessError as e:
-            print(f"Git commit error: {e}")
+        except (subprocess.CalledProcessError, GitError, ObjectStoreError) as e:
+            self.log(f"Git commit error: {e}")
             return False
         except Exception as e:
-            print(f"Error in git commit: {e}")
+            self.log(f"Error in git commit: {e}")
             return False
     
     def git_push_all(self):
-        """Push all commits to GitHub"""
+        """Push all commits to GitHub (retried, rebased onto the remote and chunked as needed)"""
         try:
-            # Get current directory
-            repo_dir = os.path.dirname(self.script_path)
-            
-            # Push to GitHub
-            subprocess.run(['git', 'push'], cwd=repo_dir, check=True)
+            if self.push_limiter is not None:
+                with self.push_limiter, self.metrics.stage('push'):
+                    self.pusher.push()
+            else:
+                with self.metrics.stage('push'):
+                    self.pusher.push()
             
-            print(f"Successfully pushed all commits to GitHub!")
+            self.log(f"Successfully pushed all commits to GitHub!")
             return True
             
-        except subprocess.CalledProcessError as e:
-            print(f"Git push error: {e}")
+        except PushError as e:
+            self.log(f"Git push error: {e}")
             return False
         except Exception as e:
-            print(f"Error in git push: {e}")
+            self.log(f"Error in git push: {e}")
             return False
     
-    def run_commit_cycle(self):
-        """Run the complete cycle of 100 modifications and commits"""
-        print(f"Starting auto-commit cycle at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"Working on: {self.target_file}")
-        print(f"Note: Will commit locally after each change, then push all at the end for speed!")
+    def prepare_rebase(self):
+        """Hand HEAD, the index and changes.txt back to git before a push rebases the commits"""
+        for writer in self.change_writers.values():
+            writer.flush()
+        if self.object_store is not None:
+            self.object_store.reset()
+        # Writes the pending index entries and drops the cached HEAD of the pipeline engine
+        self.close_backend()
+    
+    def finish_rebase(self):
+        """Pick up the rebased changes.txt; git may have replaced the file"""
+        for writer in self.change_writers.values():
+            writer.reopen()
+    
+    def push_pending(self):
+        """Push the commits that the push policy has accumulated"""
+        pending = self.push_policy.pending
+        self.log(f"Pushing {pending} pending commits to GitHub...")
+        self.last_push_ok = self.git_push_all()
+        if self.last_push_ok:
+            self.push_policy.record_push()
+            if self.journal is not None:
+                self.journal.record_push(self.backend.query('rev-parse', 'HEAD'))
+            return True
+        self.log(f"Failed to push commits; {pending} commits still pending")
+        return False
+    
+    def run_timeline_commits(self, timestamps):
+        """Write one backdated commit per timestamp into a single packfile, then move the branch once"""
+        store = ObjectStore(self.repo_dir)
+        try:
+            store.resolve_head()
+        except (OSError, ObjectStoreError) as e:
+            self.log(f"Error preparing timeline: {e}")
+            return 0
+        
+        old_head = store.head
+        store.sink = PackWriter(store)
+        # Month file path -> content; written to the working tree once the branch has moved
+        contents = {}
+        written = 0
         
+        try:
+            for i, when in enumerate(timestamps):
+                if self.stop_requested(i):
+                    break
+                self.commit_count = i
+                moment = datetime.fromtimestamp(when)
+                with self.metrics.stage('modify'):
+                    path = timeline_path(when)
+                    if path not in contents:
+                        contents[path] = bytearray(self.read_timeline_file(path))
+                    content = contents[path]
+                    line = "".join(self.generator.chunks(i, when))
+                    content += (("\n" if content else "") + line).encode('utf-8')
+                with self.metrics.stage('commit'):
+                    store.commit_content(path, bytes(content),
+                                         f"Auto-commit #{i + 1} - {moment:%Y-%m-%d %H:%M:%S}", when)
+                written += 1
+                self.metrics.end_iteration(i, True, **self.metric_totals(
+                    object_bytes=store.sink.bytes_written))
+                self.report_progress(i + 1)
+                if (i + 1) % 1000 == 0:
+                    store.prune_trees()
+                    self.log(f"Committed {i + 1}/{len(timestamps)} ({moment:%Y-%m-%d})")
+            
+            if not written:
+                store.sink.abort()
+                return 0
+            
+            with self.metrics.stage('finish'):
+                pack_path = store.sink.finish()
+                self.log(f"Wrote {len(store.sink.entries)} objects ({store.sink.deltas} deltas) "
+                      f"to {os.path.basename(pack_path)}")
+                store.sink = None
+                store.update_ref(store.head_ref, store.head, old_head,
+                                 f"auto-committer: timeline of {written} commits")
+            
+        except (OSError, ObjectStoreError) as e:
+            if store.sink is not None:
+                store.sink.abort()
+            self.log(f"Timeline error: {e}")
+            self.log("No commits were added; the branch was not moved")
+            return 0
+        
+        # Leave the working tree and index matching the new branch tip
+        for path, content in contents.items():
+            full_path = os.path.join(self.repo_dir, path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, 'wb') as f:
+                f.write(content)
+            self.metrics.add('change_bytes', len(content))
+            self.backend.stage_path(full_path)
+        try:
+            self.close_backend()
+        except GitError as e:
+            self.log(f"Git backend error: {e}")
+        
+        self.push_policy.pending += written
+        self.journal_batch(written, [os.path.join(self.repo_dir, path) for path in contents])
+        return written
+    
+    def read_timeline_file(self, path):
+        """Current content of a timeline month file (empty if it does not exist yet)"""
+        full_path = os.path.join(self.repo_dir, path)
+        if not os.path.exists(full_path):
+            return b""
+        with open(full_path, 'rb') as f:
+            return f.read().strip()
+    
+    def rotate_target(self):
+        """Roll changes.txt over if the rotation policy says so; the rotation is its own commit"""
+        if self.rotation is None or not self.rotation.due(self.target_file):
+            return
+        try:
+            paths, message = self.rotation.apply(self.repo_dir, self.target_file, self.initial_content)
+            self.backend.run('update-index', '--add', '--', *paths, check=True, capture=False)
+            self.backend.run('commit', '--untracked-files=no', '-m', message, check=True, capture=False)
+        except (OSError, subprocess.CalledProcessError) as e:
+            self.log(f"Rotation of changes.txt failed: {e}")
+            return
+        self.push_policy.record_commit()
+        self.log(message)
+    
+    def acquire_run_lock(self, commits, merges=True):
+        """Take the repository's run lock (as on_busy says); returns False if the cycle must not run"""
+        self.last_lock_wait = 0.0
+        if self.backend.in_memory:
+            return True
+        try:
+            lock = RunLock(self.repo_dir, log=self.log)
+            if not lock.acquire(commits, self.on_busy, self.lock_timeout, merges,
+                                cancelled=self.stop_event.is_set):
+                return False
+        except RunLockError as e:
+            self.log(f"Not running: {e}")
+            return False
+        except (OSError, ObjectStoreError) as e:
+            self.log(f"Run lock unavailable: {e}")
+            return True
+        self.run_lock = lock
+        self.last_lock_wait = lock.wait_seconds
+        return True
+    
+    def release_run_lock(self):
+        """Let the next cycle in; requests merged too late are left for it"""
+        if self.run_lock is None:
+            return
+        if os.path.exists(self.run_lock.merge_path):
+            self.log("Commits merged after this cycle stopped taking them will run with the next cycle")
+        try:
+            self.run_lock.release()
+        except OSError as e:
+            self.log(f"Could not release the run lock: {e}")
+        self.run_lock = None
+    
+    def take_merged_commits(self):
+        """Commits other requesters merged into the running cycle"""
+        if self.run_lock is None:
+            return 0
+        try:
+            extra = self.run_lock.take_merged()
+        except OSError as e:
+            self.log(f"Could not read merged requests: {e}")
+            return 0
+        if extra:
+            self.metrics.add('lock_merges')
+            self.log(f"Merged request: {extra} more commits for this cycle")
+        return extra
+    
+    def open_journal(self, timestamps=None):
+        """Start the cycle's journal, picking up an interrupted cycle where it stopped"""
+        self.start_index = 0
+        if self.backend.in_memory:
+            # Nothing on disk to journal (or to resume)
+            self.journal = None
+            return
+        try:
+            self.journal = Journal(self.repo_dir, fsync=self.fsync == 'change')
+            previous = self.journal.unfinished()
+        except (OSError, ObjectStoreError) as e:
+            self.log(f"Cycle journal unavailable: {e}")
+            self.journal = None
+            return
+        
+        resume = None
+        if previous:
+            self.recover_interrupted(previous)
+            # Commits the interrupted cycle made but never pushed go out with this one
+            self.push_policy.pending += previous['pending']
+            if (self.resume and timestamps is None and previous.get('resumable', True)
+                    and previous['next'] < previous['planned']):
+                resume = previous
+                self.start_index = previous['next']
+                self.max_commits = previous['planned']
+                self.log(f"Resuming interrupted cycle {previous['cycle']} at change "
+                         f"#{self.start_index + 1}/{self.max_commits}")
+            if previous['pending']:
+                self.log(f"{previous['pending']} commits from the interrupted cycle are still unpushed")
+        
+        engine = 'timeline' if timestamps is not None else self.engine
+        self.journal.begin(self.max_commits, engine, resume=resume,
+                           resumable=timestamps is None,
+                           pending=previous['pending'] if previous else 0)
+    
+    def journal_batch(self, count, paths=()):
+        """Record commits that reached the branch together, with the new HEAD and file sizes"""
+        if self.journal is not None:
+            self.journal.record_batch(self.max_commits, count, self.push_policy.pending,
+                                      self.read_head(), self.file_sizes(paths))
+    
+    def journal_checkpoint(self):
+        """Record HEAD and the size of every target file before the cycle's first change"""
+        if self.journal is not None:
+            self.journal.checkpoint(self.read_head(), self.file_sizes(self.target_paths()))
+    
+    def target_paths(self):
+        """Every file the cycle's changes go to"""
+        paths = [os.path.join(self.repo_dir, path) for path in self.generator.targets()]
+        return paths or [self.base_target]
+    
+    def read_head(self):
+        """The commit HEAD points at, read from the ref files (no git process); None if unknown"""
+        try:
+            if self.head_store is None:
+                self.head_store = ObjectStore(self.repo_dir)
+            return self.head_store.read_ref(self.head_store.symbolic_head())
+        except (OSError, ObjectStoreError):
+            return None
+    
+    def file_sizes(self, paths):
+        """{repository path: size in bytes} of the given files that exist"""
+        sizes = {}
+        for path in paths:
+            try:
+                sizes[os.path.relpath(path, self.repo_dir).replace(os.sep, '/')] = os.path.getsize(path)
+            except OSError:
+                pass
+        return sizes
+    
+    def recover_interrupted(self, previous):
+        """Bring an interrupted cycle's journal state in line with the repository
+
+        Commits made after the last journal record (the process died between
+        the commit and its record) are counted as done, so their indexes are
+        not made again. Otherwise the target files are cut back to their
+        journaled sizes, dropping lines no commit holds.
+        """
+        journaled = previous.get('head')
+        head = self.read_head()
+        if journaled is None or head is None:
+            return
+        if head != journaled:
+            made = self.unjournaled_commits(journaled, head)
+            if made is None:
+                self.log("HEAD moved since the interrupted cycle's last record; its files are left as they are")
+                return
+            self.log(f"{made} commit(s) of the interrupted cycle were made after its last journal record")
+            previous['head'] = head
+            previous['committed'] += made
+            previous['pending'] += made
+            if previous.get('resumable', True):
+                previous['next'] = min(previous['next'] + made, previous['planned'])
+            return
+        for path, size in previous.get('sizes', {}).items():
+            full_path = os.path.join(self.repo_dir, path)
+            try:
+                extra = os.path.getsize(full_path) - size
+                if extra <= 0:
+                    continue
+                with open(full_path, 'r+b') as f:
+                    f.truncate(size)
+            except OSError as e:
+                self.log(f"Could not cut {path} back to its journaled size: {e}")
+                continue
+            self.log(f"Dropped {extra} bytes the interrupted cycle wrote to {path} but never committed")
+    
+    def unjournaled_commits(self, journaled, head):
+        """How many auto-commits lead from `journaled` to `head`, or None if HEAD went elsewhere"""
+        if self.backend.query('merge-base', '--is-ancestor', journaled, head) is None:
+            return None
+        subjects = (self.backend.query('log', '--format=%s', f"{journaled}..{head}") or '').splitlines()
+        if not subjects or not all(subject.startswith('Auto-commit #') for subject in subjects):
+            return None
+        return len(subjects)
+    
+    def close_backend(self):
+        """Refresh the index for the committed paths (timed as staging) and stop the helpers"""
+        if self.backend.staged_paths:
+            with self.metrics.stage('stage'):
+                self.backend.flush_index()
+        self.backend.close()
+    
+    def run_fast_import_commits(self):
+        """Stream every change of the cycle through one git fast-import process"""
+        engine = FastImportEngine(self.repo_dir, self.target_file)
+        
+        try:
+            self.open_change_writer()
+            engine.start()
+            
+            for i in range(self.start_index, self.max_commits):
+                if self.stop_requested(i):
+                    break
+                self.commit_count = i
+                self.select_target(i)
+                if not self.modify_target_file():
+                    raise OSError(f"Could not write change {i + 1}")
+                relative = os.path.relpath(self.target_file, self.repo_dir).replace(os.sep, '/')
+                with self.metrics.stage('commit'):
+                    # Each version is copied from disk into the stream, never held in memory
+                    engine.commit_file(self.target_file, self.build_commit_message(), path=relative)
+                self.metrics.end_iteration(i, True, **self.metric_totals(object_bytes=engine.bytes_sent))
+                self.log(f"Committed change #{i + 1}")
+                self.report_progress(i + 1)
+            
+            self.close_change_writer()
+            with self.metrics.stage('finish'):
+                engine.finish()
+            self.metrics.add('spawns', engine.spawns)
+            # The branch ref only moves when the stream closes, so everything is pushed at the end
+            self.push_policy.pending += engine.commits_written
+            self.journal_batch(engine.commits_written, self.target_paths())
+            
+        except (FastImportError, OSError) as e:
+            engine.abort()
+            self.close_change_writer()
+            self.log(f"Fast-import error: {e}")
+            self.log("The target files were modified but the branch was not moved")
+            return 0
+        
+        return engine.commits_written
+    
+    def run_pack_commits(self):
+        """Write every commit of the cycle into one new packfile, then move the branch once"""
+        store = ObjectStore(self.repo_dir)
+        try:
+            store.resolve_head()
+            self.open_change_writer()
+        except (OSError, ObjectStoreError) as e:
+            self.log(f"Error preparing pack engine: {e}")
+            return 0
+        
+        old_head = store.head
+        store.sink = PackWriter(store)
         success_count = 0
+        written_paths = set()
         
-        for i in range(self.max_commits):
+        try:
+            for i in range(self.start_index, self.max_commits):
+                if self.stop_requested(i):
+                    break
+                self.commit_count = i
+                self.select_target(i)
+                if not self.modify_target_file():
+                    self.log(f"Failed to modify changes.txt for change {i + 1}")
+                    self.metrics.end_iteration(i, False)
+                    self.report_progress(i + 1)
+                    continue
+                with self.metrics.stage('commit'):
+                    store.commit_file(self.target_file, self.build_commit_message())
+                written_paths.add(self.target_file)
+                success_count += 1
+                self.metrics.end_iteration(i, True, **self.metric_totals(
+                    object_bytes=store.sink.bytes_written))
+                self.log(f"Committed change #{i + 1}")
+                self.report_progress(i + 1)
+            
+            self.close_change_writer()
+            if success_count == 0:
+                store.sink.abort()
+                return 0
+            
+            with self.metrics.stage('finish'):
+                pack_path = store.sink.finish()
+                self.log(f"Wrote {len(store.sink.entries)} objects ({store.sink.deltas} deltas) "
+                      f"to {os.path.basename(pack_path)}")
+                store.sink = None
+                store.update_ref(store.head_ref, store.head, old_head,
+                                 f"auto-committer: {success_count} commits")
+            
+        except (OSError, ObjectStoreError) as e:
+            if store.sink is not None:
+                store.sink.abort()
+            self.close_change_writer()
+            self.log(f"Pack engine error: {e}")
+            self.log("changes.txt was modified but the branch was not moved")
+            return 0
+        
+        # Everything lands on the branch at once, so it is pushed at the end
+        self.push_policy.pending += success_count
+        self.journal_batch(success_count, written_paths)
+        for path in written_paths:
+            self.backend.stage_path(path)
+        try:
+            self.close_backend()
+        except GitError as e:
+            self.log(f"Git backend error: {e}")
+        return success_count
+    
+    def run_commit_loop(self):
+        """Modify and commit each change in turn (subprocess or pipeline engine)"""
+        success_count = 0
+        
+        try:
+            self.open_change_writer()
+        except OSError as e:
+            self.log(f"Error opening changes.txt: {e}")
+            return 0
+        
+        for i in range(self.start_index, self.max_commits):
+            if self.stop_requested(i):
+                break
             self.commit_count = i
+            self.select_target(i)
             
-            print(f"\n--- Processing change {i + 1}/{self.max_commits} ---")
+            self.log(f"\n--- Processing change {i + 1}/{self.max_commits} ---")
             
             # Modify the target file
+            committed = False
             if self.modify_target_file():
                 # Commit locally (no push yet)
                 if self.git_commit_only():
+                    committed = True
                     success_count += 1
-                    print(f"Successfully completed change {i + 1}")
+                    self.push_policy.record_commit()
                 else:
-                    print(f"Failed to commit change {i + 1}")
+                    self.log(f"Failed to commit change {i + 1}")
             else:
-                print(f"Failed to modify changes.txt for change {i + 1}")
+                self.log(f"Failed to modify changes.txt for change {i + 1}")
+            if self.journal is not None:
+                # Journaled before any push, so a crash during the push cannot repeat this change
+                self.journal.record_commit(i, committed, self.push_policy.pending,
+                                           self.read_head() if committed else None,
+                                           self.file_sizes([self.target_file]) if committed else None)
+            self.metrics.end_iteration(i, committed, **self.metric_totals())
+            if committed:
+                self.log(f"Successfully completed change {i + 1} ({self.push_policy.pending} pending push)")
+                if self.push_policy.should_push():
+                    self.push_pending()
+            self.report_progress(i + 1)
+            
+            # Optional pacing between commits; a stop request cuts the wait short
+            if self.commit_delay and i < self.max_commits - 1:
+                self.stop_event.wait(self.commit_delay)
+        
+        self.close_change_writer()
+        if self.object_store is not None:
+            self.object_store.reset()
+        try:
+            self.close_backend()
+        except GitError as e:
+            self.log(f"Git backend error: {e}")
+        return success_count
+    
+    def run_maintenance(self, force=False):
+        """Run the repository maintenance steps that are due; returns the report or None"""
+        maintenance = self.maintenance or RepoMaintenance(self.backend, log=self.log)
+        try:
+            with self.metrics.stage('maintenance'):
+                report = maintenance.run(force)
+        except (OSError, MaintenanceError) as e:
+            self.log(f"Maintenance error: {e}")
+            return None
+        if report['steps'] and self.object_store is not None:
+            # Repacking replaced the packs the object store had indexed
+            self.object_store.reset()
+            self.object_store.packs = None
+        return report
+    
+    def run_commit_cycle(self, timestamps=None):
+        """Run the complete cycle of modifications and commits; returns the commit count
+
+        With `timestamps`, a backdated timeline is written instead (one commit per timestamp).
+        The cycle holds the repository's run lock; if another cycle has it, this one
+        waits, merges its commits into that cycle, or is skipped (see on_busy).
+        """
+        self.log(f"Starting auto-commit cycle at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        if self.backend.in_memory and (timestamps is not None or self.rotation is not None
+                                       or self.engine not in MEMORY_ENGINES):
+            self.log(f"The in-memory backend runs the {' and '.join(MEMORY_ENGINES)} engines "
+                     f"only, without timelines or rotation")
+            return 0
+        requested = len(timestamps) if timestamps is not None else self.max_commits
+        try:
+            if not self.acquire_run_lock(requested, merges=timestamps is None):
+                return 0
+            return self.run_locked_cycle(timestamps)
+        finally:
+            self.release_run_lock()
+            # A stop request only applies to the cycle it interrupted
+            self.stop_event.clear()
+    
+    def run_engine(self, timestamps=None):
+        """Make changes start_index..max_commits with the configured engine; returns the commit count"""
+        if timestamps is not None:
+            self.log(f"Writing {self.max_commits} backdated commits into a single packfile")
+            return self.run_timeline_commits(timestamps)
+        if self.engine == 'fast-import':
+            self.log(f"Using git fast-import engine for {self.max_commits - self.start_index} commits")
+            return self.run_fast_import_commits()
+        if self.engine == 'pack':
+            self.log(f"Writing {self.max_commits - self.start_index} commits into a single packfile")
+            return self.run_pack_commits()
+        return self.run_commit_loop()
+    
+    def run_locked_cycle(self, timestamps=None):
+        """The body of run_commit_cycle, run while holding the run lock"""
+        if timestamps is not None:
+            self.max_commits = len(timestamps)
+            self.log(f"Timeline: {describe_timeline(timestamps)}")
+        else:
+            self.target_file = self.base_target
+            self.log(f"Working on: {self.target_file}")
+            self.log(f"Content: {self.generator.describe()}")
+            if self.rotation is not None:
+                self.log(f"Rotation: {self.rotation.describe()}")
+        self.log(f"Note: Will commit locally after each change and push {self.push_policy.describe()}")
+        
+        self.push_policy.start()
+        self.backend.reset_stats()
+        self.last_push_ok = None
+        self.open_journal(timestamps)
+        self.progress_done = self.start_index
+        if timestamps is None:
+            self.rotate_target()
+            self.select_target(self.start_index)
+        self.journal_checkpoint()
+        lock_wait = self.last_lock_wait
+        self.metrics.start_cycle(engine='timeline' if timestamps is not None else self.engine,
+                                 requested=self.max_commits, lock_wait_ms=round(lock_wait * 1000, 1),
+                                 **self.metric_totals())
+        if self.run_lock is not None:
+            self.metrics.observe('lock', lock_wait)
+        first_index = self.start_index
+        success_count = self.run_engine(timestamps)
         
-        print(f"All changes completed! Successfully processed {success_count}/{self.max_commits} changes")
+        # Commits other requesters merged into this cycle go out with the same final push
+        while timestamps is None and not self.stop_event.is_set():
+            extra = self.take_merged_commits()
+            if not extra:
+                break
+            self.start_index = self.max_commits
+            self.max_commits += extra
+            if self.journal is not None:
+                self.journal.extend(self.max_commits)
+            success_count += self.run_engine()
         
-        # Now push all commits at once
-        if success_count > 0:
-            print(f"Pushing all {success_count} commits to GitHub...")
-            if self.git_push_all():
-                print(f"All commits successfully pushed to GitHub!")
+        self.log(f"All changes completed! Successfully processed {success_count}/{self.max_commits - first_index} changes")
+        
+        # Now push whatever the policy has not pushed yet
+        if self.push_policy.pending > 0:
+            if self.push_pending():
+                self.log(f"All commits successfully pushed to GitHub!")
             else:
-                print(f"Failed to push commits to GitHub")
+                self.log(f"Failed to push commits to GitHub")
+            self.report_progress()
+        
+        if self.journal is not None:
+            self.journal.finish(self.push_policy.pending)
+            self.journal.close()
+            self.journal = None
+        
+        if self.maintenance is not None:
+            self.run_maintenance()
+        
+        if self.backend.stats:
+            self.log(f"Git operations ({self.backend.spawns} processes started):")
+            self.log(self.backend.stats_summary())
+        self.metrics.end_cycle(committed=success_count, **self.metric_totals())
+        self.log("Stage timings:")
+        for line in self.metrics.summary_lines():
+            self.log(line)
+        if lock_wait >= 0.1:
+            self.log(f"Waited {lock_wait:.1f}s for the run lock")
+        
+        self.log(f"Finished at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        return success_count
+    
+    def run_branch_cycle(self, branches, commits, jobs=None, integrate='none'):
+        """Build commit chains on several branches in parallel and push every ref in one go"""
+        self.log(f"Starting branch generation at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        try:
+            # Branch runs hold the run lock too, but do not take merged requests
+            if not self.acquire_run_lock(len(branches) * commits, merges=False):
+                return 0
+            return self.run_locked_branch_cycle(branches, commits, jobs, integrate)
+        finally:
+            self.release_run_lock()
+    
+    def run_locked_branch_cycle(self, branches, commits, jobs=None, integrate='none'):
+        """The body of run_branch_cycle, run while holding the run lock"""
+        # Imported here: branches pulls in concurrent.futures/multiprocessing, which the
+        # frozen GUI (and the daemon it hosts) leave out
+        from branches import branch_file, generate_branches
+        self.backend.reset_stats()
+        self.last_push_ok = None
+        self.metrics.start_cycle(engine='branches', requested=len(branches) * commits,
+                                 **self.metric_totals())
+        try:
+            with self.metrics.stage('generate'):
+                results, refs = generate_branches(self.repo_dir, branches, commits, jobs,
+                                                  integrate, log=self.log)
+        except (OSError, ObjectStoreError) as e:
+            self.log(f"Branch generation error: {e}")
+            return 0
+        committed = sum(r['commits'] for r in results if 'error' not in r)
+        self.metrics.add('commits', committed)
+        self.metrics.add('object_bytes', sum(r.get('pack_bytes', 0) for r in results))
+        
+        try:
+            if integrate != 'none' and refs:
+                # The current branch moved; bring the merged files into the index and working tree
+                paths = [branch_file(r['branch']) for r in results if 'error' not in r]
+                self.backend.run('checkout', 'HEAD', '--', *paths, check=True, capture=False)
+            if refs:
+                # One push, one refspec per branch
+                head = self.backend.query('symbolic-ref', '--short', 'HEAD')
+                remote = self.backend.query('config', f"branch.{head}.remote") or 'origin'
+                self.log(f"Pushing {len(refs)} ref(s) to {remote}...")
+                with self.metrics.stage('push'):
+                    self.pusher.push_refs(refs, remote)
+                self.last_push_ok = True
+                self.log("Successfully pushed all branches!")
+        except (subprocess.CalledProcessError, GitError, PushError) as e:
+            self.last_push_ok = False
+            self.log(f"Git error: {e}")
+        
+        if self.maintenance is not None:
+            self.run_maintenance()
         
-        print(f"Finished at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        self.metrics.end_cycle(committed=committed, **self.metric_totals())
+        self.log("Stage timings:")
+        for line in self.metrics.summary_lines():
+            self.log(line)
+        self.log(f"Finished at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}: "
+                 f"{committed} commits on {len(branches)} branch(es)")
+        return committed
     
     def setup_scheduler(self):
         """Set up the scheduler to run at 6 AM daily"""
+        import schedule
         schedule.every().day.at("06:00").do(self.run_commit_cycle)
         
-        print("Scheduler set up to run at 6:00 AM daily")
-        print("Waiting for next scheduled run...")
-        print("Press Ctrl+C to stop the scheduler")
+        self.log("Scheduler set up to run at 6:00 AM daily")
+        self.log("Waiting for next scheduled run...")
+        self.log("Press Ctrl+C to stop the scheduler")
         
         try:
             while True:
                 schedule.run_pending()
                 time.sleep(60)  # Check every minute
         except KeyboardInterrupt:
-            print("\nScheduler stopped by user")
+            self.log("\nScheduler stopped by user")
+    
+    def setup_async_scheduler(self, cron_expressions, overlap='skip', cycle_args=(), action='--run-now'):
+        """Run cycles (or another `action`, such as --maintain-now) on cron schedules with the asyncio scheduler"""
+        from async_scheduler import run_scheduler, OVERLAP_POLICIES
+        if overlap not in OVERLAP_POLICIES:
+            raise ValueError(f"Unknown overlap policy: {overlap} (choose from {', '.join(OVERLAP_POLICIES)})")
+        command = [sys.executable, self.script_path, action, *cycle_args]
+        
+        self.log(f"Async scheduler set up for: {', '.join(cron_expressions)} (overlap: {overlap})")
+        self.log(f"Each run of {action} is its own process; press Ctrl+C to stop gracefully")
+        
+        run_scheduler(command, cron_expressions, overlap, cwd=self.repo_dir,
+                      log_callback=self.log)
+
+def print_usage():
+    """Print command line usage"""
+    print("Usage:")
+    print("  python auto_committer.py --run-now    # Run immediately")
+    print("  python auto_committer.py --schedule   # Run with daily scheduler")
+    print("  python auto_committer.py --schedule-async [--cron EXPR ...] [--overlap skip|queue|concurrent]")
+    print("                                        # Asyncio scheduler with cron expressions (default: '0 6 * * *')")
+    print("  python auto_committer.py --branches N|a,b,c [--branch-commits N] [--jobs N] [--integrate none|ff|merge]")
+    print("                                        # Build commit chains on several branches in parallel")
+    print("  python auto_committer.py --timeline START END [--per-day N|MIN-MAX] [--weekdays W] [--jitter F]")
+    print("                                        # Backdated commits from START to END (YYYY-MM-DD) in one pass")
+    print("Options:")
+    print("  --engine pipeline                     # Commit through persistent git helper processes")
+    print("  --engine objects                      # Write git objects in-process (no git processes)")
+    print("  --engine pack                         # Write the whole cycle into one delta-compressed packfile")
+    print("  --engine fast-import                  # Stream the cycle through one git fast-import")
+    print("  --fsync never|change|cycle            # When to fsync changes.txt (default: cycle)")
+    print("  --stage-all                           # Stage the whole tree with 'git add .'")
+    print("  --push-every N                        # Push after every N commits (default: at the end)")
+    print("  --push-interval SECONDS               # Push when SECONDS have passed since the last push")
+    print("  --push-retries N                      # Retries for a push that failed transiently (default: 4)")
+    print("  --push-chunk N                        # Push big backlogs N commits at a time (default: 5000, 0: one push)")
+    print("  --no-rebase                           # Fail instead of rebasing onto a remote that moved on")
+    print("  --delay SECONDS                       # Pause between commits (default: 0)")
+    print("  --content timestamp|random:SIZE|template:TEXT")
+    print("                                        # What each change appends (default: timestamp lines)")
+    print("  --files a.txt,b.txt                   # Spread the changes over several files in turn")
+    print("  --rotate lines:N|bytes:SIZE|monthly|ring:N")
+    print("                                        # Roll changes.txt into changes/YYYY-MM.txt, or keep a ring of N lines")
+    print("  --fresh                               # Start a new cycle instead of resuming an interrupted one")
+    print("  --metrics-log PATH                    # Append per-iteration stage timings as JSON lines")
+    print("  --metrics-port PORT                   # Serve Prometheus metrics on 127.0.0.1:PORT/metrics (--schedule)")
+    print("  --via-daemon                          # With --run-now: run the cycle in the background daemon (daemon.py)")
+    print("  --on-busy wait|merge|skip             # When another cycle runs in this repository: wait for it (default),")
+    print("                                        # add this run's commits to it, or skip this run")
+    print("  --lock-timeout SECONDS                # Give up waiting for the other cycle after SECONDS (default: never)")
+    print("  --sparse-worktree                     # Commit in a dedicated sparse worktree holding only the target files")
+    print("  --worktree-branch NAME                # Remote branch the worktree pushes to (default: the current branch's)")
+    print("  --profile                             # Profile the cycle: Python hot spots and time waiting on git")
+    print("  --profile-out PREFIX                  # Write PREFIX.collapsed (flamegraph) and PREFIX.txt")
+    print("                                        # (default: ~/.auto-committer/profiles/cycle-TIMESTAMP)")
+    print(f"  --profile-top N                       # Functions in the text summary (default: {TOP_FUNCTIONS})")
+    print("Maintenance options:")
+    print("  --maintain                            # Maintain the repository after each cycle when it pays off")
+    print("  --maintain-now                        # Maintain the repository now and exit (with --schedule-async:")
+    print("                                        # on its own cron schedule instead of running cycles)")
+    print("  --maintain-thresholds commits=N,loose=N,packs=N")
+    print("                                        # When each step is due (default: commits=1000,loose=1000,packs=10)")
+    print("  --maintain-force                      # With --maintain-now: run every step regardless of thresholds")
+    print("Timeline options:")
+    print("  --per-day N|MIN-MAX                   # Base commits per day (default: 1-5)")
+    print("  --weekdays 1,1,1,1,1,0.3,0            # Weights Mon..Sun, or e.g. sat=0.3,sun=0")
+    print("  --jitter FRACTION                     # Randomly vary each day's count by up to +/- FRACTION")
+    print("  --hours START-END                     # Hours of the day commits fall into (default: 9-18)")
+    print("  --seed N                              # Reproducible timeline")
+
+def parse_args(argv):
+    """Parse command line options"""
+    from branches import INTEGRATE_MODES
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--run-now', action='store_true')
+    parser.add_argument('--schedule', action='store_true')
+    parser.add_argument('--engine', choices=ENGINES, default='subprocess')
+    parser.add_argument('--fsync', choices=FSYNC_POLICIES, default='cycle')
+    parser.add_argument('--stage-all', action='store_true')
+    parser.add_argument('--push-every', type=int, default=0)
+    parser.add_argument('--push-interval', type=float, default=0)
+    parser.add_argument('--push-retries', type=int, default=DEFAULT_RETRIES)
+    parser.add_argument('--push-chunk', type=int, default=DEFAULT_CHUNK_COMMITS)
+    parser.add_argument('--no-rebase', action='store_true')
+    parser.add_argument('--delay', type=float, default=0)
+    parser.add_argument('--schedule-async', action='store_true')
+    parser.add_argument('--cron', action='append')
+    parser.add_argument('--overlap', default='skip')
+    parser.add_argument('--metrics-log')
+    parser.add_argument('--fresh', action='store_true')
+    parser.add_argument('--rotate')
+    parser.add_argument('--content')
+    parser.add_argument('--files')
+    parser.add_argument('--timeline', nargs=2, metavar=('START', 'END'))
+    parser.add_argument('--per-day', default='1-5')
+    parser.add_argument('--weekdays')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--hours', default='9-18')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--metrics-port', type=int)
+    parser.add_argument('--via-daemon', action='store_true')
+    parser.add_argument('--branches')
+    parser.add_argument('--branch-commits', type=int, default=150)
+    parser.add_argument('--jobs', type=int)
+    parser.add_argument('--integrate', choices=INTEGRATE_MODES, default='none')
+    parser.add_argument('--on-busy', choices=BUSY_POLICIES, default='wait')
+    parser.add_argument('--lock-timeout', type=float, default=0)
+    parser.add_argument('--maintain', action='store_true')
+    parser.add_argument('--maintain-now', action='store_true')
+    parser.add_argument('--maintain-thresholds')
+    parser.add_argument('--maintain-force', action='store_true')
+    parser.add_argument('--sparse-worktree', action='store_true')
+    parser.add_argument('--worktree-branch')
+    parser.add_argument('--profile', action='store_true')
+    parser.add_argument('--profile-out')
+    parser.add_argument('--profile-top', type=int, default=TOP_FUNCTIONS)
+    return parser.parse_known_args(argv)
+
+def cycle_args(args):
+    """Rebuild the cycle options so a scheduled child process runs the same way"""
+    forwarded = ['--engine', args.engine, '--fsync', args.fsync,
+                 '--push-every', str(args.push_every),
+                 '--push-interval', str(args.push_interval),
+                 '--push-retries', str(args.push_retries),
+                 '--push-chunk', str(args.push_chunk),
+                 '--delay', str(args.delay),
+                 '--on-busy', args.on_busy, '--lock-timeout', str(args.lock_timeout)]
+    if args.stage_all:
+        forwarded.append('--stage-all')
+    if args.no_rebase:
+        forwarded.append('--no-rebase')
+    if args.metrics_log:
+        forwarded += ['--metrics-log', os.path.abspath(args.metrics_log)]
+    if args.rotate:
+        forwarded += ['--rotate', args.rotate]
+    if args.content:
+        forwarded += ['--content', args.content]
+    if args.files:
+        forwarded += ['--files', args.files]
+    if args.maintain:
+        forwarded.append('--maintain')
+    if args.maintain_thresholds:
+        forwarded += ['--maintain-thresholds', args.maintain_thresholds]
+    if args.maintain_force:
+        forwarded.append('--maintain-force')
+    if args.sparse_worktree:
+        forwarded.append('--sparse-worktree')
+    if args.worktree_branch:
+        forwarded += ['--worktree-branch', args.worktree_branch]
+    return forwarded
+
+def prepare_sparse_worktree(host_dir, generator, branch=None, extra=(), log=print):
+    """Create or reuse the sparse worktree holding the generator's target files; returns its path"""
+    paths = generator.targets() or ['changes.txt']
+    return SparseWorktree(host_dir, SparseWorktree.dirs_for(paths, extra), branch, log=log).prepare()
+
+def run_via_daemon(committer, args):
+    """Hand the cycle to the background daemon (starting it if needed) and print its log"""
+    try:
+        client = ensure_daemon()
+        run = client.start_run(repo=committer.repo_dir, commits=committer.max_commits,
+                               engine=args.engine, fsync=args.fsync, stage_all=args.stage_all,
+                               push_every=args.push_every, push_interval=args.push_interval,
+                               push_retries=args.push_retries, push_chunk=args.push_chunk,
+                               rebase=not args.no_rebase, content=args.content, files=args.files,
+                               maintain=args.maintain, maintain_thresholds=args.maintain_thresholds,
+                               on_busy=args.on_busy, lock_timeout=args.lock_timeout,
+                               delay=args.delay, rotate=args.rotate, fresh=args.fresh)
+        print(f"Run #{run['id']} started in the daemon at {client.url}")
+        run = follow_run(client, run['id'])
+        print(f"Run #{run['id']} {run['status']}: {run['committed']} commits, {run['pending']} pending push")
+    except DaemonError as e:
+        print(f"Daemon error: {e}")
 
 def main():
     """Main function"""
-    committer = AutoCommitter()
+    args, unknown = parse_args(sys.argv[1:])
+    push_policy = PushPolicy(every_commits=args.push_every,
+                             every_seconds=args.push_interval)
+    try:
+        rotation = RotationPolicy.parse(args.rotate) if args.rotate else None
+    except ValueError as e:
+        print(f"Invalid --rotate: {e}")
+        return
+    try:
+        generator = parse_generator(args.content, args.files)
+    except ValueError as e:
+        print(f"Invalid --content/--files: {e}")
+        return
+    repo_dir = None
+    if args.sparse_worktree and not args.branches:
+        # Cycles run in the worktree; this script's own checkout only hosts it
+        # Rotation archives and timeline months both go to changes/
+        extra = [ARCHIVE_DIR] if args.rotate or args.timeline else []
+        try:
+            repo_dir = prepare_sparse_worktree(os.path.dirname(os.path.abspath(__file__)), generator,
+                                               args.worktree_branch, extra)
+        except (WorktreeError, OSError) as e:
+            print(f"Sparse worktree unavailable: {e}")
+            return
+    elif args.sparse_worktree:
+        print("--branches writes its chains without a checkout; --sparse-worktree does not apply")
+        return
+    metrics = Metrics(args.metrics_log)
+    committer = AutoCommitter(engine=args.engine, fsync=args.fsync,
+                              stage_all=args.stage_all, push_policy=push_policy,
+                              commit_delay=args.delay, metrics=metrics, repo_dir=repo_dir,
+                              resume=not args.fresh, rotation=rotation, generator=generator)
+    if args.push_retries < 0 or args.push_chunk < 0:
+        print("--push-retries and --push-chunk must not be negative")
+        return
+    committer.pusher.retries = args.push_retries
+    committer.pusher.chunk_commits = args.push_chunk
+    committer.pusher.rebase = not args.no_rebase
+    if args.lock_timeout < 0:
+        print("--lock-timeout must not be negative")
+        return
+    committer.on_busy = args.on_busy
+    committer.lock_timeout = args.lock_timeout or None
+    if args.maintain or args.maintain_now:
+        try:
+            thresholds = parse_thresholds(args.maintain_thresholds or '')
+        except ValueError as e:
+            print(f"Invalid --maintain-thresholds: {e}")
+            return
+        committer.maintenance = RepoMaintenance(committer.backend, thresholds, log=committer.log)
+    if args.profile and (args.schedule or args.schedule_async or args.via_daemon):
+        # Scheduled and daemon cycles run in other processes
+        print("--profile profiles a cycle in this process: use it with --run-now, --timeline, "
+              "--branches or --maintain-now")
+        return
+    if args.profile_top < 1:
+        print("--profile-top must be at least 1")
+        return
     
     if len(sys.argv) > 1:
-        if sys.argv[1] == "--run-now":
-            # Run immediately for testing
-            committer.run_commit_cycle()
-        elif sys.argv[1] == "--schedule":
-            # Run with scheduler
-            committer.setup_scheduler()
-        else:
-            print("Usage:")
-            print("  python auto_committer.py --run-now    # Run immediately")
-            print("  python auto_committer.py --schedule   # Run with daily scheduler")
+        server = None
+        if args.metrics_port and not unknown:
+            if args.schedule_async:
+                print("--metrics-port is not available with --schedule-async (cycles run in child processes)")
+            else:
+                server = MetricsServer(metrics, args.metrics_port).start()
+                print(f"Serving metrics at {server.url}")
+        profiler = CycleProfiler(log=committer.log).start() if args.profile and not unknown else None
+        
+        try:
+            if unknown:
+                print_usage()
+            elif args.run_now and args.via_daemon:
+                # Thin client: the daemon runs the cycle, this process only follows it
+                run_via_daemon(committer, args)
+            elif args.run_now:
+                # Run immediately for testing
+                committer.run_commit_cycle()
+            elif args.maintain_now and not args.schedule_async:
+                # Maintenance on its own, e.g. from cron or --schedule-async --maintain-now
+                committer.run_maintenance(force=args.maintain_force)
+            elif args.schedule:
+                # Run with scheduler
+                committer.setup_scheduler()
+            elif args.schedule_async:
+                # Run with the asyncio cron scheduler (--overlap is checked by the scheduler)
+                try:
+                    action = '--maintain-now' if args.maintain_now else '--run-now'
+                    committer.setup_async_scheduler(args.cron or ['0 6 * * *'], args.overlap,
+                                                    cycle_args(args), action)
+                except ValueError as e:
+                    print(f"Invalid schedule: {e}")
+            elif args.branches:
+                # Independent chains on several branches, one worker process each
+                from branches import parse_branches
+                try:
+                    branches = parse_branches(args.branches)
+                    if args.branch_commits < 1:
+                        raise ValueError("--branch-commits must be at least 1")
+                    committer.run_branch_cycle(branches, args.branch_commits, args.jobs, args.integrate)
+                except ValueError as e:
+                    print(f"Invalid branches: {e}")
+            elif args.timeline:
+                # Generate a backdated history in one pass
+                try:
+                    timestamps = generate_timeline(
+                        parse_date(args.timeline[0]), parse_date(args.timeline[1]),
+                        per_day=parse_range(args.per_day),
+                        weekday_weights=parse_weights(args.weekdays) if args.weekdays else None,
+                        jitter=args.jitter, hours=parse_range(args.hours), seed=args.seed)
+                except ValueError as e:
+                    print(f"Invalid timeline: {e}")
+                    return
+                committer.run_commit_cycle(timestamps)
+            else:
+                print_usage()
+        finally:
+            if profiler is not None:
+                profiler.report(args.profile_out, args.profile_top)
+            if server is not None:
+                server.stop()
+            metrics.close()
     else:
         print("Auto-Committer Script")
         print("This script modifies changes.txt 25 times and commits each change to GitHub.")
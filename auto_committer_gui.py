@@ -6,48 +6,99 @@ A GUI version of the auto-committer script with selectable commit counts.
 
 import os
 import sys
-import time
-import random
-import subprocess
+import queue
+import argparse
 import threading
 from datetime import datetime
-import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from auto_committer import ENGINES, AutoCommitter, prepare_sparse_worktree
+from content_generators import parse_generator
+from push_policy import PushPolicy
+from object_writer import ObjectStoreError, find_git_dir
+from profiler import CycleProfiler
+from sparse_worktree import WorktreeError
+from daemon_client import DaemonError, ensure_daemon
+
+# AutoCommitter settings the window and headless mode make, kept when the checkout changes
+COMMITTER_SETTINGS = ('engine', 'fsync', 'stage_all', 'push_policy', 'commit_delay', 'generator')
+
+# Log lines and progress are handed to the Tk thread in batches at this interval
+UI_POLL_MS = 100
+# The log widget keeps only the newest lines; "Save full log" keeps everything on disk
+MAX_LOG_LINES = 2000
+
+# tkinter is imported by load_tk() when a window is actually opened, so the
+# headless and daemon entry points start without it
+tk = ttk = messagebox = scrolledtext = None
+
+
+def load_tk():
+    """Import tkinter and the widgets the window uses"""
+    global tk, ttk, messagebox, scrolledtext
+    if tk is None:
+        import tkinter as tk
+        from tkinter import ttk, messagebox, scrolledtext
 
 class AutoCommitterCore:
-    """Core logic for the auto-committer, separated from GUI"""
+    """The window's (and headless mode's) front end to auto_committer.AutoCommitter
+    
+    Settings are made on `committer` before a run; the cycle itself (commits,
+    pushes, run lock, journal) is the CLI's. This class only finds the project,
+    switches to the sparse worktree and profiles the run.
+    """
     
-    def __init__(self, progress_callback=None, log_callback=None):
+    def __init__(self, progress_callback=None, log_callback=None, project_dir=None, backend=None):
         # For executable, we need to find the actual project directory
-        if getattr(sys, 'frozen', False):
+        if backend is not None and not project_dir:
+            # In-memory repository (tests, capacity estimates)
+            self.project_dir = backend.repo_dir
+        elif project_dir:
+            # Explicit repository (benchmarks, other front ends)
+            self.project_dir = os.path.abspath(project_dir)
+        elif getattr(sys, 'frozen', False):
             # Running as executable - look for git repo in current working directory
             self.project_dir = os.getcwd()
-            # If no .git found, try the directory where the exe is located
+            # If no .git found, try the directory where the exe is located, then
+            # its parent (a onedir build is a folder copied into the project)
             if not os.path.exists(os.path.join(self.project_dir, '.git')):
-                self.project_dir = os.path.dirname(sys.executable)
+                exe_dir = os.path.dirname(sys.executable)
+                parent_dir = os.path.dirname(exe_dir)
+                if (not os.path.exists(os.path.join(exe_dir, '.git'))
+                        and os.path.exists(os.path.join(parent_dir, '.git'))):
+                    exe_dir = parent_dir
+                self.project_dir = exe_dir
         else:
             # Running as script
             self.project_dir = os.path.dirname(os.path.abspath(__file__))
         
-        self.script_path = os.path.abspath(__file__)
-        self.target_file = os.path.join(self.project_dir, 'changes.txt')
-        self.commit_count = 0
-        self.max_commits = 100
+        # The checkout found above; project_dir moves to the sparse worktree when one is used
+        self.host_dir = self.project_dir
         self.progress_callback = progress_callback
         self.log_callback = log_callback
+        self.committer = self.build_committer(self.project_dir, backend)
+        # Commits made by the last run
+        self.commit_count = 0
         self.is_running = False
-        
+        # Profile each run (profiler.py); files go to profile_prefix or ~/.auto-committer/profiles
+        self.profile = False
+        self.profile_prefix = None
+        # Commit in a dedicated sparse worktree of host_dir (sparse_worktree.py), pushing to worktree_branch
+        self.sparse_worktree = False
+        self.worktree_branch = None
+        
+    def build_committer(self, repo_dir, backend=None, metrics=None):
+        """An AutoCommitter for repo_dir that reports to this front end's callbacks"""
+        return AutoCommitter(repo_dir=repo_dir, backend=backend, metrics=metrics,
+                             log_callback=self.log_callback, progress_callback=self.progress_callback)
+    
     def log(self, message):
-        """Log a message"""
-        print(message)
-        if self.log_callback:
-            self.log_callback(message)
+        """Log a message through the committer"""
+        self.committer.log(message)
     
     def get_startup_info(self):
         """Get startup information about the current environment"""
         info = []
         info.append(f"Working directory: {self.project_dir}")
-        info.append(f"Target file: {self.target_file}")
+        info.append(f"Target file: {self.committer.base_target}")
         
         # Check git status
         git_dir = os.path.join(self.project_dir, '.git')
@@ -57,135 +108,83 @@ class AutoCommitterCore:
             info.append("❌ No git repository found")
         
         # Check if changes.txt exists
-        if os.path.exists(self.target_file):
+        if os.path.exists(self.committer.base_target):
             info.append("✅ changes.txt file found")
         else:
             info.append("📝 changes.txt will be created")
         
         return "\n".join(info)
     
-    def update_progress(self, current, total):
-        """Update progress"""
-        if self.progress_callback:
-            self.progress_callback(current, total)
+    def set_project_dir(self, path):
+        """Commit in another checkout from the next run on, with the same settings"""
+        previous = self.committer
+        self.project_dir = path
+        self.committer = self.build_committer(path, metrics=previous.metrics)
+        for name in COMMITTER_SETTINGS:
+            setattr(self.committer, name, getattr(previous, name))
     
-    def modify_target_file(self):
-        """Modify the changes.txt file by adding a timestamp line"""
-        try:
-            # Read existing content
-            if os.path.exists(self.target_file):
-                with open(self.target_file, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-            else:
-                content = "change me multiple times."
-            
-            # Add a timestamp line
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            random_num = random.randint(1000, 9999)
-            new_line = f"Change #{self.commit_count + 1}: {timestamp} - Random: {random_num}"
-            
-            # Append the new line
-            modified_content = content + "\n" + new_line
-            
-            with open(self.target_file, 'w', encoding='utf-8') as f:
-                f.write(modified_content)
-                
-            self.log(f"Modified changes.txt (change #{self.commit_count + 1})")
+    def select_checkout(self):
+        """Use the sparse worktree or the host checkout, as sparse_worktree says; False if unavailable"""
+        if not self.sparse_worktree:
+            if self.project_dir != self.host_dir:
+                self.set_project_dir(self.host_dir)
             return True
-            
-        except Exception as e:
-            self.log(f"Error modifying changes.txt: {e}")
+        if self.project_dir != self.host_dir:
+            return True
+        if self.committer.backend.in_memory:
+            self.log("The in-memory backend has no worktrees")
             return False
-    
-    def commit_and_push(self):
-        """Commit changes and push to GitHub"""
         try:
-            # Check if we're in a git repository
-            if not os.path.exists(os.path.join(self.project_dir, '.git')):
-                self.log(f"Error: No git repository found in {self.project_dir}")
-                self.log("Please run the executable from your project directory or copy it there.")
-                return False
-            
-            # Add changes to git
-            result = subprocess.run(['git', 'add', '.'], 
-                                  capture_output=True, text=True, cwd=self.project_dir)
-            if result.returncode != 0:
-                self.log(f"Git add failed: {result.stderr}")
-                return False
-            
-            # Commit changes
-            commit_message = f"Auto-commit #{self.commit_count + 1}: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-            result = subprocess.run(['git', 'commit', '-m', commit_message], 
-                                  capture_output=True, text=True, cwd=self.project_dir)
-            if result.returncode != 0:
-                self.log(f"Git commit failed: {result.stderr}")
-                return False
-            
-            # Push to GitHub
-            result = subprocess.run(['git', 'push'], 
-                                  capture_output=True, text=True, cwd=self.project_dir)
-            if result.returncode != 0:
-                self.log(f"Git push failed: {result.stderr}")
-                return False
-            
-            self.log(f"Successfully committed and pushed change #{self.commit_count + 1}")
-            return True
-            
-        except Exception as e:
-            self.log(f"Error in commit_and_push: {e}")
+            path = prepare_sparse_worktree(self.host_dir, self.committer.generator, self.worktree_branch,
+                                           log=self.log)
+        except (WorktreeError, OSError) as e:
+            self.log(f"Sparse worktree unavailable: {e}")
             return False
+        self.set_project_dir(path)
+        return True
     
     def run_commits(self, num_commits):
-        """Run the specified number of commits"""
-        self.max_commits = num_commits
+        """Run one cycle of num_commits commits, profiled when self.profile is set"""
         self.commit_count = 0
         self.is_running = True
-        
-        self.log(f"Starting auto-commit process for {num_commits} commits...")
-        
-        for i in range(num_commits):
-            if not self.is_running:  # Allow stopping
-                self.log("Process stopped by user")
-                break
-                
-            self.log(f"\n--- Commit {i + 1}/{num_commits} ---")
-            
-            # Modify the target file
-            if not self.modify_target_file():
-                self.log("Failed to modify file, stopping...")
-                break
-            
-            # Commit and push
-            if not self.commit_and_push():
-                self.log("Failed to commit/push, stopping...")
-                break
-            
-            self.commit_count += 1
-            self.update_progress(self.commit_count, num_commits)
-            
-            # Wait a bit between commits (optional)
-            if i < num_commits - 1:  # Don't wait after the last commit
-                self.log("Waiting 2 seconds before next commit...")
-                time.sleep(2)
-        
-        self.is_running = False
-        if self.commit_count == num_commits:
-            self.log(f"\n✅ Successfully completed all {num_commits} commits!")
-        else:
-            self.log(f"\n⚠️ Completed {self.commit_count}/{num_commits} commits")
+        try:
+            if not self.select_checkout():
+                return
+            self.committer.max_commits = num_commits
+            if not self.profile:
+                self.commit_count = self.committer.run_commit_cycle()
+                return
+            profiler = CycleProfiler(log=self.log).start()
+            try:
+                self.commit_count = self.committer.run_commit_cycle()
+            finally:
+                profiler.report(self.profile_prefix)
+        finally:
+            self.is_running = False
     
     def stop(self):
-        """Stop the commit process"""
-        self.is_running = False
+        """Stop after the current commit; pending commits are still pushed"""
+        if self.is_running:
+            self.committer.request_stop()
 
 
 class AutoCommitterGUI:
     def __init__(self, root):
+        load_tk()
         self.root = root
         self.root.title("Auto-Committer GUI")
-        self.root.geometry("600x500")
+        self.root.geometry("820x540")
         self.root.resizable(True, True)
         
+        # Worker threads only enqueue; the Tk thread drains on a timer
+        self.log_queue = queue.SimpleQueue()
+        self.pending_progress = None
+        self.progress_lock = threading.Lock()
+        self.spill_path = None
+        self.commit_thread = None
+        # (client, run id) while a run is driven through the background daemon
+        self.daemon_run = None
+        
         # Initialize core
         self.core = AutoCommitterCore(
             progress_callback=self.update_progress,
@@ -193,6 +192,7 @@ class AutoCommitterGUI:
         )
         
         self.setup_ui()
+        self.root.after(UI_POLL_MS, self.drain_ui_updates)
         
     def setup_ui(self):
         """Setup the user interface"""
@@ -204,7 +204,7 @@ class AutoCommitterGUI:
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
         main_frame.columnconfigure(1, weight=1)
-        main_frame.rowconfigure(3, weight=1)
+        main_frame.rowconfigure(4, weight=1)
         
         # Title
         title_label = ttk.Label(main_frame, text="Auto-Committer", 
@@ -241,23 +241,68 @@ class AutoCommitterGUI:
         self.stop_button = ttk.Button(button_frame, text="Stop", command=self.stop_commits, state=tk.DISABLED)
         self.stop_button.pack(side=tk.LEFT, padx=5)
         
+        # Options
+        ttk.Label(main_frame, text="Options:").grid(row=3, column=0, sticky=tk.W, pady=5)
+        options_frame = ttk.Frame(main_frame)
+        options_frame.grid(row=3, column=1, columnspan=2, sticky=(tk.W, tk.E), pady=5)
+        
+        self.stage_all_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="Stage all files (git add .)",
+                        variable=self.stage_all_var).pack(side=tk.LEFT, padx=5)
+        self.sparse_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="Sparse worktree",
+                        variable=self.sparse_var).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(options_frame, text="Engine").pack(side=tk.LEFT, padx=(10, 2))
+        self.engine_var = tk.StringVar(value='subprocess')
+        ttk.Combobox(options_frame, textvariable=self.engine_var, values=ENGINES,
+                     state='readonly', width=10).pack(side=tk.LEFT)
+        
+        ttk.Label(options_frame, text="Push every").pack(side=tk.LEFT, padx=(10, 2))
+        self.push_every_entry = ttk.Entry(options_frame, width=5)
+        self.push_every_entry.pack(side=tk.LEFT)
+        self.push_every_entry.insert(0, "1")
+        ttk.Label(options_frame, text="commits").pack(side=tk.LEFT, padx=2)
+        
+        ttk.Label(options_frame, text="or every").pack(side=tk.LEFT, padx=(10, 2))
+        self.push_interval_entry = ttk.Entry(options_frame, width=5)
+        self.push_interval_entry.pack(side=tk.LEFT)
+        self.push_interval_entry.insert(0, "0")
+        ttk.Label(options_frame, text="s (0 and 0 = at end)").pack(side=tk.LEFT, padx=2)
+        
+        ttk.Label(options_frame, text="Delay (s)").pack(side=tk.LEFT, padx=(10, 2))
+        self.delay_entry = ttk.Entry(options_frame, width=5)
+        self.delay_entry.pack(side=tk.LEFT)
+        self.delay_entry.insert(0, "2")
+        
         # Progress bar
-        ttk.Label(main_frame, text="Progress:").grid(row=3, column=0, sticky=(tk.W, tk.N), pady=(20, 5))
+        ttk.Label(main_frame, text="Progress:").grid(row=4, column=0, sticky=(tk.W, tk.N), pady=(20, 5))
         self.progress = ttk.Progressbar(main_frame, mode='determinate')
-        self.progress.grid(row=3, column=1, columnspan=2, sticky=(tk.W, tk.E, tk.N), pady=(20, 5))
+        self.progress.grid(row=4, column=1, columnspan=2, sticky=(tk.W, tk.E, tk.N), pady=(20, 5))
         
         # Progress label
         self.progress_label = ttk.Label(main_frame, text="Ready to start")
-        self.progress_label.grid(row=4, column=1, columnspan=2, sticky=(tk.W, tk.N))
+        self.progress_label.grid(row=5, column=1, columnspan=2, sticky=(tk.W, tk.N))
         
         # Log area
-        ttk.Label(main_frame, text="Log:").grid(row=5, column=0, sticky=(tk.W, tk.N), pady=(20, 5))
+        ttk.Label(main_frame, text="Log:").grid(row=6, column=0, sticky=(tk.W, tk.N), pady=(20, 5))
+        log_options = ttk.Frame(main_frame)
+        log_options.grid(row=6, column=1, columnspan=2, sticky=(tk.W, tk.S), pady=(20, 5))
+        self.spill_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(log_options, text=f"Save full log to file (window keeps the last {MAX_LOG_LINES} lines)",
+                        variable=self.spill_var).pack(side=tk.LEFT)
+        self.daemon_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(log_options, text="Run in background daemon",
+                        variable=self.daemon_var).pack(side=tk.LEFT, padx=(10, 0))
+        self.profile_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(log_options, text="Profile the run",
+                        variable=self.profile_var).pack(side=tk.LEFT, padx=(10, 0))
         
         self.log_text = scrolledtext.ScrolledText(main_frame, height=15, width=70)
-        self.log_text.grid(row=6, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5)
+        self.log_text.grid(row=7, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5)
         
         # Configure text area to expand
-        main_frame.rowconfigure(6, weight=1)
+        main_frame.rowconfigure(7, weight=1)
         
         # Show startup information
         self.show_startup_info()
@@ -273,6 +318,20 @@ class AutoCommitterGUI:
         else:
             return int(self.commit_var.get())
     
+    def get_push_settings(self):
+        """Get the push cadence (commits, seconds) and delay between commits"""
+        try:
+            push_every = int(self.push_every_entry.get())
+            push_interval = float(self.push_interval_entry.get())
+            delay = float(self.delay_entry.get())
+        except ValueError:
+            messagebox.showerror("Error", "Push cadence and delay must be numbers")
+            return None
+        if push_every < 0 or push_interval < 0 or delay < 0:
+            messagebox.showerror("Error", "Push cadence and delay must not be negative")
+            return None
+        return push_every, push_interval, delay
+    
     def start_commits(self):
         """Start the commit process"""
         commit_count = self.get_commit_count()
@@ -283,46 +342,152 @@ class AutoCommitterGUI:
             messagebox.showerror("Error", "Number of commits must be greater than 0")
             return
         
+        push_settings = self.get_push_settings()
+        if push_settings is None:
+            return
+        
         # Update UI state
         self.start_button.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.NORMAL)
         self.progress['value'] = 0
         self.progress['maximum'] = commit_count
         self.log_text.delete(1.0, tk.END)
+        self.spill_path = None
+        if self.spill_var.get():
+            # Inside the git directory so 'Stage all files' never commits it
+            try:
+                log_dir = os.path.join(find_git_dir(self.core.project_dir), 'autocommit-logs')
+            except ObjectStoreError:
+                log_dir = os.path.join(self.core.project_dir, 'autocommit-logs')
+            os.makedirs(log_dir, exist_ok=True)
+            self.spill_path = os.path.join(log_dir, f"auto-committer-{datetime.now():%Y%m%d-%H%M%S}.log")
+            self.log_message(f"Full log: {self.spill_path}")
+        if self.daemon_var.get():
+            if self.profile_var.get():
+                self.log_message("Profiling is not available for daemon runs (they run in another process)")
+            # The daemon runs the cycle; this window only follows it and survives being closed
+            options = {'repo': self.core.project_dir, 'commits': commit_count,
+                       'engine': self.engine_var.get(), 'stage_all': self.stage_all_var.get(),
+                       'push_every': push_settings[0], 'push_interval': push_settings[1],
+                       'delay': push_settings[2]}
+            self.core.sparse_worktree = self.sparse_var.get()
+            self.commit_thread = threading.Thread(target=self.run_via_daemon, args=(options,))
+            self.commit_thread.daemon = True
+            self.commit_thread.start()
+            return
+        
+        committer = self.core.committer
+        committer.stage_all = self.stage_all_var.get()
+        committer.engine = self.engine_var.get()
+        committer.push_policy = PushPolicy(every_commits=push_settings[0], every_seconds=push_settings[1])
+        committer.commit_delay = push_settings[2]
+        self.core.profile = self.profile_var.get()
+        self.core.sparse_worktree = self.sparse_var.get()
         
         # Start in a separate thread to avoid blocking the GUI
         self.commit_thread = threading.Thread(target=self.core.run_commits, args=(commit_count,))
         self.commit_thread.daemon = True
         self.commit_thread.start()
     
+    def run_via_daemon(self, options):
+        """Start a run in the background daemon and relay its events (worker thread)"""
+        try:
+            # The daemon commits in the sparse worktree too when it is ticked
+            if not self.core.select_checkout():
+                return
+            options['repo'] = self.core.project_dir
+            client = ensure_daemon()
+            run = client.start_run(**options)
+            self.daemon_run = (client, run['id'])
+            self.log_message(f"Run #{run['id']} started in the daemon at {client.url}")
+            for event in client.events(run['id']):
+                if event['type'] == 'log':
+                    self.log_message(event['message'])
+                elif event['type'] == 'progress':
+                    self.update_progress(event['done'], event['total'], event['pending'])
+                elif event['type'] == 'end':
+                    run = event['run']
+                    self.update_progress(run['done'], run['total'], run['pending'])
+                    self.log_message(f"Run #{run['id']} {run['status']}: {run['committed']} commits")
+        except DaemonError as e:
+            self.log_message(f"Daemon error: {e}")
+        finally:
+            self.daemon_run = None
+    
     def stop_commits(self):
         """Stop the commit process"""
-        self.core.stop()
+        if self.daemon_run is not None:
+            client, run_id = self.daemon_run
+            # Off the Tk thread; the run's own events report when it has stopped
+            threading.Thread(target=self.stop_daemon_run, args=(client, run_id), daemon=True).start()
+        else:
+            self.core.stop()
         self.start_button.config(state=tk.NORMAL)
         self.stop_button.config(state=tk.DISABLED)
         self.log_message("Stopping process...")
     
-    def update_progress(self, current, total):
-        """Update the progress bar"""
-        self.root.after(0, lambda: self._update_progress_ui(current, total))
+    def stop_daemon_run(self, client, run_id):
+        """Ask the daemon to stop a run (worker thread)"""
+        try:
+            client.stop_run(run_id)
+        except DaemonError as e:
+            self.log_message(f"Daemon error: {e}")
+    
+    def update_progress(self, current, total, pending=0):
+        """Update the progress bar (only the latest value is drawn on the next tick)"""
+        with self.progress_lock:
+            self.pending_progress = (current, total, pending)
     
-    def _update_progress_ui(self, current, total):
+    def _update_progress_ui(self, current, total, pending=0):
         """Update progress bar in main thread"""
         self.progress['value'] = current
-        self.progress_label.config(text=f"{current}/{total} commits completed")
+        self.progress_label.config(text=f"{current}/{total} commits completed, {pending} pending push")
         
         if current >= total:
             self.start_button.config(state=tk.NORMAL)
             self.stop_button.config(state=tk.DISABLED)
     
     def log_message(self, message):
-        """Add a message to the log"""
-        self.root.after(0, lambda: self._log_message_ui(message))
+        """Add a message to the log (safe to call from any thread)"""
+        self.log_queue.put(message)
     
-    def _log_message_ui(self, message):
-        """Add message to log in main thread"""
-        self.log_text.insert(tk.END, message + "\n")
-        self.log_text.see(tk.END)
+    def drain_ui_updates(self):
+        """Render queued log lines and the latest progress in one batch, then reschedule"""
+        lines = []
+        try:
+            while True:
+                lines.append(self.log_queue.get_nowait())
+        except queue.Empty:
+            pass
+        
+        if lines:
+            if self.spill_path:
+                try:
+                    with open(self.spill_path, 'a', encoding='utf-8') as f:
+                        f.write("\n".join(lines) + "\n")
+                except OSError as e:
+                    self.spill_path = None
+                    lines.append(f"Could not write the full log: {e}")
+            # Lines that would be trimmed right away are never inserted
+            self.log_text.insert(tk.END, "\n".join(lines[-MAX_LOG_LINES:]) + "\n")
+            # Keep the widget bounded by dropping the oldest lines
+            excess = int(self.log_text.index('end-1c').split('.')[0]) - MAX_LOG_LINES
+            if excess > 0:
+                self.log_text.delete('1.0', f"{excess + 1}.0")
+            self.log_text.see(tk.END)
+        
+        with self.progress_lock:
+            progress, self.pending_progress = self.pending_progress, None
+        if progress is not None:
+            self._update_progress_ui(*progress)
+        
+        # A run that ended early (failure, stop) never reaches total; re-enable Start here
+        if self.commit_thread is not None and not self.commit_thread.is_alive():
+            self.commit_thread = None
+            self.start_button.config(state=tk.NORMAL)
+            self.stop_button.config(state=tk.DISABLED)
+        
+        self.root.after(UI_POLL_MS, self.drain_ui_updates)
     
     def show_startup_info(self):
         """Display startup information in the log"""
@@ -333,12 +498,111 @@ class AutoCommitterGUI:
         self.log_text.see(tk.END)
 
 
+def parse_args(argv):
+    """Parse command line options (none are needed to open the window)"""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--headless', action='store_true')
+    parser.add_argument('--daemon', action='store_true')
+    parser.add_argument('--info', action='store_true')
+    parser.add_argument('--startup-check', action='store_true')
+    parser.add_argument('--commits', type=int, default=10)
+    parser.add_argument('--engine', choices=ENGINES, default='subprocess')
+    parser.add_argument('--stage-all', action='store_true')
+    parser.add_argument('--push-every', type=int, default=1)
+    parser.add_argument('--push-interval', type=float, default=0)
+    parser.add_argument('--delay', type=float, default=2)
+    parser.add_argument('--content')
+    parser.add_argument('--profile', action='store_true')
+    parser.add_argument('--profile-out')
+    parser.add_argument('--sparse-worktree', action='store_true')
+    parser.add_argument('--worktree-branch')
+    return parser.parse_known_args(argv)
+
+
+def print_usage():
+    """Print command line usage"""
+    print("Usage:")
+    print("  python auto_committer_gui.py                     # Open the window")
+    print("  python auto_committer_gui.py --headless [--commits N] [--engine E] [--push-every N]")
+    print("                                                   [--push-interval S] [--delay S] [--stage-all]")
+    print("                                                   [--content SPEC]")
+    print("                                                   [--profile [--profile-out PREFIX]]")
+    print("                                                   [--sparse-worktree [--worktree-branch NAME]]")
+    print("                                                   # Same commits without a window (no tkinter)")
+    print("  python auto_committer_gui.py --headless --info   # Print the startup check and exit")
+    print("  python auto_committer_gui.py --daemon            # Serve the background daemon")
+    print("  python auto_committer_gui.py --startup-check     # Open the window, draw it once and exit")
+
+
+def run_headless(args):
+    """Run the GUI's commit settings from the console; tkinter is never imported"""
+    core = AutoCommitterCore()
+    print(core.get_startup_info())
+    if args.info:
+        return 0
+    if args.commits <= 0 or args.push_every < 0 or args.push_interval < 0 or args.delay < 0:
+        print("--commits must be positive; --push-every, --push-interval and --delay must not be negative")
+        return 1
+    try:
+        core.committer.generator = parse_generator(args.content)
+    except ValueError as e:
+        print(f"Invalid --content: {e}")
+        return 1
+    committer = core.committer
+    committer.stage_all = args.stage_all
+    committer.engine = args.engine
+    committer.push_policy = PushPolicy(every_commits=args.push_every, every_seconds=args.push_interval)
+    committer.commit_delay = args.delay
+    core.profile = args.profile
+    core.profile_prefix = args.profile_out
+    core.sparse_worktree = args.sparse_worktree
+    core.worktree_branch = args.worktree_branch
+    
+    finished = threading.Event()
+    
+    def work():
+        try:
+            core.run_commits(args.commits)
+        finally:
+            finished.set()
+    
+    threading.Thread(target=work).start()
+    try:
+        # Not Thread.join: a Ctrl+C inside join can mark the worker stopped, and the
+        # interpreter would then exit without waiting for the final push
+        while not finished.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        # Finish the current commit and push what is pending, like the Stop button
+        core.stop()
+        finished.wait()
+    return 0 if core.commit_count == args.commits else 1
+
+
 def main():
     """Main function"""
+    args, unknown = parse_args(sys.argv[1:])
+    if unknown:
+        print_usage()
+        return 1
+    if args.daemon:
+        # The packaged executable doubles as the daemon (see daemon_client.daemon_command)
+        from daemon import serve
+        return serve()
+    if args.headless:
+        return run_headless(args)
+    
+    load_tk()
     root = tk.Tk()
     app = AutoCommitterGUI(root)
+    if args.startup_check:
+        # Used by benchmarks/bench_startup.py: time to a drawn window
+        root.update()
+        root.destroy()
+        return 0
     root.mainloop()
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
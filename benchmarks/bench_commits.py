@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Commit throughput benchmark
+Runs AutoCommitter.run_commit_cycle and AutoCommitterCore.run_commits against
+throwaway repositories for each engine and staging mode, and reports
+commits/sec, per-step latency percentiles and peak RSS as JSON.
+
+Every measurement runs in a fresh Python process so peak RSS is per run.
+
+    python benchmarks/bench_commits.py                       # N = 10, 100, 1000
+    python benchmarks/bench_commits.py --sizes 10 100 1000 10000 --remote -o results.json
+    python benchmarks/bench_commits.py --targets cli:pipeline cli:objects --sizes 1000
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_SIZES = (10, 100, 1000)
+# front end : engine[+stage-all]
+TARGETS = (
+    'cli:subprocess',
+    'cli:subprocess+stage-all',
+    'cli:pipeline',
+    'cli:objects',
+    'cli:pack',
+    'cli:fast-import',
+    'gui:subprocess',
+    'gui:pipeline',
+    'gui:objects',
+)
+STEPS = ('write', 'add', 'commit', 'push')
+
+
+def git(repo, *args):
+    subprocess.run(['git', *args], cwd=repo, check=True, capture_output=True)
+
+
+def make_repo(base_dir, with_remote):
+    """Create a throwaway repository (and optional bare remote) with one commit"""
+    repo = os.path.join(base_dir, 'repo')
+    os.makedirs(repo)
+    git(repo, 'init', '-q')
+    git(repo, 'config', 'user.name', 'Benchmark')
+    git(repo, 'config', 'user.email', 'bench@example.invalid')
+    git(repo, 'config', 'commit.gpgsign', 'false')
+    with open(os.path.join(repo, 'changes.txt'), 'w', encoding='utf-8') as f:
+        f.write("change me 100 times.")
+    git(repo, 'add', 'changes.txt')
+    git(repo, 'commit', '-q', '-m', 'Initial commit')
+
+    if with_remote:
+        remote = os.path.join(base_dir, 'remote.git')
+        git(base_dir, 'init', '-q', '--bare', remote)
+        git(repo, 'remote', 'add', 'origin', remote)
+        git(repo, 'push', '-q', '-u', 'origin', 'HEAD')
+    return repo
+
+
+def percentiles(samples):
+    """Return count, mean and p50/p90/p99/max in milliseconds"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+
+    def pick(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {
+        'count': len(ordered),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3),
+        'p50_ms': round(pick(0.50), 3),
+        'p90_ms': round(pick(0.90), 3),
+        'p99_ms': round(pick(0.99), 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+def timed(samples, step, func):
+    """Wrap `func` so each call's duration is appended to samples[step]"""
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            samples[step].append(time.perf_counter() - start)
+    return wrapper
+
+
+def instrument_backend(backend, samples):
+    """Time git add/update-index, commit and push going through GitBackend"""
+    run = backend.run
+    step_of = {'add': 'add', 'update-index': 'add', 'commit': 'commit', 'push': 'push'}
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return run(*args, **kwargs)
+        finally:
+            step = step_of.get(args[0])
+            if step:
+                samples[step].append(time.perf_counter() - start)
+
+    backend.run = wrapper
+    backend.commit_file = timed(samples, 'commit', backend.commit_file)
+
+
+def run_single(target, commits, repo):
+    """Run one measurement in this process and return its result dict"""
+    from git_backend import GitBackend
+    from object_writer import ObjectStore
+    from push_policy import PushPolicy
+
+    front_end, engine = target.split(':', 1)
+    stage_all = engine.endswith('+stage-all')
+    engine = engine.replace('+stage-all', '')
+    samples = {step: [] for step in STEPS}
+    has_remote = bool(subprocess.run(['git', 'remote'], cwd=repo, capture_output=True,
+                                     text=True).stdout.strip())
+
+    # Passed in rather than swapped in afterwards, so the pusher times its git calls too
+    backend = GitBackend(repo)
+    instrument_backend(backend, samples)
+    if front_end == 'cli':
+        from auto_committer import AutoCommitter
+        committer = AutoCommitter(engine=engine, stage_all=stage_all, repo_dir=repo, backend=backend,
+                                  max_commits=commits, log_callback=lambda message: None)
+    else:
+        # The GUI core drives the same AutoCommitter; only the front end differs
+        from auto_committer_gui import AutoCommitterCore
+        core = AutoCommitterCore(log_callback=lambda message: None, project_dir=repo, backend=backend)
+        committer = core.committer
+        committer.engine = engine
+        committer.stage_all = stage_all
+        committer.push_policy = PushPolicy()
+        committer.commit_delay = 0
+    if not has_remote:
+        committer.git_push_all = lambda: True
+
+    committer.modify_target_file = timed(samples, 'write', committer.modify_target_file)
+    if engine == 'objects':
+        committer.object_store = ObjectStore(repo)
+        committer.object_store.commit_file = timed(samples, 'commit',
+                                                   committer.object_store.commit_file)
+
+    start = time.perf_counter()
+    if front_end == 'cli':
+        committed = committer.run_commit_cycle()
+    else:
+        core.run_commits(commits)
+        committed = core.commit_count
+    elapsed = time.perf_counter() - start
+
+    result = {
+        'target': target,
+        'commits': commits,
+        'committed': committed,
+        'remote': has_remote,
+        'seconds': round(elapsed, 4),
+        'commits_per_sec': round(committed / elapsed, 2) if elapsed else None,
+        'steps': {step: percentiles(values) for step, values in samples.items()},
+        'git_processes': committer.backend.spawns,
+    }
+    if resource is not None:
+        # ru_maxrss is KiB on Linux and bytes on macOS
+        scale = 1 if sys.platform == 'darwin' else 1024
+        result['peak_rss_bytes'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+        result['peak_child_rss_bytes'] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return result
+
+
+def run_isolated(target, commits, with_remote, keep):
+    """Create a repository and measure one target in a fresh interpreter"""
+    base_dir = tempfile.mkdtemp(prefix='autocommit-bench-')
+    try:
+        repo = make_repo(base_dir, with_remote)
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--single', target,
+             '--sizes', str(commits), '--repo', repo],
+            capture_output=True, text=True)
+        if completed.returncode != 0:
+            return {'target': target, 'commits': commits,
+                    'error': completed.stderr.strip().splitlines()[-1:] or ['failed']}
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+    finally:
+        if not keep:
+            shutil.rmtree(base_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--targets', nargs='+', default=list(TARGETS), choices=TARGETS)
+    parser.add_argument('--remote', action='store_true', help="Push to a local bare repository")
+    parser.add_argument('--keep', action='store_true', help="Keep the throwaway repositories")
+    parser.add_argument('-o', '--output', help="Write JSON results to this file")
+    parser.add_argument('--single', help=argparse.SUPPRESS)
+    parser.add_argument('--repo', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        # Child mode: silence committer output, print one JSON line
+        real_stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')
+        result = run_single(args.single, args.sizes[0], args.repo)
+        sys.stdout = real_stdout
+        print(json.dumps(result))
+        return 0
+
+    results = []
+    for commits in args.sizes:
+        for target in args.targets:
+            print(f"{target:<28} N={commits:<6}", end=' ', flush=True, file=sys.stderr)
+            result = run_isolated(target, commits, args.remote, args.keep)
+            results.append(result)
+            if 'error' in result:
+                print(f"error: {result['error']}", file=sys.stderr)
+            else:
+                print(f"{result['commits_per_sec']:>10} commits/s", file=sys.stderr)
+
+    git_version = subprocess.run(['git', '--version'], capture_output=True, text=True).stdout.strip()
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'git': git_version,
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
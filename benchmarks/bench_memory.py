@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Capacity estimate in memory
+Runs AutoCommitter.run_commit_cycle (or AutoCommitterCore.run_commits) on the
+in-memory backend, with a latency model per git command instead of real git,
+and reports how long the same run would take against a real repository.
+
+Python-side cost (generating, writing, bookkeeping) is measured; git's cost
+comes from the latency model, e.g. figures taken from bench_commits.py.
+
+    python benchmarks/bench_memory.py --commits 1000000
+    python benchmarks/bench_memory.py --commits 100000 --latency commit=15,update-index=5,push=900 --push-every 500
+    python benchmarks/bench_memory.py --gui --engine pipeline --latency commit-file=2,push=900 --failures push=0.05
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from auto_committer import AutoCommitter
+from auto_committer_gui import AutoCommitterCore
+from memory_backend import MEMORY_ENGINES, FakeRemote, MemoryBackend
+from push_policy import PushPolicy
+
+# Milliseconds per call, roughly the subprocess/pipeline engines on Linux with a local remote
+DEFAULT_LATENCY = 'update-index=4,commit=12,commit-file=1.5,push=800,fetch=300,rebase=50'
+
+
+def parse_rates(text, scale=1.0):
+    """{'commit': 0.012, ...} from 'commit=12,push=800' (values multiplied by `scale`)"""
+    rates = {}
+    for item in text.split(','):
+        if not item.strip():
+            continue
+        name, _, value = item.partition('=')
+        try:
+            rates[name.strip()] = float(value) * scale
+        except ValueError:
+            raise SystemExit(f"Invalid value in {text!r}: {item}")
+    return rates
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return round(peak / (1 << 20 if sys.platform == 'darwin' else 1 << 10), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--commits', type=int, default=100000)
+    parser.add_argument('--engine', choices=MEMORY_ENGINES, default='subprocess')
+    parser.add_argument('--gui', action='store_true', help="Run AutoCommitterCore instead of the CLI committer")
+    parser.add_argument('--push-every', type=int, default=1000)
+    parser.add_argument('--latency', default=DEFAULT_LATENCY, help="Milliseconds per git command")
+    parser.add_argument('--failures', default='', help="Failure rate per git command, e.g. push=0.05")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('-o', '--output', help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    latency = parse_rates(args.latency, 0.001)
+    backend = MemoryBackend(files={'changes.txt': "change me 100 times."}, remote=FakeRemote(),
+                            latency=latency, failure_rates=parse_rates(args.failures), seed=args.seed)
+    push_policy = PushPolicy(every_commits=args.push_every)
+
+    def wait(seconds):
+        # Push retry backoff counts as modeled time too
+        backend.clock += seconds
+
+    start = time.perf_counter()
+    if args.gui:
+        core = AutoCommitterCore(log_callback=lambda message: None, backend=backend)
+        core.committer.engine = args.engine
+        core.committer.commit_delay = 0
+        core.committer.push_policy = push_policy
+        core.committer.resume = False
+        core.committer.pusher.sleep = wait
+        core.run_commits(args.commits)
+        committed = core.commit_count
+    else:
+        committer = AutoCommitter(engine=args.engine, backend=backend, max_commits=args.commits,
+                                  push_policy=push_policy, log_callback=lambda message: None,
+                                  resume=False)
+        committer.pusher.sleep = wait
+        committed = committer.run_commit_cycle()
+    wall = time.perf_counter() - start
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'front_end': 'gui' if args.gui else 'cli',
+        'engine': args.engine,
+        'commits': args.commits,
+        'committed': committed,
+        'pushed': backend.remotes['origin'].commit_count() - 1,
+        'latency_ms': {name: seconds * 1000 for name, seconds in latency.items()},
+        'python_seconds': round(wall, 3),
+        'modeled_git_seconds': round(backend.clock, 3),
+        'estimated_seconds': round(wall + backend.clock, 3),
+        'estimated_commits_per_sec': round(committed / (wall + backend.clock), 1) if committed else 0,
+        'peak_rss_mb': peak_rss_mb(),
+        'git_calls': {name: entry['count'] for name, entry in sorted(backend.stats.items())},
+    }
+    print(f"{committed} commits in {wall:.1f}s of Python; with modeled git time "
+          f"{report['estimated_seconds'] / 3600:.2f} h ({report['estimated_commits_per_sec']} commits/s)",
+          file=sys.stderr)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
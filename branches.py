@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Parallel branch generation
+Builds independent commit chains on several branches at once, one worker
+process per branch. Each worker writes its chain straight into its own
+packfile (no checkout, no shared index or working tree); refs are moved
+afterwards, optionally merged into the current branch, and pushed together.
+"""
+
+import os
+import random
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from object_writer import ObjectStore, ObjectStoreError
+from pack_writer import PackWriter
+
+INTEGRATE_MODES = ('none', 'ff', 'merge')
+
+# Each branch appends to its own file, so chains never touch the same path
+BRANCH_FILE = 'changes/{}.txt'
+# Names generated for `--branches N`
+BRANCH_PREFIX = 'auto-'
+
+BRANCH_NAME = re.compile(r'[A-Za-z0-9_][A-Za-z0-9._/-]*')
+
+
+def parse_branches(text):
+    """Branch names from 'a,b,c', or N generated names (auto-1 .. auto-N)"""
+    text = text.strip()
+    if text.isdigit():
+        names = [f"{BRANCH_PREFIX}{i}" for i in range(1, int(text) + 1)]
+    else:
+        names = [name.strip() for name in text.split(',') if name.strip()]
+    if not names:
+        raise ValueError("No branches given")
+    if len(set(names)) != len(names):
+        raise ValueError("Branch names must be unique")
+    for name in names:
+        if (not BRANCH_NAME.fullmatch(name) or '..' in name or '//' in name
+                or name.endswith(('/', '.', '.lock'))):
+            raise ValueError(f"Invalid branch name: {name}")
+    return names
+
+
+def branch_file(branch):
+    """Repository path of the file a branch's commits append to"""
+    return BRANCH_FILE.format(branch.replace('/', '-'))
+
+
+def read_path(store, tree_id, path):
+    """Content of the blob at `path` in a tree, or None"""
+    parts = path.split('/')
+    for depth, part in enumerate(parts):
+        if tree_id is None:
+            return None
+        entry = next((e for e in store.read_tree(tree_id) if e[1] == part.encode('utf-8')), None)
+        if entry is None:
+            return None
+        if depth == len(parts) - 1:
+            return store.read_object(entry[2])[1]
+        tree_id = entry[2] if entry[0] == '40000' else None
+    return None
+
+
+def build_chain(repo_dir, branch, base, commits):
+    """Worker: write `commits` commits for `branch` on top of `base` into one new pack
+
+    Runs in its own process; only objects are written here, the branch ref
+    is moved by the caller once every pack is in place.
+    """
+    start = time.perf_counter()
+    store = ObjectStore(repo_dir)
+    path = branch_file(branch)
+    store.head_ref = f"refs/heads/{branch}"
+    store.head = base
+    store.head_tree = store.commit_tree_of(base) if base else None
+    content = bytearray((read_path(store, store.head_tree, path) or b"").strip())
+    first = len(content.splitlines())
+
+    store.sink = PackWriter(store)
+    try:
+        for i in range(first, first + commits):
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            line = f"Change #{i + 1}: {timestamp} - Random: {random.randint(1000, 9999)}"
+            content += (("\n" if content else "") + line).encode('utf-8')
+            store.commit_content(path, bytes(content), f"Auto-commit #{i + 1} on {branch} - {timestamp}")
+            if (i + 1) % 1000 == 0:
+                store.prune_trees()
+        pack_path = store.sink.finish()
+    except BaseException:
+        store.sink.abort()
+        raise
+    return {
+        'branch': branch,
+        'path': path,
+        'base': base,
+        'tip': store.head,
+        'blob': store.hash_object('blob', bytes(content))[0],
+        'commits': commits,
+        'objects': len(store.sink.entries),
+        'pack_bytes': store.sink.bytes_written,
+        'pack': os.path.basename(pack_path),
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def merge_commit(store, tips, message):
+    """Octopus merge of `tips` into HEAD: HEAD's tree plus each branch's own file"""
+    tree_id = store.head_tree
+    for result in tips:
+        tree_id = store.update_tree(tree_id, result['path'].split('/'), result['blob'])
+    return store.write_commit(tree_id, [store.head] + [r['tip'] for r in tips], message)
+
+
+def generate_branches(repo_dir, branches, commits, jobs=None, integrate='none', log=print):
+    """Build every branch's chain in parallel, move the refs, and integrate them
+
+    Each branch continues from its existing tip, or starts at HEAD if it does
+    not exist yet. Returns (results, refs to push); `results` has one entry
+    per branch and an 'error' key for branches whose worker failed.
+    """
+    if integrate not in INTEGRATE_MODES:
+        raise ValueError(f"Unknown integrate mode: {integrate}")
+    if integrate == 'ff' and len(branches) != 1:
+        raise ValueError("Fast-forward needs exactly one branch; use --integrate merge for several")
+    store = ObjectStore(repo_dir)
+    store.resolve_head()
+    if not store.head:
+        raise ObjectStoreError("The current branch has no commits to branch from")
+    if store.head_ref in {f"refs/heads/{b}" for b in branches}:
+        raise ValueError(f"{store.head_ref} is checked out; pick other branch names")
+
+    bases = {b: store.read_ref(f"refs/heads/{b}") for b in branches}
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(branches)))
+    log(f"Building {len(branches)} branch(es) x {commits} commits on {jobs} worker process(es)")
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(build_chain, repo_dir, b, bases[b] or store.head, commits): b
+                   for b in branches}
+        for future in as_completed(futures):
+            branch = futures[future]
+            try:
+                results[branch] = future.result()
+            except Exception as e:
+                results[branch] = {'branch': branch, 'commits': 0, 'error': str(e)}
+                log(f"{branch}: failed: {e}")
+                continue
+            r = results[branch]
+            log(f"{branch}: {r['commits']} commits, {r['objects']} objects in {r['pack']} "
+                f"({r['seconds']:.2f}s)")
+
+    # The workers' packs appeared after this store listed the pack directory
+    store.packs = None
+    built = [results[b] for b in branches if 'error' not in results[b]]
+    refs = []
+    for result in built:
+        ref = f"refs/heads/{result['branch']}"
+        store.update_ref(ref, result['tip'], bases[result['branch']],
+                         f"auto-committer: {result['commits']} commits")
+        refs.append(ref)
+
+    if built and integrate == 'ff':
+        result = built[0]
+        if result['base'] != store.head:
+            log(f"{result['branch']} did not start at {store.head_ref}; it was not fast-forwarded")
+            return [results[b] for b in branches], refs
+        store.update_ref(store.head_ref, result['tip'], store.head,
+                         f"auto-committer: fast-forward to {result['branch']}")
+        refs.append(store.head_ref)
+        log(f"Fast-forwarded {store.head_ref} to {result['branch']}")
+    elif built and integrate == 'merge':
+        names = ", ".join(f"'{r['branch']}'" for r in built)
+        target = store.head_ref.rsplit('/', 1)[-1]
+        kind = 'branches' if len(built) > 1 else 'branch'
+        commit_id = merge_commit(store, built, f"Merge {kind} {names} into {target}")
+        store.update_ref(store.head_ref, commit_id, store.head,
+                         f"auto-committer: merge {len(built)} branches")
+        refs.append(store.head_ref)
+        log(f"Merged {len(built)} branch(es) into {target}")
+    return [results[b] for b in branches], refs
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Append-only writer for changes.txt
+Keeps one file handle open across a cycle and writes only the new change line.
+"""
+
+import os
+
+FSYNC_POLICIES = ('never', 'change', 'cycle')
+
+# How much of each end of the file to inspect when checking normalization
+EDGE_BYTES = 64
+
+
+def needs_normalization(path):
+    """Return True if the file has leading/trailing whitespace that strip() would drop"""
+    size = os.path.getsize(path)
+    if size == 0:
+        return False
+    with open(path, 'rb') as f:
+        head = f.read(EDGE_BYTES).decode('utf-8', 'ignore')
+        f.seek(max(0, size - EDGE_BYTES))
+        tail = f.read().decode('utf-8', 'ignore')
+    return head != head.lstrip() or tail != tail.rstrip()
+
+
+def normalize_change_file(path, initial_content):
+    """One-shot migration: make the file end without a newline so appends are safe
+
+    Produces exactly what the old read-strip-rewrite path would have left on disk,
+    so appending "\\n" + line afterwards stays byte-identical. Returns True when the
+    file had to be rewritten.
+    """
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(initial_content)
+        return True
+
+    if not needs_normalization(path):
+        return False
+
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read().strip()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return True
+
+
+class ChangeFileWriter:
+    """Appends `Change #N` lines to a target file in O(1) per change"""
+
+    def __init__(self, path, initial_content, fsync='cycle', flush_each=True):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.path = path
+        self.initial_content = initial_content
+        self.fsync = fsync
+        # Git reads the file from disk, so the default is to flush before every commit
+        self.flush_each = flush_each
+        self.handle = None
+        self.lines_written = 0
+        self.bytes_written = 0
+
+    def open(self):
+        """Normalize the file once and open it for appending"""
+        normalize_change_file(self.path, self.initial_content)
+        self.handle = open(self.path, 'a', encoding='utf-8')
+        self.lines_written = 0
+        self.bytes_written = 0
+        return self
+
+    def reopen(self):
+        """Open a fresh handle after git rewrote the file (keeps the counters)"""
+        if self.handle is not None:
+            self.handle.close()
+        self.handle = open(self.path, 'a', encoding='utf-8')
+        return self
+
+    def append(self, line):
+        """Append one change line"""
+        self.append_chunks((line,))
+
+    def append_chunks(self, chunks):
+        """Append one change line handed over in pieces; the pieces are never joined"""
+        self.handle.write("\n")
+        written = 1
+        for chunk in chunks:
+            self.handle.write(chunk)
+            written += len(chunk.encode('utf-8'))
+        self.lines_written += 1
+        self.bytes_written += written
+        if self.flush_each or self.fsync == 'change':
+            self.flush()
+
+    def flush(self):
+        """Push buffered lines to the OS (and to disk for the 'change' policy)"""
+        self.handle.flush()
+        if self.fsync == 'change':
+            os.fsync(self.handle.fileno())
+
+    def close(self):
+        """Flush, fsync for the 'cycle' policy and close the handle"""
+        if self.handle is None:
+            return
+        self.handle.flush()
+        if self.fsync in ('change', 'cycle'):
+            os.fsync(self.handle.fileno())
+        self.handle.close()
+        self.handle = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Content generators for the auto-committer
+Decide what each change appends and to which file. A generator yields the
+new line lazily in chunks, so a large payload is never held in memory whole.
+"""
+
+import os
+import random
+from datetime import datetime
+
+from rotation import parse_size
+
+# Largest piece a generator hands to the writer at once
+CHUNK_SIZE = 64 * 1024
+
+
+class ContentGenerator:
+    """Yields the line each change appends; subclasses override chunks()
+
+    Lines keep the `Change #N: <timestamp>` prefix (except for custom
+    templates) so monthly rotation can still date them.
+    """
+
+    def chunks(self, index, when=None):
+        """Yield the text of change `index` (0-based) in one or more pieces, without a newline"""
+        raise NotImplementedError
+
+    def target(self, index):
+        """Repository path change `index` goes to, or None for the committer's own file"""
+        return None
+
+    def targets(self):
+        """Every repository path target() returns (empty for the committer's own file)"""
+        return []
+
+    def describe(self):
+        return self.__class__.__name__
+
+
+class TimestampLines(ContentGenerator):
+    """`Change #N: <timestamp> - Random: <4 digits>` (the default)"""
+
+    def chunks(self, index, when=None):
+        timestamp = datetime.fromtimestamp(when) if when else datetime.now()
+        yield f"Change #{index + 1}: {timestamp:%Y-%m-%d %H:%M:%S} - Random: {random.randint(1000, 9999)}"
+
+    def describe(self):
+        return "timestamp lines"
+
+
+class RandomPayload(ContentGenerator):
+    """A timestamp line followed by `size` random hex characters, produced chunk by chunk"""
+
+    def __init__(self, size):
+        if size < 1:
+            raise ValueError("Payload size must be at least 1 byte")
+        self.size = size
+
+    def chunks(self, index, when=None):
+        timestamp = datetime.fromtimestamp(when) if when else datetime.now()
+        yield f"Change #{index + 1}: {timestamp:%Y-%m-%d %H:%M:%S} - Payload: "
+        remaining = self.size
+        while remaining:
+            piece = min(remaining, CHUNK_SIZE)
+            # Two hex digits per random byte; an odd tail is trimmed
+            yield os.urandom((piece + 1) // 2).hex()[:piece]
+            remaining -= piece
+
+    def describe(self):
+        return f"random payloads of {self.size} bytes"
+
+
+class TemplateLines(ContentGenerator):
+    """A str.format template with {n}, {timestamp}, {date}, {time} and {random}"""
+
+    FIELDS = {'n': 1, 'timestamp': '', 'date': '', 'time': '', 'random': 0}
+
+    def __init__(self, template):
+        if "\n" in template:
+            raise ValueError("A template must be a single line")
+        try:
+            template.format(**self.FIELDS)
+        except (KeyError, IndexError, ValueError, AttributeError, TypeError) as e:
+            # e.g. {name}, {0}, {n:%Y} or {n.x}: all usage errors, not crashes
+            raise ValueError(f"Invalid template {template!r}: {e}")
+        self.template = template
+
+    def chunks(self, index, when=None):
+        moment = datetime.fromtimestamp(when) if when else datetime.now()
+        yield self.template.format(n=index + 1, timestamp=f"{moment:%Y-%m-%d %H:%M:%S}",
+                                   date=f"{moment:%Y-%m-%d}", time=f"{moment:%H:%M:%S}",
+                                   random=random.randint(1000, 9999))
+
+    def describe(self):
+        return f"template {self.template!r}"
+
+
+class MultiFile(ContentGenerator):
+    """Spreads another generator's lines over several files, one file per change in turn"""
+
+    def __init__(self, generator, paths):
+        paths = [path.strip().replace(os.sep, '/') for path in paths if path.strip()]
+        if not paths:
+            raise ValueError("No target files given")
+        for path in paths:
+            if path.startswith('/') or '..' in path.split('/') or path.startswith('.git/'):
+                raise ValueError(f"Target files must be inside the repository: {path}")
+        if len(set(paths)) != len(paths):
+            raise ValueError("Target files must be unique")
+        self.generator = generator
+        self.paths = paths
+
+    def chunks(self, index, when=None):
+        return self.generator.chunks(index, when)
+
+    def target(self, index):
+        return self.paths[index % len(self.paths)]
+
+    def targets(self):
+        return list(self.paths)
+
+    def describe(self):
+        return f"{self.generator.describe()} across {', '.join(self.paths)}"
+
+
+def parse_generator(spec=None, files=None):
+    """Build a generator from 'timestamp', 'random:SIZE' or 'template:TEXT' plus 'a.txt,b.txt'"""
+    kind, _, value = (spec or 'timestamp').partition(':')
+    if kind == 'timestamp' and not value:
+        generator = TimestampLines()
+    elif kind == 'random' and value:
+        generator = RandomPayload(parse_size(value))
+    elif kind == 'template' and value:
+        generator = TemplateLines(value)
+    else:
+        raise ValueError(f"Unknown content {spec!r} (timestamp, random:SIZE or template:TEXT)")
+    if files:
+        generator = MultiFile(generator, files.split(',') if isinstance(files, str) else files)
+    return generator
@@ -0,0 +1,614 @@
+#!/usr/bin/env python3
+"""
+Auto-Committer daemon
+One long-lived process that owns the commit engine and serves a local control
+API (JSON over HTTP on 127.0.0.1): start a run, stop it, query status and
+stream its progress. The CLI (--via-daemon) and the GUI ("Run in background
+daemon") are thin clients of it.
+"""
+
+import argparse
+import hmac
+import json
+import os
+import re
+import secrets
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from auto_committer import AutoCommitter, ENGINES
+from change_writer import FSYNC_POLICIES
+from content_generators import parse_generator
+from daemon_client import (DaemonClient, DaemonError, STATE_FILE, TOKEN_HEADER, ensure_daemon,
+                           follow_run, read_state)
+from maintenance import RepoMaintenance, parse_thresholds
+from run_lock import BUSY_POLICIES
+from object_writer import ObjectStoreError, find_git_dir
+from push_policy import PushPolicy
+from pusher import DEFAULT_CHUNK_COMMITS, DEFAULT_RETRIES
+from rotation import RotationPolicy
+
+# Events kept per run for clients that connect late or reconnect
+EVENT_HISTORY = 2000
+# Progress events are coalesced to at most one per interval (the last one always goes out)
+PROGRESS_INTERVAL = 0.1
+# An idle event stream sends a heartbeat this often so clients can tell the daemon is alive
+HEARTBEAT_SECONDS = 15
+# How long running cycles get to finish after a shutdown request
+SHUTDOWN_GRACE = 30
+
+# Options that must be JSON strings (None allowed for those marked optional)
+STRING_OPTIONS = ('repo', 'engine', 'fsync', 'target_file', 'on_busy')
+OPTIONAL_STRING_OPTIONS = ('rotate', 'content', 'files', 'maintain_thresholds')
+
+RUN_DEFAULTS = {
+    'commits': 150,
+    'engine': 'subprocess',
+    'fsync': 'cycle',
+    'stage_all': False,
+    'push_every': 0,
+    'push_interval': 0,
+    'push_retries': DEFAULT_RETRIES,
+    'push_chunk': DEFAULT_CHUNK_COMMITS,
+    'rebase': True,
+    'delay': 0,
+    'target_file': 'changes.txt',
+    'rotate': None,
+    'content': None,
+    'files': None,
+    'maintain': False,
+    'maintain_thresholds': None,
+    'on_busy': 'wait',
+    'lock_timeout': 0,
+    'fresh': False,
+}
+
+
+class RunConflict(Exception):
+    """The repository already has a run in progress"""
+
+
+def parse_run_options(body):
+    """Validate a start request and fill in defaults; raises ValueError"""
+    unknown = set(body) - set(RUN_DEFAULTS) - {'repo'}
+    if unknown:
+        raise ValueError(f"Unknown option(s): {', '.join(sorted(unknown))}")
+    if not body.get('repo'):
+        raise ValueError("'repo' is required")
+    options = dict(RUN_DEFAULTS)
+    options.update(body)
+    for name in STRING_OPTIONS:
+        if not isinstance(options[name], str):
+            raise ValueError(f"{name} must be a string")
+    for name in OPTIONAL_STRING_OPTIONS:
+        if options[name] is not None and not isinstance(options[name], str):
+            raise ValueError(f"{name} must be a string or null")
+    options['repo'] = os.path.abspath(os.path.expanduser(options['repo']))
+    try:
+        find_git_dir(options['repo'])
+    except ObjectStoreError as e:
+        raise ValueError(str(e))
+    if options['engine'] not in ENGINES:
+        raise ValueError(f"Unknown engine: {options['engine']}")
+    if options['fsync'] not in FSYNC_POLICIES:
+        raise ValueError(f"Unknown fsync policy: {options['fsync']}")
+    try:
+        options['commits'] = int(options['commits'])
+        options['push_every'] = int(options['push_every'])
+        options['push_interval'] = float(options['push_interval'])
+        options['push_retries'] = int(options['push_retries'])
+        options['push_chunk'] = int(options['push_chunk'])
+        options['delay'] = float(options['delay'])
+        options['lock_timeout'] = float(options['lock_timeout'])
+    except (TypeError, ValueError):
+        raise ValueError("commits, push_every, push_interval, push_retries, push_chunk, "
+                         "delay and lock_timeout must be numbers")
+    if options['commits'] < 1:
+        raise ValueError("commits must be at least 1")
+    if options['delay'] < 0:
+        raise ValueError("delay must not be negative")
+    if options['push_retries'] < 0 or options['push_chunk'] < 0:
+        raise ValueError("push_retries and push_chunk must not be negative")
+    if options['on_busy'] not in BUSY_POLICIES:
+        raise ValueError(f"Unknown on_busy policy: {options['on_busy']}")
+    if options['lock_timeout'] < 0:
+        raise ValueError("lock_timeout must not be negative")
+    options['rebase'] = bool(options['rebase'])
+    options['maintain'] = bool(options['maintain'])
+    # Raise ValueError for a bad cadence or rotation before anything starts
+    PushPolicy(options['push_every'], options['push_interval'])
+    if options['rotate']:
+        RotationPolicy.parse(options['rotate'])
+    parse_generator(options['content'], options['files'])
+    parse_thresholds(options['maintain_thresholds'] or '')
+    return options
+
+
+class Run:
+    """One commit cycle started through the daemon, with its event history"""
+
+    def __init__(self, run_id, options):
+        self.id = run_id
+        self.repo = options['repo']
+        self.options = options
+        self.status = 'running'
+        self.done = 0
+        self.total = options['commits']
+        self.pending = 0
+        self.committed = 0
+        self.pushed = None
+        self.error = None
+        self.lock_wait = 0.0
+        self.started = time.time()
+        self.finished = None
+        self.thread = None
+        self.events = deque(maxlen=EVENT_HISTORY)
+        self.seq = 0
+        self.condition = threading.Condition()
+        self.last_progress = 0.0
+
+    def emit(self, kind, **fields):
+        """Append an event and wake every stream following this run"""
+        with self.condition:
+            self.seq += 1
+            event = {'seq': self.seq, 'type': kind, 'time': round(time.time(), 3)}
+            event.update(fields)
+            self.events.append(event)
+            self.condition.notify_all()
+
+    def log(self, message):
+        """Log callback for the run's committer"""
+        for line in str(message).splitlines() or ['']:
+            print(f"[run {self.id}] {line}", flush=True)
+        self.emit('log', message=message)
+
+    def progress(self, done, total, pending):
+        """Progress callback for the run's committer"""
+        self.done, self.total, self.pending = done, total, pending
+        now = time.monotonic()
+        if done >= total or now - self.last_progress >= PROGRESS_INTERVAL:
+            self.last_progress = now
+            self.emit('progress', done=done, total=total, pending=pending)
+
+    def end(self, status, committed=0, pushed=None, pending=0, error=None, lock_wait=0.0):
+        """Record the outcome and send the final event"""
+        self.status = status
+        self.lock_wait = lock_wait
+        self.committed = committed
+        self.pushed = pushed
+        self.pending = pending
+        self.error = error
+        self.finished = time.time()
+        self.emit('end', run=self.summary())
+
+    def events_after(self, after, timeout):
+        """Events newer than sequence `after` (waiting up to `timeout`), and whether the run has ended"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.seq > after or self.finished is not None, timeout)
+            return [e for e in self.events if e['seq'] > after], self.finished is not None
+
+    def summary(self):
+        """JSON-ready state of the run"""
+        return {
+            'id': self.id,
+            'repo': self.repo,
+            'status': self.status,
+            'done': self.done,
+            'total': self.total,
+            'pending': self.pending,
+            'committed': self.committed,
+            'pushed': self.pushed,
+            'error': self.error,
+            'lock_wait': round(self.lock_wait, 3),
+            'started': round(self.started, 3),
+            'finished': round(self.finished, 3) if self.finished else None,
+            'options': self.options,
+        }
+
+
+class CommitDaemon:
+    """Runs commit cycles in background threads, at most one per repository
+
+    Committers are kept per repository between runs, so a repeated run skips
+    interpreter startup, imports and repository discovery.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.runs = {}
+        self.active = {}
+        self.committers = {}
+        self.next_id = 1
+        self.started = time.time()
+        self.shutdown_requested = threading.Event()
+
+    def committer_for(self, options):
+        """Return the cached committer for the run's repository and target file"""
+        key = (options['repo'], options['target_file'])
+        committer = self.committers.get(key)
+        if committer is None:
+            committer = AutoCommitter(repo_dir=options['repo'], target_file=options['target_file'])
+            self.committers[key] = committer
+        return committer
+
+    def start_run(self, body):
+        """Validate the request and start its cycle; returns the Run"""
+        options = parse_run_options(body)
+        with self.lock:
+            if self.shutdown_requested.is_set():
+                raise RunConflict("The daemon is shutting down")
+            if options['repo'] in self.active:
+                raise RunConflict(f"Run {self.active[options['repo']].id} is already "
+                                  f"running in {options['repo']}")
+            run = Run(self.next_id, options)
+            self.next_id += 1
+            self.runs[run.id] = run
+            self.active[run.repo] = run
+            committer = self.committer_for(options)
+
+        committer.engine = options['engine']
+        committer.fsync = options['fsync']
+        committer.stage_all = options['stage_all']
+        committer.push_policy = PushPolicy(every_commits=options['push_every'],
+                                           every_seconds=options['push_interval'])
+        committer.pusher.retries = options['push_retries']
+        committer.pusher.chunk_commits = options['push_chunk']
+        committer.pusher.rebase = options['rebase']
+        committer.commit_delay = options['delay']
+        committer.max_commits = options['commits']
+        committer.resume = not options['fresh']
+        committer.rotation = RotationPolicy.parse(options['rotate']) if options['rotate'] else None
+        committer.generator = parse_generator(options['content'], options['files'])
+        committer.on_busy = options['on_busy']
+        committer.lock_timeout = options['lock_timeout'] or None
+        committer.maintenance = None
+        if options['maintain']:
+            committer.maintenance = RepoMaintenance(
+                committer.backend, parse_thresholds(options['maintain_thresholds'] or ''),
+                log=committer.log)
+        committer.log_callback = run.log
+        committer.progress_callback = run.progress
+        committer.stop_event.clear()
+
+        run.thread = threading.Thread(target=self._execute, args=(run, committer),
+                                      name=f"run-{run.id}", daemon=True)
+        run.thread.start()
+        return run
+
+    def _execute(self, run, committer):
+        try:
+            committed = committer.run_commit_cycle()
+            status = 'stopped' if run.status == 'stopping' else 'finished'
+            run.end(status, committed, committer.last_push_ok, committer.push_policy.pending,
+                    lock_wait=committer.last_lock_wait)
+        except Exception as e:
+            run.log(f"Run failed: {e}")
+            run.end('failed', error=str(e))
+        finally:
+            committer.log_callback = None
+            committer.progress_callback = None
+            with self.lock:
+                if self.active.get(run.repo) is run:
+                    del self.active[run.repo]
+
+    def get_run(self, run_id):
+        """Return a run by id, or None"""
+        with self.lock:
+            return self.runs.get(run_id)
+
+    def stop_run(self, run):
+        """Ask a run's committer to stop after its current change"""
+        with self.lock:
+            if run.status != 'running':
+                return run
+            run.status = 'stopping'
+            committer = self.committers[(run.repo, run.options['target_file'])]
+        committer.request_stop()
+        run.log("Stop requested")
+        return run
+
+    def status(self):
+        """Daemon-wide status"""
+        with self.lock:
+            runs = list(self.runs.values())
+        return {
+            'pid': os.getpid(),
+            'started': round(self.started, 3),
+            'active': sum(1 for r in runs if r.finished is None),
+            'runs': [r.summary() for r in runs],
+        }
+
+    def shutdown(self, grace=SHUTDOWN_GRACE):
+        """Stop every run, wait up to `grace` seconds for them, and close the committers"""
+        self.shutdown_requested.set()
+        with self.lock:
+            running = list(self.active.values())
+        for run in running:
+            self.stop_run(run)
+        deadline = time.monotonic() + grace
+        for run in running:
+            run.thread.join(max(0, deadline - time.monotonic()))
+        with self.lock:
+            for committer in self.committers.values():
+                committer.metrics.close()
+
+
+class DaemonServer:
+    """Serves the control API of a CommitDaemon from background threads"""
+
+    ROUTES = (
+        ('GET', re.compile(r'/status'), 'handle_status'),
+        ('POST', re.compile(r'/runs'), 'handle_start'),
+        ('GET', re.compile(r'/runs/(\d+)'), 'handle_run'),
+        ('POST', re.compile(r'/runs/(\d+)/stop'), 'handle_stop'),
+        ('GET', re.compile(r'/runs/(\d+)/events'), 'handle_events'),
+        ('POST', re.compile(r'/shutdown'), 'handle_shutdown'),
+    )
+
+    def __init__(self, daemon, port=0, host='127.0.0.1', token=None):
+        self.daemon = daemon
+        self.address = (host, port)
+        self.token = token or secrets.token_urlsafe(24)
+        self.server = None
+
+    def start(self):
+        """Bind the port and serve until stop()"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.dispatch(self, 'GET')
+
+            def do_POST(self):
+                server.dispatch(self, 'POST')
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(self.address, Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def send_json(self, handler, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def dispatch(self, handler, method):
+        """Check the token, route the request and turn errors into JSON replies"""
+        if not hmac.compare_digest(handler.headers.get(TOKEN_HEADER, ''), self.token):
+            self.send_json(handler, 403, {'error': "Missing or wrong token"})
+            return
+        url = urlsplit(handler.path)
+        for route_method, pattern, name in self.ROUTES:
+            match = pattern.fullmatch(url.path)
+            if match and route_method == method:
+                break
+        else:
+            self.send_json(handler, 404, {'error': f"No route for {method} {url.path}"})
+            return
+        try:
+            length = int(handler.headers.get('Content-Length') or 0)
+            body = json.loads(handler.rfile.read(length) or b'{}') if length else {}
+            if not isinstance(body, dict):
+                raise ValueError("Request body must be a JSON object")
+            getattr(self, name)(handler, *match.groups(), body=body, query=parse_qs(url.query))
+        except ValueError as e:
+            self.send_json(handler, 400, {'error': str(e)})
+        except RunConflict as e:
+            self.send_json(handler, 409, {'error': str(e)})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except Exception as e:
+            # A bug must not drop the connection; the client gets a JSON error it can show
+            self.send_json(handler, 500, {'error': f"Internal error: {e}"})
+
+    def find_run(self, handler, run_id):
+        run = self.daemon.get_run(int(run_id))
+        if run is None:
+            self.send_json(handler, 404, {'error': f"No run {run_id}"})
+        return run
+
+    def handle_status(self, handler, body, query):
+        self.send_json(handler, 200, self.daemon.status())
+
+    def handle_start(self, handler, body, query):
+        run = self.daemon.start_run(body)
+        self.send_json(handler, 201, run.summary())
+
+    def handle_run(self, handler, run_id, body, query):
+        run = self.find_run(handler, run_id)
+        if run is not None:
+            self.send_json(handler, 200, run.summary())
+
+    def handle_stop(self, handler, run_id, body, query):
+        run = self.find_run(handler, run_id)
+        if run is not None:
+            self.send_json(handler, 200, self.daemon.stop_run(run).summary())
+
+    def handle_events(self, handler, run_id, body, query):
+        """Stream the run's events as JSON lines until its end event"""
+        run = self.find_run(handler, run_id)
+        if run is None:
+            return
+        after = int(query.get('after', ['0'])[0])
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'application/x-ndjson')
+        handler.send_header('Cache-Control', 'no-cache')
+        handler.end_headers()
+        # No Content-Length: the body ends when the connection closes
+        handler.close_connection = True
+        while True:
+            events, ended = run.events_after(after, HEARTBEAT_SECONDS)
+            if events:
+                after = events[-1]['seq']
+                handler.wfile.write(b"".join(json.dumps(e).encode('utf-8') + b"\n" for e in events))
+            elif not ended:
+                handler.wfile.write(b'{"type": "heartbeat"}\n')
+            handler.wfile.flush()
+            if ended and after >= run.seq:
+                return
+
+    def handle_shutdown(self, handler, body, query):
+        self.send_json(handler, 200, {'stopping': self.daemon.status()['active']})
+        self.daemon.shutdown_requested.set()
+
+    def write_state(self, path=STATE_FILE):
+        """Publish the URL and token for clients (readable by this user only)"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'url': self.url, 'token': self.token, 'pid': os.getpid()}, f)
+        os.replace(tmp_path, path)
+
+    def remove_state(self, path=STATE_FILE):
+        """Remove the state file if it still describes this daemon"""
+        state = read_state(path)
+        if state and state.get('pid') == os.getpid():
+            os.remove(path)
+
+    def stop(self):
+        """Stop serving and release the port"""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def serve(port=0, host='127.0.0.1'):
+    """Run the daemon in the foreground until /shutdown, Ctrl+C or SIGTERM"""
+    if DaemonClient().ping():
+        print(f"A daemon is already running (see {STATE_FILE})")
+        return 1
+    daemon = CommitDaemon()
+    server = DaemonServer(daemon, port, host).start()
+    server.write_state()
+    print(f"Auto-committer daemon listening on {server.url} (pid {os.getpid()})", flush=True)
+
+    def request_shutdown(signum, frame):
+        daemon.shutdown_requested.set()
+
+    signal.signal(signal.SIGTERM, request_shutdown)
+    try:
+        while not daemon.shutdown_requested.wait(1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    print("Shutting down; running cycles get a chance to push", flush=True)
+    daemon.shutdown()
+    # Give followers a moment to read the final events before the port closes
+    time.sleep(0.2)
+    server.stop()
+    server.remove_state()
+    return 0
+
+
+def print_runs(runs):
+    """Print one line per run"""
+    if not runs:
+        print("No runs")
+    for run in runs:
+        print(f"#{run['id']:<4} {run['status']:<9} {run['done']:>6}/{run['total']:<6} "
+              f"{run['pending']:>5} pending  {run['options']['engine']:<12} {run['repo']}"
+              + (f"  error: {run['error']}" if run['error'] else ""))
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Auto-committer daemon and its command line client")
+    commands = parser.add_subparsers(dest='command')
+
+    serve_parser = commands.add_parser('serve', help="Run the daemon in the foreground")
+    serve_parser.add_argument('--port', type=int, default=0, help="Port on 127.0.0.1 (default: any free port)")
+
+    start_parser = commands.add_parser('start', help="Start a run (the daemon is started if needed)")
+    start_parser.add_argument('repo', nargs='?', default=os.getcwd())
+    start_parser.add_argument('--commits', type=int, default=RUN_DEFAULTS['commits'])
+    start_parser.add_argument('--engine', choices=ENGINES, default=RUN_DEFAULTS['engine'])
+    start_parser.add_argument('--fsync', choices=FSYNC_POLICIES, default=RUN_DEFAULTS['fsync'])
+    start_parser.add_argument('--stage-all', action='store_true')
+    start_parser.add_argument('--push-every', type=int, default=0)
+    start_parser.add_argument('--push-interval', type=float, default=0)
+    start_parser.add_argument('--push-retries', type=int, default=RUN_DEFAULTS['push_retries'])
+    start_parser.add_argument('--push-chunk', type=int, default=RUN_DEFAULTS['push_chunk'])
+    start_parser.add_argument('--no-rebase', action='store_true')
+    start_parser.add_argument('--delay', type=float, default=0)
+    start_parser.add_argument('--target-file', default=RUN_DEFAULTS['target_file'])
+    start_parser.add_argument('--rotate')
+    start_parser.add_argument('--content')
+    start_parser.add_argument('--files')
+    start_parser.add_argument('--maintain', action='store_true')
+    start_parser.add_argument('--on-busy', choices=BUSY_POLICIES, default=RUN_DEFAULTS['on_busy'])
+    start_parser.add_argument('--lock-timeout', type=float, default=0)
+    start_parser.add_argument('--maintain-thresholds')
+    start_parser.add_argument('--fresh', action='store_true')
+    start_parser.add_argument('--detach', action='store_true', help="Return once the run has started")
+
+    for name, text in (('stop', "Stop a run"), ('follow', "Print a run's log until it ends")):
+        command = commands.add_parser(name, help=text)
+        command.add_argument('run_id', type=int)
+    commands.add_parser('status', help="List runs")
+    commands.add_parser('shutdown', help="Stop every run and the daemon")
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        return serve(args.port)
+    if args.command is None:
+        parser.print_usage()
+        return 1
+
+    try:
+        if args.command == 'start':
+            client = ensure_daemon()
+            run = client.start_run(repo=args.repo, commits=args.commits, engine=args.engine,
+                                   fsync=args.fsync, stage_all=args.stage_all,
+                                   push_every=args.push_every, push_interval=args.push_interval,
+                                   push_retries=args.push_retries, push_chunk=args.push_chunk,
+                                   rebase=not args.no_rebase,
+                                   delay=args.delay, target_file=args.target_file,
+                                   rotate=args.rotate, content=args.content, files=args.files,
+                                   maintain=args.maintain,
+                                   maintain_thresholds=args.maintain_thresholds,
+                                   on_busy=args.on_busy, lock_timeout=args.lock_timeout,
+                                   fresh=args.fresh)
+            print(f"Started run #{run['id']} in {run['repo']}")
+            if args.detach:
+                return 0
+            run = follow_run(client, run['id'])
+            return 0 if run['status'] == 'finished' and run['committed'] else 1
+        client = DaemonClient()
+        if args.command == 'follow':
+            run = follow_run(client, args.run_id)
+            return 0 if run['status'] == 'finished' else 1
+        if args.command == 'stop':
+            print_runs([client.stop_run(args.run_id)])
+        elif args.command == 'status':
+            status = client.status()
+            print(f"Daemon pid {status['pid']}, {status['active']} active run(s)")
+            print_runs(status['runs'])
+        elif args.command == 'shutdown':
+            client.shutdown()
+            print("Daemon is shutting down")
+    except DaemonError as e:
+        print(f"Daemon error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
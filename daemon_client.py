@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Auto-Committer daemon client
+Finds (or starts) the local auto-committer daemon and talks to its control
+API: start a run, stop it, query status and follow its progress stream.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Written by the daemon on startup: {"url": ..., "token": ..., "pid": ...}
+STATE_DIR = os.path.join(os.path.expanduser('~'), '.auto-committer')
+STATE_FILE = os.path.join(STATE_DIR, 'daemon.json')
+LOG_FILE = os.path.join(STATE_DIR, 'daemon.log')
+TOKEN_HEADER = 'X-Auto-Committer-Token'
+
+# How long to wait for a freshly spawned daemon to answer
+SPAWN_TIMEOUT = 15
+
+
+class DaemonError(Exception):
+    """The daemon is unreachable or rejected a request"""
+
+
+def read_state(path=STATE_FILE):
+    """Return the daemon's state file contents, or None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class DaemonClient:
+    """Thin JSON client for the daemon's control API"""
+
+    def __init__(self, url=None, token=None, timeout=10):
+        if url is None:
+            state = read_state() or {}
+            url = state.get('url')
+            token = token or state.get('token')
+        self.url = url.rstrip('/') if url else None
+        self.token = token
+        self.timeout = timeout
+
+    def _open(self, method, path, body=None, timeout=None):
+        # Imported on first request so front ends that never use the daemon start faster
+        import urllib.error
+        import urllib.request
+        if not self.url:
+            raise DaemonError("No auto-committer daemon is running")
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(self.url + path, data=data, method=method)
+        request.add_header('Content-Type', 'application/json')
+        if self.token:
+            request.add_header(TOKEN_HEADER, self.token)
+        try:
+            return urllib.request.urlopen(request, timeout=timeout or self.timeout)
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.load(e).get('error', e.reason)
+            except ValueError:
+                message = e.reason
+            raise DaemonError(f"{method} {path}: {message}")
+        except (urllib.error.URLError, OSError) as e:
+            raise DaemonError(f"Cannot reach the daemon at {self.url}: {e}")
+
+    def request(self, method, path, body=None):
+        """Send one request and return the decoded JSON reply"""
+        with self._open(method, path, body) as response:
+            return json.load(response)
+
+    def status(self):
+        """Daemon status plus a summary of every known run"""
+        return self.request('GET', '/status')
+
+    def start_run(self, **options):
+        """Start a run (repo, commits, engine, push_every, ...); returns its summary"""
+        return self.request('POST', '/runs', options)
+
+    def run(self, run_id):
+        """Summary of one run"""
+        return self.request('GET', f'/runs/{run_id}')
+
+    def stop_run(self, run_id):
+        """Ask a run to stop after its current change"""
+        return self.request('POST', f'/runs/{run_id}/stop')
+
+    def shutdown(self):
+        """Stop every run and the daemon itself"""
+        return self.request('POST', '/shutdown')
+
+    def events(self, run_id, after=0):
+        """Yield the run's events (log, progress, end) as they happen
+
+        The stream ends after the run's `end` event.
+        """
+        # The daemon sends a heartbeat well within this, so a silent socket means it died
+        with self._open('GET', f'/runs/{run_id}/events?after={after}', timeout=60) as response:
+            for line in response:
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                if event['type'] == 'heartbeat':
+                    continue
+                yield event
+                if event['type'] == 'end':
+                    return
+
+    def ping(self):
+        """Return True if the daemon answers"""
+        try:
+            self.status()
+            return True
+        except DaemonError:
+            return False
+
+
+def daemon_command():
+    """Command line that starts the daemon in the foreground"""
+    if getattr(sys, 'frozen', False):
+        # The packaged executable serves the daemon itself when asked to
+        return [sys.executable, '--daemon']
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'daemon.py')
+    return [sys.executable, script, 'serve']
+
+
+def spawn_daemon(command=None):
+    """Start the daemon as a detached background process, logging to LOG_FILE"""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    kwargs = {}
+    if os.name == 'nt':
+        kwargs['creationflags'] = (subprocess.CREATE_NEW_PROCESS_GROUP
+                                   | subprocess.DETACHED_PROCESS)
+    else:
+        kwargs['start_new_session'] = True
+    with open(LOG_FILE, 'ab') as log:
+        return subprocess.Popen(command or daemon_command(), stdin=subprocess.DEVNULL,
+                                stdout=log, stderr=subprocess.STDOUT, **kwargs)
+
+
+def ensure_daemon(command=None, timeout=SPAWN_TIMEOUT):
+    """Return a client for the running daemon, starting one if none answers"""
+    client = DaemonClient()
+    if client.ping():
+        return client
+    process = spawn_daemon(command)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise DaemonError(f"The daemon exited during startup; see {LOG_FILE}")
+        client = DaemonClient()
+        if client.ping():
+            return client
+        time.sleep(0.1)
+    raise DaemonError(f"The daemon did not answer within {timeout}s; see {LOG_FILE}")
+
+
+def follow_run(client, run_id, log=print):
+    """Print a run's log until it ends; Ctrl+C stops the run and keeps following
+
+    Returns the run's final summary.
+    """
+    after = 0
+    while True:
+        try:
+            for event in client.events(run_id, after):
+                after = event['seq']
+                if event['type'] == 'log':
+                    log(event['message'])
+                elif event['type'] == 'end':
+                    return event['run']
+            # The stream closed without an end event; ask for the summary directly
+            return client.run(run_id)
+        except KeyboardInterrupt:
+            log("Stopping the run (pending commits are still pushed)...")
+            client.stop_run(run_id)
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Git backend for the auto-committer
+Keeps long-lived git helper processes open so a commit costs pipe writes
+instead of process spawns, and times every git operation.
+"""
+
+import os
+import subprocess
+import tempfile
+import threading
+import time
+
+from change_writer import ChangeFileWriter
+
+
+class GitError(Exception):
+    """Raised when a git helper process fails or answers unexpectedly"""
+
+
+class GitWorker:
+    """One long-lived git process that answers a request written to its stdin"""
+
+    def __init__(self, repo_dir, args):
+        self.repo_dir = repo_dir
+        self.args = args
+        self.process = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Spawn the process on first use"""
+        if self.process is None or self.process.poll() is not None:
+            self.process = subprocess.Popen(
+                ['git', *self.args], cwd=self.repo_dir,
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        return self.process
+
+    def write(self, data):
+        """Write a request and flush it to the process"""
+        process = self.start()
+        try:
+            process.stdin.write(data)
+            process.stdin.flush()
+        except BrokenPipeError:
+            raise GitError(f"git {self.args[0]} exited: {self.read_error()}")
+
+    def readline(self):
+        """Read one reply line (without the newline)"""
+        line = self.process.stdout.readline()
+        if not line:
+            raise GitError(f"git {self.args[0]} exited: {self.read_error()}")
+        return line.rstrip(b"\n")
+
+    def read(self, size):
+        """Read exactly `size` bytes of reply"""
+        data = self.process.stdout.read(size)
+        if len(data) != size:
+            raise GitError(f"git {self.args[0]} returned a short read")
+        return data
+
+    def read_error(self):
+        if self.process.poll() is None:
+            return "no reply"
+        return self.process.stderr.read().decode('utf-8', 'replace').strip()
+
+    def close(self):
+        """Close stdin and wait; returns the exit code (None if never started)"""
+        if self.process is None:
+            return None
+        process, self.process = self.process, None
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = process.wait()
+        if returncode != 0:
+            error = process.stderr.read().decode('utf-8', 'replace').strip()
+            raise GitError(f"git {self.args[0]} failed: {error}")
+        return returncode
+
+
+class GitBackend:
+    """Git access for one repository: persistent helpers plus timed one-shot commands
+
+    Helpers are started lazily:
+      cat-file    git cat-file --batch                  read objects
+      blob        git hash-object -w --stdin-paths      write file blobs
+      commit      git hash-object -w -t commit ...      write commit objects
+      mktree      git mktree --batch                    write trees
+      update-ref  git update-ref --stdin                move branch refs
+      index       git update-index --stdin              refresh index entries
+
+    Commits are written straight to the object store and the branch ref, so the
+    index is only refreshed once, for every committed path, in flush_index().
+    """
+
+    # MemoryBackend (memory_backend.py) is the drop-in replacement without a repository
+    in_memory = False
+
+    def __init__(self, repo_dir):
+        self.repo_dir = repo_dir
+        self.workers = {
+            'cat-file': GitWorker(repo_dir, ['cat-file', '--batch']),
+            'blob': GitWorker(repo_dir, ['hash-object', '-w', '--stdin-paths']),
+            'commit': GitWorker(repo_dir, ['hash-object', '-w', '-t', 'commit', '--stdin-paths']),
+            'mktree': GitWorker(repo_dir, ['mktree', '--batch']),
+            'update-ref': GitWorker(repo_dir, ['update-ref', '-m', 'auto-committer', '--stdin']),
+            'index': GitWorker(repo_dir, ['update-index', '--add', '--stdin']),
+        }
+        self.stats = {}
+        self.spawns = 0
+        self.head_ref = None
+        self.head = None
+        self.head_tree = None
+        self.identity = None
+        self.trees = {}
+        self.staged_paths = set()
+        self.commit_tmp = None
+
+    def change_writer(self, path, initial_content, fsync='cycle'):
+        """An unopened append-only writer for a target file in the working tree"""
+        return ChangeFileWriter(path, initial_content, fsync=fsync)
+
+    # --- timing -----------------------------------------------------------------
+
+    def record(self, operation, seconds):
+        """Add one timed call to the per-operation counters"""
+        entry = self.stats.setdefault(operation, {'count': 0, 'seconds': 0.0})
+        entry['count'] += 1
+        entry['seconds'] += seconds
+
+    def reset_stats(self):
+        """Clear the timing and spawn counters"""
+        self.stats = {}
+        self.spawns = 0
+
+    def stats_summary(self):
+        """Return one line per operation: calls, total and mean time"""
+        lines = []
+        for operation, entry in sorted(self.stats.items()):
+            mean = entry['seconds'] / entry['count'] * 1000
+            lines.append(f"{operation:<16} {entry['count']:>6} calls "
+                         f"{entry['seconds']:8.3f}s total {mean:8.3f}ms avg")
+        return "\n".join(lines)
+
+    # --- one-shot commands ---------------------------------------------------------
+
+    def run(self, *args, check=False, capture=True):
+        """Run a one-shot git command (timed and counted as a spawn)"""
+        start = time.perf_counter()
+        try:
+            return subprocess.run(['git', *args], cwd=self.repo_dir, check=check,
+                                  capture_output=capture, text=capture)
+        finally:
+            self.spawns += 1
+            self.record(f"git {args[0]}", time.perf_counter() - start)
+
+    def query(self, *args):
+        """Run a git query and return stripped stdout, or None on failure"""
+        result = self.run(*args)
+        if result.returncode != 0:
+            return None
+        return result.stdout.strip()
+
+    # --- pipeline helpers ------------------------------------------------------------
+
+    def _request(self, name, data, reply=True):
+        worker = self.workers[name]
+        start = time.perf_counter()
+        with worker.lock:
+            if worker.process is None:
+                self.spawns += 1
+            worker.write(data)
+            line = worker.readline() if reply else None
+        self.record(name, time.perf_counter() - start)
+        return line
+
+    def hash_file(self, path):
+        """Write a file's content as a blob and return its id"""
+        return self._request('blob', os.path.abspath(path).encode('utf-8') + b"\n").decode()
+
+    def read_object(self, object_id):
+        """Return (type, content) for an object through cat-file --batch"""
+        worker = self.workers['cat-file']
+        start = time.perf_counter()
+        with worker.lock:
+            if worker.process is None:
+                self.spawns += 1
+            worker.write(object_id.encode('ascii') + b"\n")
+            header = worker.readline().split()
+            if len(header) != 3:
+                raise GitError(f"Object {object_id} not found")
+            content = worker.read(int(header[2]))
+            worker.read(1)
+        self.record('cat-file', time.perf_counter() - start)
+        return header[1].decode(), content
+
+    def read_tree(self, tree_id):
+        """Return the entries of a tree as (mode, type, id, name) tuples"""
+        if tree_id in self.trees:
+            return list(self.trees[tree_id])
+        object_type, content = self.read_object(tree_id)
+        if object_type != 'tree':
+            raise GitError(f"{tree_id} is a {object_type}, not a tree")
+        hash_size = len(tree_id) // 2
+        entries = []
+        pos = 0
+        while pos < len(content):
+            space = content.index(b' ', pos)
+            nul = content.index(b'\0', space)
+            mode = content[pos:space].decode()
+            name = content[space + 1:nul].decode('utf-8', 'surrogateescape')
+            object_id = content[nul + 1:nul + 1 + hash_size].hex()
+            kind = 'tree' if mode == '40000' else 'commit' if mode == '160000' else 'blob'
+            entries.append((mode.zfill(6), kind, object_id, name))
+            pos = nul + 1 + hash_size
+        self.trees[tree_id] = entries
+        return list(entries)
+
+    def make_tree(self, entries):
+        """Write a tree from (mode, type, id, name) entries and return its id"""
+        lines = b"".join(f"{mode} {kind} {object_id}\t{name}\n".encode('utf-8', 'surrogateescape')
+                         for mode, kind, object_id, name in entries)
+        tree_id = self._request('mktree', lines + b"\n").decode()
+        self.trees[tree_id] = list(entries)
+        return tree_id
+
+    def update_tree(self, tree_id, path_parts, blob_id):
+        """Return a new tree id with the blob at `path_parts` replaced"""
+        entries = self.read_tree(tree_id) if tree_id else []
+        name = path_parts[0]
+        existing = next((e for e in entries if e[3] == name), None)
+        entries = [e for e in entries if e[3] != name]
+
+        if len(path_parts) == 1:
+            mode = existing[0] if existing and existing[1] == 'blob' else '100644'
+            entries.append((mode, 'blob', blob_id, name))
+        else:
+            subtree = existing[2] if existing and existing[1] == 'tree' else None
+            entries.append(('040000', 'tree', self.update_tree(subtree, path_parts[1:], blob_id), name))
+        return self.make_tree(entries)
+
+    def write_commit(self, tree_id, parents, message, when=None):
+        """Write a commit object and return its id"""
+        if self.identity is None:
+            author = self.query('var', 'GIT_AUTHOR_IDENT')
+            committer = self.query('var', 'GIT_COMMITTER_IDENT')
+            if not author or not committer:
+                raise GitError("Git user.name/user.email are not configured")
+            self.identity = (author.rsplit(' ', 2)[0], committer.rsplit(' ', 2)[0])
+
+        if when is None:
+            when = time.time()
+        offset = time.localtime(when).tm_gmtoff // 60
+        stamp = f"{int(when)} {'+' if offset >= 0 else '-'}{abs(offset) // 60:02d}{abs(offset) % 60:02d}"
+
+        lines = [f"tree {tree_id}"]
+        lines += [f"parent {parent}" for parent in parents]
+        lines.append(f"author {self.identity[0]} {stamp}")
+        lines.append(f"committer {self.identity[1]} {stamp}")
+        body = "\n".join(lines) + "\n\n" + message.rstrip("\n") + "\n"
+
+        if self.commit_tmp is None:
+            handle, self.commit_tmp = tempfile.mkstemp(prefix='autocommit-', suffix='.commit')
+            os.close(handle)
+        with open(self.commit_tmp, 'wb') as f:
+            f.write(body.encode('utf-8'))
+        return self._request('commit', self.commit_tmp.encode('utf-8') + b"\n").decode()
+
+    def update_ref(self, ref, new_id, old_id=None):
+        """Move a ref in one update-ref transaction, checking its old value"""
+        zero = '0' * len(new_id)
+        command = f"start\nupdate {ref} {new_id} {old_id or zero}\ncommit\n".encode()
+        worker = self.workers['update-ref']
+        start = time.perf_counter()
+        with worker.lock:
+            if worker.process is None:
+                self.spawns += 1
+            worker.write(command)
+            replies = (worker.readline(), worker.readline())
+        self.record('update-ref', time.perf_counter() - start)
+        if replies != (b"start: ok", b"commit: ok"):
+            raise GitError(f"update-ref {ref} failed: {replies}")
+
+    def stage_path(self, path):
+        """Remember a committed path so flush_index() can refresh its entry"""
+        self.staged_paths.add(os.path.relpath(path, self.repo_dir).replace(os.sep, '/'))
+
+    def flush_index(self):
+        """Refresh the index entries of every committed path in one update-index run"""
+        if not self.staged_paths:
+            return
+        paths = b"".join(p.encode('utf-8') + b"\n" for p in sorted(self.staged_paths))
+        self._request('index', paths, reply=False)
+        start = time.perf_counter()
+        self.workers['index'].close()
+        self.record('index', time.perf_counter() - start)
+        self.staged_paths.clear()
+
+    # --- high level ---------------------------------------------------------------
+
+    def resolve_head(self):
+        """Load the checked-out branch ref and its tip commit"""
+        self.head_ref = self.query('symbolic-ref', '-q', 'HEAD') or 'HEAD'
+        self.head = self.query('rev-parse', '--verify', '-q', 'HEAD')
+
+    def commit_file(self, path, message, when=None):
+        """Commit the current content of one file on top of HEAD; returns the commit id"""
+        if self.head_ref is None:
+            self.resolve_head()
+
+        blob_id = self.hash_file(path)
+        if self.head and self.head_tree is None:
+            _, content = self.read_object(self.head)
+            self.head_tree = content.split(b"\n", 1)[0].split()[1].decode()
+
+        relative = os.path.relpath(path, self.repo_dir).replace(os.sep, '/')
+        tree_id = self.update_tree(self.head_tree, relative.split('/'), blob_id)
+        commit_id = self.write_commit(tree_id, [self.head] if self.head else [], message, when)
+        self.update_ref(self.head_ref, commit_id, self.head)
+        self.stage_path(path)
+
+        self.head = commit_id
+        self.head_tree = tree_id
+        return commit_id
+
+    def close(self):
+        """Refresh the index and stop every helper process"""
+        errors = []
+        try:
+            self.flush_index()
+        except GitError as e:
+            errors.append(str(e))
+        for worker in self.workers.values():
+            try:
+                worker.close()
+            except GitError as e:
+                errors.append(str(e))
+        if self.commit_tmp and os.path.exists(self.commit_tmp):
+            os.remove(self.commit_tmp)
+        self.commit_tmp = None
+        self.head_ref = None
+        self.head = None
+        self.head_tree = None
+        self.trees.clear()
+        if errors:
+            raise GitError("; ".join(errors))
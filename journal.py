@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Cycle journal for the auto-committer
+An append-only file in the git directory that records how far the current
+cycle got, so a killed run can resume where it stopped.
+"""
+
+import json
+import os
+import time
+
+from object_writer import find_git_dir
+
+JOURNAL_NAME = 'autocommit-journal'
+
+# Only the end of the file is read on resume; one record is far smaller than this
+TAIL_BYTES = 4096
+# Rewrite the journal down to its latest record once it grows past this
+COMPACT_BYTES = 1 << 20
+
+
+class Journal:
+    """Per-repository journal of one JSON line per event
+
+    Every record carries the full cycle state (planned count, next index,
+    commits still to push, last pushed SHA, HEAD and target file sizes as of
+    the last journaled commit), so the last line alone is enough to resume
+    and nothing before it ever has to be read.
+    """
+
+    def __init__(self, repo_dir, fsync=False):
+        self.path = os.path.join(find_git_dir(repo_dir), JOURNAL_NAME)
+        self.fsync = fsync
+        self.state = None
+        self.fd = None
+        self.size = 0
+
+    def last_state(self):
+        """Return the most recent complete record, or None"""
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                f.seek(max(0, size - TAIL_BYTES))
+                tail = f.read()
+        except FileNotFoundError:
+            return None
+        # The final line may be torn if the process died mid-write
+        for line in reversed(tail.splitlines()):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and 'planned' in record:
+                return record
+        return None
+
+    def unfinished(self):
+        """Return the state of a cycle that stopped before its end record, or None"""
+        state = self.last_state()
+        if state and state['event'] != 'end':
+            return state
+        return None
+
+    def _open(self):
+        if self.fd is None:
+            flags = os.O_RDWR | os.O_APPEND | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+            self.fd = os.open(self.path, flags, 0o644)
+            self.size = os.fstat(self.fd).st_size
+            # Terminate a line torn by a crash so the next record starts cleanly
+            if self.size:
+                os.lseek(self.fd, -1, os.SEEK_END)
+                if os.read(self.fd, 1) != b"\n":
+                    self.size += os.write(self.fd, b"\n")
+
+    def _write(self, event, sizes=None, **changes):
+        self.state.update(changes)
+        if sizes:
+            # Only the files that changed are passed; the others keep their last size
+            self.state['sizes'] = {**self.state.get('sizes', {}), **sizes}
+        self.state['event'] = event
+        self.state['updated'] = round(time.time(), 3)
+        line = (json.dumps(self.state, separators=(',', ':')) + "\n").encode('utf-8')
+        self._open()
+        if self.size + len(line) > COMPACT_BYTES:
+            self._compact(line)
+            return
+        os.write(self.fd, line)
+        self.size += len(line)
+        if self.fsync:
+            os.fsync(self.fd)
+
+    def _compact(self, line):
+        """Replace the journal with just the latest record"""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        os.close(self.fd)
+        os.replace(tmp_path, self.path)
+        self.fd = None
+        self._open()
+
+    def begin(self, planned, engine, resume=None, resumable=True, pending=0):
+        """Start a cycle, or continue `resume` (a state from unfinished())"""
+        if resume is not None:
+            self.state = dict(resume)
+            self._write('resume', resumes=self.state.get('resumes', 0) + 1)
+        else:
+            now = round(time.time(), 3)
+            self.state = {
+                'cycle': time.strftime('%Y%m%d-%H%M%S', time.localtime(now)),
+                'engine': engine,
+                'planned': planned,
+                'next': 0,
+                'committed': 0,
+                'pending': pending,
+                'pushed': (self.last_state() or {}).get('pushed'),
+                'started': now,
+                'resumable': resumable,
+            }
+            self._write('start')
+        return self.state
+
+    def checkpoint(self, head, sizes):
+        """Record HEAD and the target file sizes before the first change (after a rotation)"""
+        self._write('checkpoint', head=head, sizes=sizes)
+
+    def record_commit(self, index, ok, pending, head=None, sizes=None):
+        """Record that change `index` was handled
+
+        Called as soon as the commit exists, before any push, with the new HEAD
+        and the size of the file it committed.
+        """
+        changes = {'head': head} if ok and head else {}
+        self._write('commit', sizes=sizes if ok else None, next=index + 1,
+                    committed=self.state['committed'] + bool(ok), pending=pending, **changes)
+
+    def record_batch(self, next_index, count, pending, head=None, sizes=None):
+        """Record commits that landed together (pack, fast-import and timeline engines)"""
+        changes = {'head': head} if head else {}
+        self._write('commit', sizes=sizes, next=next_index, committed=self.state['committed'] + count,
+                    pending=pending, **changes)
+
+    def extend(self, planned):
+        """Raise the planned count (commits merged into the running cycle)"""
+        self._write('extend', planned=planned)
+
+    def record_push(self, sha):
+        """Record a successful push of everything up to `sha` (a rebase may have moved HEAD there)"""
+        self._write('push', pushed=sha, head=sha, pending=0)
+
+    def finish(self, pending):
+        """Mark the cycle complete"""
+        self._write('end', pending=pending)
+
+    def close(self):
+        """Close the journal file"""
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Repository maintenance for the auto-committer
+Keeps a repository that gains thousands of tiny commits fast: refreshes the
+commit-graph, repacks loose objects and small packs geometrically behind a
+multi-pack-index, and prunes what is left over. Each step only runs once its
+threshold says it pays off; before/after object counts and step timings are
+reported and kept in .git/autocommit-maintenance.
+"""
+
+import json
+import os
+import time
+
+STATE_FILE = 'autocommit-maintenance'
+
+# Step thresholds: new commits since the last commit-graph, loose objects, packs
+DEFAULT_THRESHOLDS = {'commits': 1000, 'loose': 1000, 'packs': 10}
+# Unreachable loose objects younger than this are kept (an interrupted cycle may still need them)
+PRUNE_EXPIRE = '2.weeks.ago'
+
+# Fields of `git count-objects -v` that go into the report (sizes in KiB)
+COUNT_FIELDS = ('count', 'size', 'in-pack', 'packs', 'size-pack', 'prune-packable', 'garbage')
+
+
+class MaintenanceError(Exception):
+    """A maintenance step failed"""
+
+
+def parse_thresholds(text):
+    """Thresholds from 'commits=N,loose=N,packs=N' (missing keys keep their defaults)"""
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    for item in text.split(','):
+        if not item.strip():
+            continue
+        key, _, value = item.partition('=')
+        key = key.strip().lower()
+        if key not in thresholds:
+            raise ValueError(f"Unknown threshold {key!r} (commits, loose or packs)")
+        if not value.strip().isdigit():
+            raise ValueError(f"Threshold {key} needs a non-negative number")
+        thresholds[key] = int(value)
+    return thresholds
+
+
+class RepoMaintenance:
+    """Runs the maintenance steps that are due for one repository
+
+      commit-graph   git commit-graph write --reachable --split
+                     once `commits` commits were added since the last write
+      repack         git repack -d --geometric=2 --write-midx
+                     once there are `loose` loose objects or `packs` packs
+      prune          git prune-packed, then git prune --expire=2.weeks.ago
+                     if `loose` loose objects are still there after repacking
+
+    A threshold of 0 runs its step every time.
+    """
+
+    def __init__(self, backend, thresholds=None, prune_expire=PRUNE_EXPIRE, log=print):
+        self.backend = backend
+        self.thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+        self.prune_expire = prune_expire
+        self.log = log
+        self.state_path = None
+
+    def describe(self):
+        t = self.thresholds
+        return (f"commit-graph every {t['commits']} commits, repack at {t['loose']} loose "
+                f"objects or {t['packs']} packs")
+
+    def git(self, *args):
+        result = self.backend.run(*args)
+        if result.returncode != 0:
+            message = (result.stderr or result.stdout or '').strip().splitlines()
+            raise MaintenanceError(f"git {args[0]} failed: {message[-1] if message else 'no output'}")
+        return result.stdout
+
+    def object_counts(self):
+        """`git count-objects -v` as a dict of ints"""
+        counts = {}
+        for line in self.git('count-objects', '-v').splitlines():
+            key, _, value = line.partition(':')
+            if key in COUNT_FIELDS:
+                counts[key] = int(value)
+        return counts
+
+    def load_state(self):
+        """What the last run recorded, or {}"""
+        if self.state_path is None:
+            common_dir = self.git('rev-parse', '--git-common-dir').strip()
+            self.state_path = os.path.join(self.backend.repo_dir, common_dir, STATE_FILE)
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_state(self, state):
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def new_commits(self, since):
+        """Commits reachable from HEAD but not from `since` (all of them if it is gone)"""
+        if since and self.backend.query('cat-file', '-e', f"{since}^{{commit}}") is not None:
+            count = self.backend.query('rev-list', '--count', f"{since}..HEAD")
+        else:
+            count = self.backend.query('rev-list', '--count', 'HEAD')
+        return int(count or 0)
+
+    def due_steps(self, counts, state, force=False):
+        """Names of the steps whose thresholds are reached"""
+        steps = []
+        if force or self.new_commits(state.get('graph_head')) >= self.thresholds['commits']:
+            steps.append('commit-graph')
+        if (force or counts['count'] >= self.thresholds['loose']
+                or counts['packs'] >= self.thresholds['packs']):
+            steps.append('repack')
+        if force or counts['count'] >= self.thresholds['loose'] or counts['prune-packable']:
+            steps.append('prune')
+        return steps
+
+    def run(self, force=False):
+        """Run the due steps (all of them with `force`); returns the report dict"""
+        start = time.perf_counter()
+        state = self.load_state()
+        before = self.object_counts()
+        head = self.backend.query('rev-parse', '--verify', '-q', 'HEAD')
+        steps = self.due_steps(before, state, force) if head else []
+        report = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'before': before, 'steps': {}}
+        if not steps:
+            report['after'] = before
+            report['seconds'] = round(time.perf_counter() - start, 3)
+            self.log(f"Maintenance: nothing due ({before['count']} loose objects, "
+                     f"{before['packs']} packs)")
+            return report
+
+        for step in steps:
+            step_start = time.perf_counter()
+            if step == 'commit-graph':
+                self.git('commit-graph', 'write', '--reachable', '--split')
+                state['graph_head'] = head
+            elif step == 'repack':
+                self.git('repack', '-d', '-q', '--geometric=2', '--write-midx')
+            elif step == 'prune':
+                self.git('prune-packed', '-q')
+                # Whatever repack left loose is unreachable; drop it once it is old enough
+                if force or self.object_counts()['count'] >= self.thresholds['loose']:
+                    self.git('prune', f"--expire={self.prune_expire}")
+            report['steps'][step] = round(time.perf_counter() - step_start, 3)
+
+        report['after'] = self.object_counts()
+        report['seconds'] = round(time.perf_counter() - start, 3)
+        state['last'] = report
+        self.save_state(state)
+        self.log_report(report)
+        return report
+
+    def log_report(self, report):
+        before, after = report['before'], report['after']
+        steps = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in report['steps'].items())
+        self.log(f"Maintenance: {steps} ({report['seconds']:.2f}s total)")
+        self.log(f"  loose objects {before['count']} -> {after['count']}, "
+                 f"packs {before['packs']} -> {after['packs']}, "
+                 f"packed objects {before['in-pack']} -> {after['in-pack']}, "
+                 f"size {before['size'] + before['size-pack']} KiB -> "
+                 f"{after['size'] + after['size-pack']} KiB")
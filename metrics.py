@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Metrics for the auto-committer
+Times each stage of every commit iteration (modify, stage, commit, push), counts
+git process spawns and bytes written, and exports them as a JSON-lines log and
+Prometheus text.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+STAGES = ('modify', 'stage', 'commit', 'push')
+
+# Histogram bucket upper bounds in seconds (Prometheus style, +Inf is implicit)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+COUNTER_HELP = {
+    'commits': "Commits written",
+    'failures': "Iterations that failed to modify or commit",
+    'pushes': "Push attempts",
+    'push_retries': "Pushes retried after a transient error",
+    'push_rebases': "Rebases onto a remote branch that had moved on",
+    'cycles': "Commit cycles run",
+    'lock_merges': "Commit requests merged into a running cycle",
+    'spawns': "Git processes started",
+    'change_bytes': "Bytes appended to the target file",
+    'object_bytes': "Bytes of git objects written in-process or streamed to fast-import",
+}
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; memory stays constant however long it runs"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        """Add one sample"""
+        index = 0
+        while index < len(self.buckets) and seconds > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, fraction):
+        """Estimate a quantile by interpolating inside its bucket (like histogram_quantile)"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and seen + count >= rank:
+                upper = min(bound, self.max)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return self.max
+
+    def summary(self):
+        """Count, total and p50/p90/p99/max in milliseconds"""
+        return {
+            'count': self.count,
+            'total_ms': round(self.sum * 1000, 3),
+            'p50_ms': round(self.quantile(0.50) * 1000, 3),
+            'p90_ms': round(self.quantile(0.90) * 1000, 3),
+            'p99_ms': round(self.quantile(0.99) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+        }
+
+
+class Metrics:
+    """Collects stage timings and counters for one committer
+
+    Lifetime histograms and counters feed the Prometheus endpoint; per-cycle
+    histograms feed the summary printed (and logged) at the end of each cycle.
+    Counters such as spawns are handed in as running totals of the cycle and
+    turned into per-iteration deltas here.
+    """
+
+    def __init__(self, log_path=None):
+        self.log_path = log_path
+        self.log_file = open(log_path, 'a', encoding='utf-8', buffering=1) if log_path else None
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = dict.fromkeys(COUNTER_HELP, 0)
+        self.cycle_histograms = {}
+        self.cycle_counters = {}
+        self.iteration_stages = {}
+        self.last_totals = {}
+        self.cycle_fields = {}
+        self.cycle_started = None
+
+    def write_event(self, event, **fields):
+        """Append one JSON line to the metrics log (if one is configured)"""
+        if self.log_file is None:
+            return
+        record = {'event': event, 'time': datetime.now().isoformat(timespec='milliseconds')}
+        record.update(fields)
+        self.log_file.write(json.dumps(record) + "\n")
+
+    def start_cycle(self, **fields):
+        """Reset the per-cycle state; numeric fields are the counters' starting totals"""
+        with self.lock:
+            self.cycle_histograms = {}
+            self.cycle_counters = {}
+            self.iteration_stages = {}
+            self.last_totals = {k: v for k, v in fields.items() if k in COUNTER_HELP}
+            self.cycle_fields = {k: v for k, v in fields.items() if k not in COUNTER_HELP}
+            self.cycle_started = time.perf_counter()
+        self.add('cycles')
+        self.write_event('cycle_start', **self.cycle_fields)
+
+    def observe(self, stage, seconds):
+        """Record one timed stage"""
+        with self.lock:
+            for histograms in (self.histograms, self.cycle_histograms):
+                histograms.setdefault(stage, Histogram()).observe(seconds)
+            self.iteration_stages[stage] = self.iteration_stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as one stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def add(self, counter, amount=1):
+        """Increment a counter"""
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+            self.cycle_counters[counter] = self.cycle_counters.get(counter, 0) + amount
+
+    def _take_deltas(self, totals):
+        deltas = {}
+        for name, value in totals.items():
+            delta = value - self.last_totals.get(name, 0)
+            self.last_totals[name] = value
+            if delta:
+                deltas[name] = delta
+        return deltas
+
+    def end_iteration(self, index, ok, **totals):
+        """Close one iteration: update counters and log its stage timings"""
+        with self.lock:
+            deltas = self._take_deltas(totals)
+            stages = {k: round(v * 1000, 3) for k, v in self.iteration_stages.items()}
+            self.iteration_stages = {}
+        for name, delta in deltas.items():
+            self.add(name, delta)
+        self.add('commits' if ok else 'failures')
+        self.write_event('iteration', index=index, ok=ok, stages_ms=stages, **deltas)
+
+    def end_cycle(self, **fields):
+        """Close the cycle and return its summary; numeric counter fields are final totals"""
+        with self.lock:
+            deltas = self._take_deltas({k: v for k, v in fields.items() if k in COUNTER_HELP})
+            self.iteration_stages = {}
+        for name, delta in deltas.items():
+            self.add(name, delta)
+        with self.lock:
+            summary = dict(self.cycle_fields)
+            summary.update((k, v) for k, v in fields.items() if k not in COUNTER_HELP)
+            summary['seconds'] = round(time.perf_counter() - (self.cycle_started or time.perf_counter()), 3)
+            summary['counters'] = dict(self.cycle_counters)
+            summary['stages'] = {name: histogram.summary()
+                                 for name, histogram in self.cycle_histograms.items()}
+        self.write_event('cycle', **summary)
+        return summary
+
+    def summary_lines(self):
+        """One line per stage of the current cycle plus the counters"""
+        with self.lock:
+            names = [s for s in STAGES if s in self.cycle_histograms]
+            names += sorted(set(self.cycle_histograms) - set(STAGES))
+            lines = []
+            for name in names:
+                s = self.cycle_histograms[name].summary()
+                lines.append(f"{name:<16} {s['count']:>6} calls {s['total_ms'] / 1000:8.3f}s total "
+                             f"p50 {s['p50_ms']:8.3f}ms p90 {s['p90_ms']:8.3f}ms max {s['max_ms']:8.3f}ms")
+            counters = ", ".join(f"{k}={v}" for k, v in sorted(self.cycle_counters.items()))
+        if counters:
+            lines.append(counters)
+        return lines
+
+    def prometheus_text(self):
+        """Render lifetime histograms and counters in the Prometheus text format"""
+        lines = ["# HELP autocommit_stage_seconds Time spent in each stage of a commit iteration",
+                 "# TYPE autocommit_stage_seconds histogram"]
+        with self.lock:
+            for name, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'autocommit_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'autocommit_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {histogram.count}')
+                lines.append(f'autocommit_stage_seconds_sum{{stage="{name}"}} {histogram.sum:.6f}')
+                lines.append(f'autocommit_stage_seconds_count{{stage="{name}"}} {histogram.count}')
+            for name, value in sorted(self.counters.items()):
+                metric = f"autocommit_{name}_total"
+                lines.append(f"# HELP {metric} {COUNTER_HELP.get(name, name)}")
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        """Close the metrics log"""
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+
+
+class MetricsServer:
+    """Serves Metrics.prometheus_text() at /metrics from a background thread"""
+
+    def __init__(self, metrics, port, host='127.0.0.1'):
+        self.metrics = metrics
+        self.address = (host, port)
+        self.server = None
+
+    def start(self):
+        """Bind the port and serve until stop()"""
+        # Imported here: most runs never serve metrics and http.server is slow to import
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(self.address, Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def stop(self):
+        """Stop serving and release the port"""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
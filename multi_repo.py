@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Multi-Repository Runner
+Runs auto-commit cycles across many repositories concurrently, with a
+separate (lower) limit on how many of them may push at the same time.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from auto_committer import AutoCommitter, ENGINES
+from object_writer import ObjectStoreError, find_git_dir
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_PUSH_CONCURRENCY = 1
+
+_print_lock = threading.Lock()
+
+
+def log_line(message):
+    """Print one line without interleaving output from other workers"""
+    with _print_lock:
+        print(message, flush=True)
+
+
+def load_config(path):
+    """Load repositories from a JSON config file
+
+    The file is either a list of repository entries or an object with a
+    "repos" list plus optional "concurrency" and "push_concurrency" keys.
+    Each entry is a path string or an object with "path" and optional
+    "commits", "target_file" and "engine".
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        data = {'repos': data}
+    base_dir = os.path.dirname(os.path.abspath(path))
+    repos = []
+    for entry in data.get('repos', []):
+        if isinstance(entry, str):
+            entry = {'path': entry}
+        entry = dict(entry)
+        entry['path'] = os.path.join(base_dir, os.path.expanduser(entry['path']))
+        repos.append(entry)
+    return data, repos
+
+
+def run_repo(job, push_limiter=None, quiet=False):
+    """Run one repository's cycle and return its summary"""
+    name = os.path.basename(os.path.normpath(job['path']))
+    summary = {
+        'path': job['path'],
+        'requested': job.get('commits', 150),
+        'committed': 0,
+        'failed': 0,
+        'pushed': False,
+        'seconds': 0.0,
+        'error': None,
+    }
+    start = time.perf_counter()
+
+    def log(message):
+        if not quiet:
+            for line in str(message).splitlines() or ['']:
+                log_line(f"[{name}] {line}")
+
+    try:
+        try:
+            # Linked worktrees and submodules have a .git file, not a directory
+            find_git_dir(job['path'])
+        except ObjectStoreError as e:
+            raise RuntimeError(str(e))
+        committer = AutoCommitter(engine=job.get('engine', 'subprocess'),
+                                  repo_dir=job['path'],
+                                  target_file=job.get('target_file', 'changes.txt'),
+                                  max_commits=summary['requested'],
+                                  log_callback=log)
+        committer.push_limiter = push_limiter
+        summary['committed'] = committer.run_commit_cycle()
+        summary['failed'] = summary['requested'] - summary['committed']
+        summary['pushed'] = bool(committer.last_push_ok)
+    except Exception as e:
+        summary['error'] = str(e)
+        summary['failed'] = summary['requested'] - summary['committed']
+    summary['seconds'] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+class MultiRepoRunner:
+    """Runs commit cycles for a list of repositories on a thread or process pool"""
+
+    def __init__(self, jobs, concurrency=DEFAULT_CONCURRENCY,
+                 push_concurrency=DEFAULT_PUSH_CONCURRENCY, use_processes=False, quiet=False):
+        if concurrency < 1 or push_concurrency < 1:
+            raise ValueError("Concurrency limits must be at least 1")
+        self.jobs = jobs
+        self.concurrency = concurrency
+        self.push_concurrency = min(push_concurrency, concurrency)
+        self.use_processes = use_processes
+        self.quiet = quiet
+
+    def run(self):
+        """Run every job and return the summaries in input order"""
+        results = [None] * len(self.jobs)
+        if self.use_processes:
+            manager = multiprocessing.Manager()
+            push_limiter = manager.BoundedSemaphore(self.push_concurrency)
+            executor = ProcessPoolExecutor(max_workers=self.concurrency)
+        else:
+            manager = None
+            push_limiter = threading.BoundedSemaphore(self.push_concurrency)
+            executor = ThreadPoolExecutor(max_workers=self.concurrency)
+
+        try:
+            with executor:
+                futures = {executor.submit(run_repo, job, push_limiter, self.quiet): i
+                           for i, job in enumerate(self.jobs)}
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+        finally:
+            if manager is not None:
+                manager.shutdown()
+        return results
+
+
+def format_summary(results):
+    """Render per-repository results as a table"""
+    lines = [f"{'Repository':<40} {'Done':>6} {'Failed':>6} {'Pushed':>6} {'Seconds':>8}  Error"]
+    for result in results:
+        lines.append(f"{result['path'][-40:]:<40} {result['committed']:>6} {result['failed']:>6} "
+                     f"{'yes' if result['pushed'] else 'no':>6} {result['seconds']:>8.2f}  "
+                     f"{result['error'] or ''}")
+    total = sum(r['committed'] for r in results)
+    failed = sum(1 for r in results if r['error'] or r['failed'])
+    lines.append(f"{len(results)} repositories, {total} commits, {failed} with failures")
+    return "\n".join(lines)
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Run auto-commit cycles across many repositories")
+    parser.add_argument('paths', nargs='*', help="Repository paths")
+    parser.add_argument('--config', help="JSON file listing repositories")
+    parser.add_argument('--commits', type=int, default=150, help="Commits per repository")
+    parser.add_argument('--target-file', default='changes.txt')
+    parser.add_argument('--engine', choices=ENGINES, default='subprocess')
+    parser.add_argument('--jobs', type=int, help="Repositories processed at once")
+    parser.add_argument('--push-jobs', type=int, help="Pushes allowed at once")
+    parser.add_argument('--processes', action='store_true', help="Use a process pool instead of threads")
+    parser.add_argument('--json', help="Also write the summary to this JSON file")
+    parser.add_argument('--quiet', action='store_true', help="Only print the summary")
+    args = parser.parse_args()
+
+    settings = {}
+    jobs = []
+    if args.config:
+        settings, jobs = load_config(args.config)
+    jobs += [{'path': os.path.abspath(path)} for path in args.paths]
+    if not jobs:
+        parser.print_usage()
+        return 1
+
+    for job in jobs:
+        job.setdefault('commits', args.commits)
+        job.setdefault('target_file', args.target_file)
+        job.setdefault('engine', args.engine)
+
+    runner = MultiRepoRunner(
+        jobs,
+        concurrency=args.jobs or settings.get('concurrency', DEFAULT_CONCURRENCY),
+        push_concurrency=args.push_jobs or settings.get('push_concurrency', DEFAULT_PUSH_CONCURRENCY),
+        use_processes=args.processes,
+        quiet=args.quiet)
+    results = runner.run()
+
+    print(format_summary(results))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0 if all(not r['error'] and not r['failed'] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Direct packfile writer
+Streams generated objects into a single .pack (with a matching .idx) instead
+of loose files, delta-compressing each blob against the previous version.
+"""
+
+import hashlib
+import os
+import struct
+import zlib
+
+TYPE_CODES = {'commit': 1, 'tree': 2, 'blob': 3, 'tag': 4}
+OFS_DELTA = 6
+
+# Longest run a single copy instruction can describe
+MAX_COPY = 0xffffff
+# Longest literal a single insert instruction can carry
+MAX_INSERT = 0x7f
+# Deltas are only used when the shared prefix is at least this long
+MIN_DELTA_PREFIX = 64
+# Same default as `git repack --depth`; keeps reads of the newest blob cheap
+MAX_DELTA_DEPTH = 50
+
+
+def encode_size(value):
+    """Encode a delta header size as a little-endian base-128 varint"""
+    out = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def encode_entry_header(type_code, size):
+    """Encode a pack entry's type and uncompressed size"""
+    byte = (type_code << 4) | (size & 0x0f)
+    size >>= 4
+    out = bytearray()
+    while size:
+        out.append(byte | 0x80)
+        byte = size & 0x7f
+        size >>= 7
+    out.append(byte)
+    return bytes(out)
+
+
+def encode_offset(distance):
+    """Encode the backwards distance of an OFS_DELTA base"""
+    out = bytearray([distance & 0x7f])
+    distance >>= 7
+    while distance:
+        distance -= 1
+        out.insert(0, 0x80 | (distance & 0x7f))
+        distance >>= 7
+    return bytes(out)
+
+
+def common_prefix(a, b):
+    """Length of the common prefix of two byte strings"""
+    limit = min(len(a), len(b))
+    if a[:limit] == b[:limit]:
+        return limit
+    low, high = 0, limit
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[:mid] == b[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def make_delta(base, target):
+    """Build a delta that copies the shared prefix of `base` and inserts the rest
+
+    Generated files only ever grow at the end, so this catches nearly all of
+    the redundancy between successive versions. Returns None when not worth it.
+    """
+    prefix = common_prefix(base, target)
+    if prefix < MIN_DELTA_PREFIX:
+        return None
+
+    out = bytearray(encode_size(len(base)) + encode_size(len(target)))
+    offset = 0
+    while offset < prefix:
+        length = min(MAX_COPY, prefix - offset)
+        op = 0x80
+        args = bytearray()
+        for i in range(4):
+            byte = (offset >> (8 * i)) & 0xff
+            if byte:
+                op |= 1 << i
+                args.append(byte)
+        for i in range(3):
+            byte = (length >> (8 * i)) & 0xff
+            if byte:
+                op |= 0x10 << i
+                args.append(byte)
+        out.append(op)
+        out += args
+        offset += length
+
+    for start in range(prefix, len(target), MAX_INSERT):
+        chunk = target[start:start + MAX_INSERT]
+        out.append(len(chunk))
+        out += chunk
+
+    if len(out) >= len(target):
+        return None
+    return bytes(out)
+
+
+class PackWriter:
+    """Collects objects into one packfile and writes its version 2 index
+
+    Use as the `sink` of an ObjectStore: every object the store would have
+    written loose is appended to the pack instead. Refs must only be moved
+    after finish() has renamed the pack into place.
+    """
+
+    def __init__(self, store, compression=zlib.Z_BEST_SPEED):
+        self.store = store
+        self.compression = compression
+        self.pack_dir = os.path.join(store.objects_dir, 'pack')
+        os.makedirs(self.pack_dir, exist_ok=True)
+        self.tmp_path = os.path.join(self.pack_dir, f"tmp_pack_{os.getpid()}")
+        self.file = open(self.tmp_path, 'w+b')
+        # Object count is patched in by finish()
+        self.file.write(b'PACK' + struct.pack('>II', 2, 0))
+        self.entries = {}
+        self.last_blob = None
+        self.depth = {}
+        self.deltas = 0
+        self.bytes_written = self.file.tell()
+
+    def add(self, object_type, data):
+        """Append one object (skipping duplicates) and return its id"""
+        object_id, _ = self.store.hash_object(object_type, data)
+        if object_id in self.entries:
+            return object_id
+
+        offset = self.file.tell()
+        delta = None
+        depth = 0
+        if (object_type == 'blob' and self.last_blob is not None
+                and self.depth[self.last_blob[0]] < MAX_DELTA_DEPTH):
+            delta = make_delta(self.last_blob[1], data)
+
+        if delta is not None:
+            header = encode_entry_header(OFS_DELTA, len(delta))
+            header += encode_offset(offset - self.entries[self.last_blob[0]][0])
+            payload = delta
+            depth = self.depth[self.last_blob[0]] + 1
+            self.deltas += 1
+        else:
+            header = encode_entry_header(TYPE_CODES[object_type], len(data))
+            payload = data
+
+        entry = header + zlib.compress(payload, self.compression)
+        self.file.write(entry)
+        self.bytes_written += len(entry)
+        self.entries[object_id] = (offset, zlib.crc32(entry) & 0xffffffff)
+        if object_type == 'blob':
+            self.last_blob = (object_id, data)
+            self.depth[object_id] = depth
+        return object_id
+
+    def finish(self):
+        """Write the trailer and index, move both into place; returns the pack path"""
+        self.file.seek(8)
+        self.file.write(struct.pack('>I', len(self.entries)))
+        self.file.seek(0)
+        digest = hashlib.new(self.store.hash_name)
+        for chunk in iter(lambda: self.file.read(1 << 20), b''):
+            digest.update(chunk)
+        checksum = digest.digest()
+        self.file.seek(0, os.SEEK_END)
+        self.file.write(checksum)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+
+        base = os.path.join(self.pack_dir, f"pack-{checksum.hex()}")
+        tmp_idx = self.tmp_path + '.idx'
+        with open(tmp_idx, 'wb') as f:
+            f.write(self._build_index(checksum))
+        # Index last, so readers never see an .idx without its .pack
+        os.replace(self.tmp_path, base + '.pack')
+        os.replace(tmp_idx, base + '.idx')
+        self.store.packs = None
+        return base + '.pack'
+
+    def _build_index(self, pack_checksum):
+        ids = sorted(bytes.fromhex(object_id) for object_id in self.entries)
+        fanout = [0] * 256
+        for raw_id in ids:
+            fanout[raw_id[0]] += 1
+        total = 0
+        for i in range(256):
+            total += fanout[i]
+            fanout[i] = total
+
+        offsets = bytearray()
+        large = bytearray()
+        crcs = bytearray()
+        for raw_id in ids:
+            offset, crc = self.entries[raw_id.hex()]
+            crcs += struct.pack('>I', crc)
+            if offset < 0x80000000:
+                offsets += struct.pack('>I', offset)
+            else:
+                offsets += struct.pack('>I', 0x80000000 | (len(large) // 8))
+                large += struct.pack('>Q', offset)
+
+        index = bytearray(b'\xfftOc' + struct.pack('>I', 2))
+        index += struct.pack('>256I', *fanout)
+        index += b''.join(ids)
+        index += crcs + offsets + large + pack_checksum
+        index += hashlib.new(self.store.hash_name, bytes(index)).digest()
+        return bytes(index)
+
+    def abort(self):
+        """Discard the partial pack"""
+        if not self.file.closed:
+            self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
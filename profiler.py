@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Cycle profiler for the auto-committer
+Samples the stack of the thread running a commit cycle and sorts its wall time
+into Python on the CPU, waiting on each git child process, and other off-CPU
+time (sleeps, disk, locks). Writes a collapsed-stack file for flamegraph tools
+and a top-N text summary.
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+import types
+from datetime import datetime
+
+from daemon_client import STATE_DIR
+from fast_import import FastImportEngine
+from git_backend import GitWorker
+
+PROFILE_DIR = os.path.join(STATE_DIR, 'profiles')
+
+SAMPLE_INTERVAL = 0.001
+TOP_FUNCTIONS = 25
+
+# Synthetic leaf frame for time the thread was off the CPU without waiting on git
+OFF_CPU = '[off-cpu]'
+
+# A frame running one of these is waiting on a child process: spawning it,
+# talking to it, or waiting for it to exit
+POPEN_CODES = frozenset(f.__code__ for f in vars(subprocess.Popen).values()
+                        if isinstance(f, types.FunctionType))
+# Pipe reads and writes of the long-lived git helpers; their `self.process` is the child
+PIPE_CODES = frozenset(f.__code__ for f in (GitWorker.write, GitWorker.readline, GitWorker.read,
+                                            FastImportEngine._write))
+# subprocess.run() and friends, folded into the wait below them
+RUNNER_CODES = frozenset(f.__code__ for f in (subprocess.run, subprocess.call, subprocess.check_call,
+                                              subprocess.check_output))
+FOLDED_CODES = POPEN_CODES | RUNNER_CODES
+
+
+def default_prefix():
+    """~/.auto-committer/profiles/cycle-YYYYmmdd-HHMMSS (outside the repository, so never committed)"""
+    return os.path.join(PROFILE_DIR, f"cycle-{datetime.now():%Y%m%d-%H%M%S}")
+
+
+def frame_label(code):
+    name = getattr(code, 'co_qualname', code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)})"
+
+
+def child_label(process):
+    """'git commit' for a Popen running `git commit ...`"""
+    args = getattr(process, 'args', None)
+    if isinstance(args, (str, bytes)):
+        args = [args]
+    if not args:
+        return 'child process'
+    program = os.path.basename(str(args[0]))
+    if program.lower() in ('git', 'git.exe') and len(args) > 1:
+        return f"git {args[1]}"
+    return program
+
+
+def child_wait(frame):
+    """(depth, label) if the sampled thread is waiting on a child process, else None
+
+    `depth` counts frames from the leaf to the outermost subprocess or pipe
+    frame of the wait; those frames are folded into the label.
+    """
+    depth = 0
+    while frame is not None:
+        code = frame.f_code
+        if code in POPEN_CODES or code in PIPE_CODES:
+            owner = frame.f_locals.get('self')
+            process = owner if code in POPEN_CODES else getattr(owner, 'process', None)
+            while frame.f_back is not None and frame.f_back.f_code in FOLDED_CODES:
+                frame = frame.f_back
+                depth += 1
+            return depth, f"[{child_label(process)}]"
+        frame = frame.f_back
+        depth += 1
+    return None
+
+
+def thread_cpu_clock(thread_id):
+    """A clock id for the CPU time of a thread, or None where there is none (Windows)"""
+    try:
+        return time.pthread_getcpuclockid(thread_id)
+    except (AttributeError, OSError):
+        return None
+
+
+class CycleProfiler:
+    """Statistical profiler for one cycle, run on the thread that calls start()
+
+    A background thread samples the cycle thread's stack every `interval`
+    seconds. Each sample is weighted by the wall time since the previous one,
+    so the 5ms GIL switch interval does not under-count Python next to git
+    waits. Where threads have a CPU clock, the part of that time the thread
+    spent off the CPU outside git is reported separately as [off-cpu].
+    Sampling leaves the cycle's own code alone; a tracing profiler would
+    inflate exactly the Python overhead being measured.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL, log=print):
+        self.interval = interval
+        self.log = log
+        # (code objects root first, synthetic leaf or None) -> seconds
+        self.stacks = {}
+        self.samples = 0
+        self.wall = 0.0
+        self.thread_id = None
+        self.base_depth = 0
+        self.cpu_clock = None
+        self.stop_event = threading.Event()
+        self.sampler = None
+        self.started = None
+
+    def __enter__(self):
+        return self.start(sys._getframe(1))
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def start(self, caller=None):
+        """Start sampling the calling thread; the caller's frame becomes the root of every stack"""
+        caller = caller or sys._getframe(1)
+        depth = 0
+        while caller is not None:
+            caller = caller.f_back
+            depth += 1
+        self.base_depth = depth - 1
+        self.thread_id = threading.get_ident()
+        self.cpu_clock = thread_cpu_clock(self.thread_id)
+        self.stop_event.clear()
+        self.started = time.perf_counter()
+        self.sampler = threading.Thread(target=self.sample_loop, name='cycle-profiler', daemon=True)
+        self.sampler.start()
+        return self
+
+    def stop(self):
+        """Stop sampling; returns the profiled wall time"""
+        if self.sampler is not None:
+            self.stop_event.set()
+            self.sampler.join()
+            self.sampler = None
+            self.wall = time.perf_counter() - self.started
+        return self.wall
+
+    def cpu_time(self):
+        if self.cpu_clock is None:
+            return None
+        try:
+            return time.clock_gettime(self.cpu_clock)
+        except OSError:
+            # The thread has exited
+            return None
+
+    def sample_loop(self):
+        last = self.started
+        last_cpu = self.cpu_time()
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            cpu = self.cpu_time()
+            if frame is None:
+                break
+            self.take_sample(frame, now - last,
+                             None if cpu is None or last_cpu is None else cpu - last_cpu)
+            last, last_cpu = now, cpu
+
+    def take_sample(self, frame, wall, cpu):
+        """Add `wall` seconds to the sampled stack, split into on- and off-CPU when `cpu` is known"""
+        wait = child_wait(frame)
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        codes.reverse()
+        if wait is not None:
+            depth, label = wait
+            # Drop the subprocess/pipe frames; the child's command is the leaf
+            stack = tuple(codes[self.base_depth:len(codes) - depth - 1])
+            self.add((stack, label), wall)
+        else:
+            stack = tuple(codes[self.base_depth:])
+            on_cpu = wall if cpu is None else min(max(cpu, 0.0), wall)
+            self.add((stack, None), on_cpu)
+            if wall - on_cpu > 0:
+                self.add((stack, OFF_CPU), wall - on_cpu)
+        self.samples += 1
+
+    def add(self, key, seconds):
+        self.stacks[key] = self.stacks.get(key, 0.0) + seconds
+
+    # --- reports -------------------------------------------------------------------
+
+    def collapsed_lines(self):
+        """'frame;frame;leaf microseconds' lines (Brendan Gregg's collapsed format)"""
+        folded = {}
+        for (stack, leaf), seconds in self.stacks.items():
+            frames = [frame_label(code) for code in stack]
+            if leaf is not None:
+                frames.append(leaf)
+            line = ";".join(frames) or '[root]'
+            folded[line] = folded.get(line, 0.0) + seconds
+        return [f"{line} {round(seconds * 1e6)}" for line, seconds in sorted(folded.items())
+                if round(seconds * 1e6) > 0]
+
+    def totals(self):
+        """Seconds per category, per child command, and self/total/off-CPU seconds per function"""
+        categories = {'python': 0.0, 'git': 0.0, 'off-cpu': 0.0}
+        children = {}
+        self_time = {}
+        total_time = {}
+        off_cpu = {}
+        for (stack, leaf), seconds in self.stacks.items():
+            for code in set(stack):
+                total_time[code] = total_time.get(code, 0.0) + seconds
+            innermost = stack[-1] if stack else None
+            if leaf is None:
+                categories['python'] += seconds
+                if innermost is not None:
+                    self_time[innermost] = self_time.get(innermost, 0.0) + seconds
+            elif leaf == OFF_CPU:
+                categories['off-cpu'] += seconds
+                if innermost is not None:
+                    off_cpu[innermost] = off_cpu.get(innermost, 0.0) + seconds
+            else:
+                categories['git'] += seconds
+                children[leaf[1:-1]] = children.get(leaf[1:-1], 0.0) + seconds
+        return categories, children, self_time, total_time, off_cpu
+
+    def summary_lines(self, top=TOP_FUNCTIONS):
+        """The top-N text summary"""
+        categories, children, self_time, total_time, off_cpu = self.totals()
+        wall = self.wall or sum(categories.values())
+
+        def share(seconds):
+            return f"{seconds:9.3f}s {seconds / wall * 100 if wall else 0:5.1f}%"
+
+        lines = [f"Profile: {wall:.3f}s wall, {self.samples} samples every {self.interval * 1000:g}ms",
+                 f"  Python on CPU     {share(categories['python'])}",
+                 f"  waiting on git    {share(categories['git'])}"]
+        if self.cpu_clock is not None:
+            lines.append(f"  other off-CPU     {share(categories['off-cpu'])}   (sleeps, disk, locks)")
+        else:
+            lines.append("  (no thread CPU clock here: off-CPU time outside git counts as Python)")
+        if children:
+            lines.append("Git child processes by time waited:")
+            for name, seconds in sorted(children.items(), key=lambda item: -item[1]):
+                lines.append(f"  {name:<22} {share(seconds)}")
+        lines.append(f"Top {top} functions by Python self time (total includes git waits below them):")
+        lines.append(f"  {'self':>10} {'%':>5}  {'total':>10} {'%':>5}  function")
+        for code, seconds in sorted(self_time.items(), key=lambda item: -item[1])[:top]:
+            lines.append(f"  {share(seconds)}  {share(total_time[code])}  {frame_label(code)}")
+        if off_cpu:
+            lines.append("Off-CPU outside git, by function:")
+            for code, seconds in sorted(off_cpu.items(), key=lambda item: -item[1])[:max(5, top // 5)]:
+                lines.append(f"  {share(seconds)}  {frame_label(code)}")
+        return lines
+
+    def save(self, prefix=None, top=TOP_FUNCTIONS):
+        """Write PREFIX.collapsed and PREFIX.txt; returns their paths"""
+        prefix = prefix or default_prefix()
+        directory = os.path.dirname(os.path.abspath(prefix))
+        os.makedirs(directory, exist_ok=True)
+        collapsed_path = prefix + '.collapsed'
+        summary_path = prefix + '.txt'
+        with open(collapsed_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(self.collapsed_lines()) + "\n")
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(self.summary_lines(top)) + "\n")
+        return collapsed_path, summary_path
+
+    def report(self, prefix=None, top=TOP_FUNCTIONS):
+        """Stop, save both files and log the summary"""
+        self.stop()
+        try:
+            collapsed_path, summary_path = self.save(prefix, top)
+        except OSError as e:
+            self.log(f"Could not write the profile: {e}")
+            collapsed_path = summary_path = None
+        for line in self.summary_lines(top):
+            self.log(line)
+        if collapsed_path:
+            self.log(f"Collapsed stacks (microseconds): {collapsed_path}")
+            self.log(f"  e.g. flamegraph.pl {collapsed_path} > profile.svg, or open it in speedscope")
+            self.log(f"Summary: {summary_path}")
+        return collapsed_path, summary_path
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Push policy shared by the CLI and GUI committers
+Decides when locally accumulated commits should be pushed.
+"""
+
+import time
+
+
+class PushPolicy:
+    """Push every N commits, every T seconds, or only at the end of a run
+
+    Both limits may be combined; whichever is reached first triggers a push.
+    With neither set, commits are pushed once at the end of the run.
+    """
+
+    def __init__(self, every_commits=0, every_seconds=0, clock=time.monotonic):
+        if every_commits < 0 or every_seconds < 0:
+            raise ValueError("Push cadence must not be negative")
+        self.every_commits = every_commits
+        self.every_seconds = every_seconds
+        self.clock = clock
+        self.pending = 0
+        self.pushed = 0
+        self.last_push = clock()
+
+    def start(self):
+        """Reset counters at the beginning of a run"""
+        self.pending = 0
+        self.pushed = 0
+        self.last_push = self.clock()
+
+    def record_commit(self):
+        """Count one new local commit"""
+        self.pending += 1
+
+    def should_push(self):
+        """Return True if the pending commits are due to be pushed now"""
+        if self.pending == 0:
+            return False
+        if self.every_commits and self.pending >= self.every_commits:
+            return True
+        if self.every_seconds and self.clock() - self.last_push >= self.every_seconds:
+            return True
+        return False
+
+    def record_push(self):
+        """Mark every pending commit as pushed"""
+        self.pushed += self.pending
+        self.pending = 0
+        self.last_push = self.clock()
+
+    def describe(self):
+        """Human-readable summary of the cadence"""
+        parts = []
+        if self.every_commits:
+            parts.append(f"every {self.every_commits} commit(s)")
+        if self.every_seconds:
+            parts.append(f"every {self.every_seconds:g}s")
+        if not parts:
+            return "at the end of the run"
+        return " or ".join(parts)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Push subsystem for the auto-committer
+Pushes with exponential-backoff retries, rebases the local commits onto the
+remote tip when the push is rejected as non-fast-forward, and splits very
+large backlogs into several smaller pushes.
+"""
+
+import random
+import time
+
+# Attempts per push after the first one, for errors that may go away (network, server busy)
+DEFAULT_RETRIES = 4
+# First retry waits about this long; every further retry doubles it, up to MAX_BACKOFF
+DEFAULT_BACKOFF = 2.0
+MAX_BACKOFF = 60.0
+# Backlogs longer than this many commits go out in several pushes of this size
+DEFAULT_CHUNK_COMMITS = 5000
+# Give up if the remote keeps moving while we rebase onto it
+MAX_REBASES = 3
+
+# Substrings of git's stderr that decide how a failed push is handled
+REJECTED_MARKERS = ('non-fast-forward', 'fetch first')
+FATAL_MARKERS = (
+    'authentication failed', 'permission denied', 'could not read username',
+    'repository not found', 'does not appear to be a git repository',
+    'remote rejected', 'pre-receive hook declined', 'protected branch',
+    'src refspec', 'invalid refspec',
+)
+
+
+class PushError(Exception):
+    """A push failed for good: retries ran out, or retrying cannot help"""
+
+
+def classify_failure(stderr):
+    """'rejected' (remote moved on), 'fatal' (retrying won't help) or 'transient'"""
+    text = (stderr or '').lower()
+    # Checked first: a hook that declines the push also prints '[remote rejected]'
+    if any(marker in text for marker in FATAL_MARKERS):
+        return 'fatal'
+    if '[rejected]' in text and any(marker in text for marker in REJECTED_MARKERS):
+        return 'rejected'
+    return 'transient'
+
+
+def error_line(stderr):
+    """The most telling line of git's error output (its first error, or its last line)"""
+    lines = [line.strip() for line in (stderr or '').splitlines() if line.strip()]
+    errors = [line for line in lines if line.startswith(('error:', 'fatal:'))]
+    return errors[0] if errors else (lines or ['no output'])[-1]
+
+
+class Pusher:
+    """Pushes the current branch (or a set of refs) for one repository
+
+    Failures are sorted by git's error output: a non-fast-forward rejection
+    fetches the remote branch and rebases the unpushed commits onto it, errors
+    such as bad credentials fail at once, and anything else is retried with
+    exponential backoff and jitter. `before_rebase` and `after_rebase` let
+    the caller hand HEAD, the index and the working tree to git around a rebase.
+    """
+
+    def __init__(self, backend, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                 max_backoff=MAX_BACKOFF, chunk_commits=DEFAULT_CHUNK_COMMITS, rebase=True,
+                 metrics=None, log=print, sleep=time.sleep,
+                 before_rebase=None, after_rebase=None):
+        if retries < 0 or backoff < 0 or chunk_commits < 0:
+            raise ValueError("Push retries, backoff and chunk size must not be negative")
+        self.backend = backend
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.chunk_commits = chunk_commits
+        self.rebase = rebase
+        self.metrics = metrics
+        self.log = log
+        self.sleep = sleep
+        self.before_rebase = before_rebase
+        self.after_rebase = after_rebase
+        # Remote tip the last rebase conflicted with; not retried until the remote moves again
+        self.conflict_tip = None
+
+    def count(self, counter):
+        if self.metrics is not None:
+            self.metrics.add(counter)
+
+    def backoff_delay(self, retry):
+        """Seconds to wait before retry number `retry` (0-based), with +/-50% jitter"""
+        delay = min(self.max_backoff, self.backoff * (2 ** retry))
+        return delay * random.uniform(0.5, 1.5)
+
+    def upstream(self):
+        """(remote, remote branch ref, remote-tracking ref) for the checked-out branch"""
+        branch = self.backend.query('symbolic-ref', '--short', '-q', 'HEAD')
+        if not branch:
+            raise PushError("HEAD is detached; there is no branch to push")
+        remote = self.backend.query('config', f"branch.{branch}.remote") or 'origin'
+        remote_ref = self.backend.query('config', f"branch.{branch}.merge") or f"refs/heads/{branch}"
+        tracking = f"refs/remotes/{remote}/{remote_ref[len('refs/heads/'):]}"
+        return remote, remote_ref, tracking
+
+    def run_push(self, remote, refspecs):
+        """One `git push` with retries for transient errors; returns None or 'rejected'"""
+        for retry in range(self.retries + 1):
+            self.count('pushes')
+            result = self.backend.run('push', '--porcelain', remote, *refspecs)
+            if result.returncode == 0:
+                return None
+            # --porcelain moves the per-ref status lines to stdout
+            output = f"{result.stderr}\n{result.stdout}"
+            kind = classify_failure(output)
+            if kind != 'transient':
+                if kind == 'fatal':
+                    raise PushError(error_line(result.stderr))
+                return kind
+            if retry == self.retries:
+                raise PushError(f"{error_line(result.stderr)} (gave up after {retry + 1} attempts)")
+            delay = self.backoff_delay(retry)
+            self.count('push_retries')
+            self.log(f"Push failed ({error_line(result.stderr)}); retrying in {delay:.1f}s "
+                     f"[{retry + 1}/{self.retries}]")
+            self.sleep(delay)
+
+    def chunk_tips(self, tracking):
+        """Commits to push one after another so each push carries at most chunk_commits commits"""
+        if not self.chunk_commits:
+            return ['HEAD']
+        unpushed = f"{tracking}..HEAD"
+        count = self.backend.query('rev-list', '--count', '--first-parent', unpushed)
+        # Without a known remote tip there is nothing to count from; push in one go
+        if count is None or int(count) <= self.chunk_commits:
+            return ['HEAD']
+        count = int(count)
+        commits = self.backend.query('rev-list', '--reverse', '--first-parent', unpushed).split()
+        tips = commits[self.chunk_commits - 1::self.chunk_commits]
+        if tips[-1] != commits[-1]:
+            tips.append(commits[-1])
+        self.log(f"Pushing {count} commits in {len(tips)} chunks of up to {self.chunk_commits}")
+        return tips
+
+    def rebase_onto_remote(self, remote, remote_ref, tracking):
+        """Fetch the remote branch and replay the unpushed commits on top of it"""
+        fetch = self.backend.run('fetch', '--quiet', remote, f"+{remote_ref}:{tracking}")
+        if fetch.returncode != 0:
+            raise PushError(f"Fetching {remote} failed: {error_line(fetch.stderr)}")
+        name = f"{remote}/{remote_ref[len('refs/heads/'):]}"
+        tip = self.backend.query('rev-parse', tracking)
+        if tip == self.conflict_tip:
+            raise PushError(f"The local commits still conflict with {name} ({tip[:7]}); "
+                            f"resolve it by hand or push again once the remote has changed")
+        self.count('push_rebases')
+        self.log(f"Remote {remote_ref} has moved on; rebasing the local commits onto it")
+        if self.before_rebase is not None:
+            self.before_rebase()
+        try:
+            result = self.backend.run('rebase', '--autostash', '--quiet', tracking)
+            if result.returncode != 0:
+                self.backend.run('rebase', '--abort')
+                self.conflict_tip = tip
+                raise PushError(f"Rebase onto {name} failed "
+                                f"({error_line(result.stderr or result.stdout)}); "
+                                f"the local commits were left as they were")
+        finally:
+            if self.after_rebase is not None:
+                self.after_rebase()
+
+    def push(self):
+        """Push the checked-out branch to its upstream; raises PushError on failure"""
+        remote, remote_ref, tracking = self.upstream()
+        rebases = 0
+        while True:
+            for tip in self.chunk_tips(tracking):
+                if self.run_push(remote, [f"{tip}:{remote_ref}"]) is not None:
+                    break
+            else:
+                return
+            if not self.rebase:
+                raise PushError(f"{remote}/{remote_ref[len('refs/heads/'):]} has commits that are "
+                                f"not here (non-fast-forward)")
+            if rebases == MAX_REBASES:
+                raise PushError(f"Still rejected after {rebases} rebases; the remote keeps moving")
+            self.rebase_onto_remote(remote, remote_ref, tracking)
+            rebases += 1
+
+    def push_refs(self, refs, remote=None):
+        """Push several refs to the same names in one `git push` (no rebasing)"""
+        if remote is None:
+            remote = self.upstream()[0]
+        if self.run_push(remote, [f"{ref}:{ref}" for ref in refs]) is not None:
+            raise PushError(f"{remote} rejected the push as non-fast-forward")
+        return remote
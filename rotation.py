@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Rotation for changes.txt
+Rolls the change file into monthly archives under changes/ (by line count,
+size or month) or trims it to a ring of the newest lines, so the file every
+commit rewrites and diffs stays small.
+"""
+
+import os
+import re
+from collections import deque
+from datetime import datetime
+
+ROTATION_KINDS = ('lines', 'bytes', 'monthly', 'ring')
+
+ARCHIVE_DIR = 'changes'
+SIZE_SUFFIXES = {'': 1, 'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30}
+CHANGE_TIMESTAMP = re.compile(rb'Change #\d+: (\d{4})-(\d{2})-\d{2} ')
+
+# How much of the end of the file to read when looking for the newest line
+TAIL_BYTES = 4096
+
+
+def parse_size(text):
+    """Parse a byte count such as 4096, 512K or 2M"""
+    match = re.fullmatch(r'(\d+)\s*([kmg]?)b?', text.strip().lower())
+    if not match:
+        raise ValueError(f"Invalid size: {text}")
+    return int(match.group(1)) * SIZE_SUFFIXES[match.group(2)]
+
+
+def count_lines(path):
+    """Count lines in a file without holding it in memory"""
+    lines = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            lines += chunk.count(b"\n")
+    # The change file has no trailing newline, so the last line is not counted above
+    return lines + 1 if os.path.getsize(path) else 0
+
+
+def newest_month(path):
+    """(year, month) of the newest `Change #` line, falling back to the file's mtime"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.seek(max(0, size - TAIL_BYTES))
+        tail = f.read()
+    matches = CHANGE_TIMESTAMP.findall(tail)
+    if matches:
+        year, month = matches[-1]
+        return int(year), int(month)
+    modified = datetime.fromtimestamp(os.path.getmtime(path))
+    return modified.year, modified.month
+
+
+class RotationPolicy:
+    """When and how to roll changes.txt over; checked once at the start of a cycle
+
+      lines:N    archive the file once it has N lines
+      bytes:N    archive the file once it is N bytes (K/M/G suffixes allowed)
+      monthly    archive the file when a new month starts
+      ring:N     keep only the newest N lines in the file
+
+    Archives go to changes/YYYY-MM.txt (appended to if the month already has one).
+    """
+
+    def __init__(self, kind, limit=0, archive_dir=ARCHIVE_DIR):
+        if kind not in ROTATION_KINDS:
+            raise ValueError(f"Unknown rotation policy: {kind}")
+        if kind != 'monthly' and limit < 1:
+            raise ValueError(f"Rotation policy '{kind}' needs a positive limit")
+        self.kind = kind
+        self.limit = limit
+        self.archive_dir = archive_dir
+
+    @classmethod
+    def parse(cls, text):
+        """Build a policy from 'lines:N', 'bytes:SIZE', 'monthly' or 'ring:N'"""
+        kind, _, value = text.partition(':')
+        kind = kind.strip().lower()
+        if kind == 'monthly':
+            return cls(kind)
+        if not value:
+            raise ValueError(f"Rotation policy '{kind}' needs a limit, e.g. {kind}:1000")
+        limit = parse_size(value) if kind == 'bytes' else int(value)
+        return cls(kind, limit)
+
+    def describe(self):
+        """Human-readable summary of the policy"""
+        if self.kind == 'monthly':
+            return "archive monthly"
+        if self.kind == 'ring':
+            return f"keep the newest {self.limit} lines"
+        return f"archive at {self.limit} {self.kind}"
+
+    def archive_path(self, year, month):
+        """Repository-relative archive path for a month"""
+        return f"{self.archive_dir}/{year:04d}-{month:02d}.txt"
+
+    def due(self, path, now=None):
+        """Return True if the file at `path` should be rotated now"""
+        if not os.path.exists(path) or not os.path.getsize(path):
+            return False
+        if self.kind == 'bytes':
+            return os.path.getsize(path) >= self.limit
+        if self.kind == 'monthly':
+            now = now or datetime.now()
+            return newest_month(path) != (now.year, now.month)
+        lines = count_lines(path)
+        if self.kind == 'ring':
+            return lines > self.limit
+        return lines >= self.limit
+
+    def apply(self, repo_dir, path, initial_content, now=None):
+        """Rotate the file; returns (changed repository paths, commit message)"""
+        now = now or datetime.now()
+        target = os.path.relpath(path, repo_dir).replace(os.sep, '/')
+
+        if self.kind == 'ring':
+            with open(path, 'rb') as f:
+                newest = deque((line.rstrip(b"\r\n") for line in f), maxlen=self.limit)
+            with open(path, 'wb') as f:
+                f.write(b"\n".join(newest))
+            return [target], f"Trim {target} to the newest {self.limit} lines"
+
+        year, month = newest_month(path) if self.kind == 'monthly' else (now.year, now.month)
+        archive = self.archive_path(year, month)
+        archive_file = os.path.join(repo_dir, archive)
+        os.makedirs(os.path.dirname(archive_file), exist_ok=True)
+
+        with open(path, 'rb') as f:
+            content = f.read().strip()
+        with open(archive_file, 'ab') as f:
+            if f.tell():
+                f.write(b"\n")
+            f.write(content)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(initial_content)
+        return [target, archive], f"Rotate {target} into {archive}"
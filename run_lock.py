@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Repository run lock for the auto-committer
+Lets one cycle at a time work on a repository, whichever front end starts it
+(CLI, schedulers, GUI, daemon). A second requester waits for the lock, or
+merges its commit count into the running cycle, instead of colliding with it
+on .git/index.lock. Locks left behind by dead or hung processes are broken.
+"""
+
+import json
+import os
+import secrets
+import socket
+import sys
+import time
+
+from object_writer import find_git_dir
+
+LOCK_NAME = 'autocommit-run.lock'
+# Commit counts merged into the running cycle, one JSON line per request
+MERGE_NAME = 'autocommit-run.merge'
+
+BUSY_POLICIES = ('wait', 'merge', 'skip')
+
+POLL_INTERVAL = 0.5
+# The holder touches the lock as it makes progress; a lock this quiet is treated as hung
+STALE_AFTER = 30 * 60
+HEARTBEAT_INTERVAL = 10
+
+
+class RunLockError(Exception):
+    """The run lock was not taken: busy with the skip policy, timed out or cancelled"""
+
+
+def pid_alive(pid):
+    """True if a process with this id exists on this machine"""
+    if sys.platform == 'win32':
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        # PROCESS_QUERY_LIMITED_INFORMATION; os.kill would terminate the process on Windows
+        handle = kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        return code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def describe_holder(info):
+    if not info:
+        return "an unknown process"
+    age = time.time() - info.get('started', time.time())
+    return (f"{info.get('owner', '?')} (pid {info.get('pid', '?')} on {info.get('host', '?')}, "
+            f"{info.get('commits', '?')} commits, running for {age:.0f}s)")
+
+
+class RunLock:
+    """The run lock of one repository (one per working tree, next to the index)
+
+    The lock file is created with O_EXCL and holds who owns it. It is broken
+    when its process is gone (same host) or when the holder has not shown
+    progress for `stale_after` seconds. Holders that accept merges pick up
+    requests from the merge file with take_merged().
+    """
+
+    def __init__(self, repo_dir, owner=None, stale_after=STALE_AFTER,
+                 poll_interval=POLL_INTERVAL, sleep=time.sleep, log=print):
+        git_dir = find_git_dir(repo_dir)
+        self.path = os.path.join(git_dir, LOCK_NAME)
+        self.merge_path = os.path.join(git_dir, MERGE_NAME)
+        self.owner = owner or os.path.basename(sys.argv[0]) or 'python'
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+        self.sleep = sleep
+        self.log = log
+        self.record = None
+        self.last_heartbeat = 0.0
+        self.wait_seconds = 0.0
+
+    @property
+    def held(self):
+        return self.record is not None
+
+    def holder(self):
+        """The lock's record, {} if it cannot be read, or None if the lock is free"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # Torn write or unreadable; its age decides whether it is stale
+            return {}
+
+    def stale_reason(self, info):
+        """Why the current lock can be broken, or None if its holder looks alive"""
+        try:
+            age = time.time() - os.path.getmtime(self.path)
+        except FileNotFoundError:
+            return None
+        if info.get('host') == socket.gethostname() and info.get('pid') and not pid_alive(info['pid']):
+            return f"process {info['pid']} is gone"
+        if age > self.stale_after:
+            return f"no progress for {age:.0f}s"
+        return None
+
+    def try_acquire(self, commits, merges=True):
+        """Take the lock if it is free or stale; returns True when held"""
+        for _ in range(2):
+            record = {'pid': os.getpid(), 'host': socket.gethostname(), 'owner': self.owner,
+                      'commits': commits, 'merges': merges, 'started': round(time.time(), 3)}
+            try:
+                fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            except FileExistsError:
+                info = self.holder()
+                if info is None:
+                    # Released in the meantime
+                    continue
+                reason = self.stale_reason(info)
+                if reason is None:
+                    return False
+                self.break_stale(info, reason)
+                continue
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(record, f)
+            self.record = record
+            self.last_heartbeat = time.monotonic()
+            return True
+        return False
+
+    def break_stale(self, info, reason):
+        """Move the lock judged stale out of the way, never a lock a faster waiter has just taken
+
+        Checking the holder and then deleting the file would race with another
+        waiter breaking the same lock and creating its own. The lock is renamed
+        to a name only this process uses instead, and what was moved is checked
+        afterwards; a live lock moved by mistake is linked back in place.
+        """
+        tombstone = f"{self.path}.stale-{os.getpid()}-{secrets.token_hex(4)}"
+        try:
+            os.rename(self.path, tombstone)
+        except FileNotFoundError:
+            # Broken or released by someone else already
+            return
+        try:
+            with open(tombstone, 'r', encoding='utf-8') as f:
+                moved = json.load(f)
+        except (OSError, ValueError):
+            moved = {}
+        if moved != info:
+            try:
+                # Unlike rename, link never replaces a lock created in the meantime
+                os.link(tombstone, self.path)
+            except OSError as e:
+                self.log(f"Could not put back the run lock of {describe_holder(moved)}: {e}")
+            os.remove(tombstone)
+            return
+        self.log(f"Breaking stale run lock of {describe_holder(info)}: {reason}")
+        os.remove(tombstone)
+
+    def acquire(self, commits, on_busy='wait', timeout=None, merges=True, cancelled=None):
+        """Take the lock, waiting for it as long as `on_busy` says
+
+        Returns True once held, or False when the commits were merged into the
+        running cycle instead. Raises RunLockError for the skip policy, on
+        timeout, or when `cancelled()` turns true while waiting.
+        """
+        if on_busy not in BUSY_POLICIES:
+            raise ValueError(f"Unknown busy policy: {on_busy} (choose from {', '.join(BUSY_POLICIES)})")
+        start = time.perf_counter()
+        announced = False
+        while not self.try_acquire(commits, merges):
+            info = self.holder() or {}
+            if on_busy == 'skip':
+                raise RunLockError(f"Repository is busy with {describe_holder(info)}")
+            if on_busy == 'merge' and info.get('merges'):
+                self.request_merge(commits)
+                self.log(f"Merged {commits} commits into the cycle of {describe_holder(info)}")
+                return False
+            if not announced:
+                self.log(f"Waiting for the run lock held by {describe_holder(info)}")
+                announced = True
+            waited = time.perf_counter() - start
+            if timeout and waited >= timeout:
+                raise RunLockError(f"Gave up after waiting {waited:.0f}s for {describe_holder(info)}")
+            if cancelled is not None and cancelled():
+                raise RunLockError("Stopped while waiting for the run lock")
+            self.sleep(self.poll_interval)
+        self.wait_seconds = time.perf_counter() - start
+        if announced:
+            self.log(f"Got the run lock after {self.wait_seconds:.1f}s")
+        return True
+
+    def request_merge(self, commits):
+        """Ask the running cycle (or the next one) to make `commits` more commits"""
+        line = json.dumps({'commits': commits, 'owner': self.owner, 'pid': os.getpid(),
+                           'time': round(time.time(), 3)}) + "\n"
+        fd = os.open(self.merge_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, line.encode('utf-8'))
+        finally:
+            os.close(fd)
+
+    def take_merged(self):
+        """Claim every merged request; returns the total number of commits asked for"""
+        claimed = f"{self.merge_path}.{os.getpid()}"
+        try:
+            os.replace(self.merge_path, claimed)
+        except FileNotFoundError:
+            return 0
+        total = 0
+        with open(claimed, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    total += max(0, int(json.loads(line)['commits']))
+                except (ValueError, KeyError, TypeError):
+                    continue
+        os.remove(claimed)
+        return total
+
+    def heartbeat(self):
+        """Show progress by touching the lock (at most every HEARTBEAT_INTERVAL seconds)"""
+        now = time.monotonic()
+        if self.record is None or now - self.last_heartbeat < HEARTBEAT_INTERVAL:
+            return
+        self.last_heartbeat = now
+        try:
+            os.utime(self.path)
+        except FileNotFoundError:
+            pass
+
+    def release(self):
+        """Give the lock up, unless it was broken and taken over meanwhile"""
+        if self.record is None:
+            return
+        info = self.holder()
+        if info and info.get('pid') == self.record['pid'] and info.get('started') == self.record['started']:
+            os.remove(self.path)
+        self.record = None
@@ -9,15 +9,16 @@ import subprocess
 import sys
 
 def run_command(command, cwd=None):
-    """Run a command and return success status"""
+    """Run a command (argument list, no shell) and return success status"""
+    display = subprocess.list2cmdline(command)
     try:
-        result = subprocess.run(command, shell=True, cwd=cwd, check=True, 
+        result = subprocess.run(command, cwd=cwd, check=True, 
                               capture_output=True, text=True)
-        print(f"✅ {command}")
+        print(f"✅ {display}")
         return True
-    except subprocess.CalledProcessError as e:
-        print(f"❌ {command}")
-        print(f"Error: {e.stderr}")
+    except (subprocess.CalledProcessError, OSError) as e:
+        print(f"❌ {display}")
+        print(f"Error: {getattr(e, 'stderr', None) or e}")
         return False
 
 def main():
@@ -27,21 +28,21 @@ def main():
     
     # Install dependencies
     print("\n📦 Installing dependencies...")
-    if not run_command("pip install -r requirements.txt", cwd=script_dir):
+    if not run_command([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"], cwd=script_dir):
         print("Failed to install dependencies")
         return False
     
     # Initialize git repository if not exists
     print("\n🔧 Setting up Git repository...")
     if not os.path.exists(os.path.join(script_dir, '.git')):
-        if not run_command("git init", cwd=script_dir):
+        if not run_command(["git", "init"], cwd=script_dir):
             return False
         
         # Add initial files
-        if not run_command("git add .", cwd=script_dir):
+        if not run_command(["git", "add", "."], cwd=script_dir):
             return False
         
-        if not run_command('git commit -m "Initial commit - Auto-Committer setup"', cwd=script_dir):
+        if not run_command(["git", "commit", "-m", "Initial commit - Auto-Committer setup"], cwd=script_dir):
             return False
         
         print("\n🔗 To connect to GitHub:")
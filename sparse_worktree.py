@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Sparse worktree for the auto-committer
+Creates (once) and reuses a dedicated linked worktree of the host repository
+that checks out only the directories of the target files, with a sparse
+index. Cycles commit there on their own local branch and push it to the
+remote branch, so a commit costs the same in a huge monorepo as in a small
+repository, and the developer's checkout, index and branch are never touched.
+"""
+
+import os
+
+from git_backend import GitBackend
+
+# Worktrees live in the host's git directory, where no status or `git add .` of the host looks
+WORKTREE_DIR = 'autocommit-worktrees'
+# Local branch the worktree commits on, e.g. autocommit/main for origin/main
+BRANCH_PREFIX = 'autocommit/'
+
+
+class WorktreeError(Exception):
+    """The sparse worktree could not be created or brought up to date"""
+
+
+class SparseWorktree:
+    """A sparse, cone-mode worktree of one remote branch, sharing the host's objects
+
+    The worktree's index holds the root files, the cone directories and one
+    collapsed entry per other directory (index.sparse), so staging and
+    committing never scan the rest of the tree. Objects are shared with the
+    host, so nothing is cloned or fetched beyond the remote branch itself;
+    that is also why it is not made shallow (a shallow fetch would mark the
+    host repository shallow too).
+    """
+
+    def __init__(self, host_dir, dirs=(), remote_branch=None, log=print):
+        self.host = GitBackend(os.path.abspath(host_dir))
+        # Repository directories to check out besides the root files
+        self.dirs = sorted({d.strip('/') for d in dirs if d.strip('/')})
+        self.remote_branch = remote_branch
+        self.log = log
+        self.remote = None
+        self.remote_ref = None
+        self.branch = None
+        self.path = None
+
+    @staticmethod
+    def dirs_for(paths, extra=()):
+        """Cone directories that hold the given repository paths (root files are always there)"""
+        dirs = {os.path.dirname(path.replace(os.sep, '/')) for path in paths}
+        return sorted((dirs | set(extra)) - {''})
+
+    def describe(self):
+        cone = ', '.join(self.dirs) or 'root files only'
+        return f"{self.path} (branch {self.branch} -> {self.remote}/{self.remote_ref[len('refs/heads/'):]}, cone: {cone})"
+
+    def git(self, *args, cwd=None):
+        backend = self.host if cwd is None else GitBackend(cwd)
+        result = backend.run(*args)
+        if result.returncode != 0:
+            message = (result.stderr or result.stdout or '').strip().splitlines()
+            raise WorktreeError(f"git {args[0]} failed: {message[-1] if message else 'no output'}")
+        return result.stdout.strip()
+
+    def resolve_upstream(self):
+        """Remote and remote branch to push to: the given one, or the host branch's upstream"""
+        head = self.host.query('symbolic-ref', '--short', '-q', 'HEAD')
+        self.remote = (head and self.host.query('config', f"branch.{head}.remote")) or 'origin'
+        if self.remote_branch:
+            name = self.remote_branch
+            if name.startswith('refs/heads/'):
+                name = name[len('refs/heads/'):]
+            self.remote_ref = f"refs/heads/{name}"
+        elif head:
+            self.remote_ref = self.host.query('config', f"branch.{head}.merge") or f"refs/heads/{head}"
+        else:
+            raise WorktreeError("The host repository's HEAD is detached; name the branch to push to")
+        name = self.remote_ref[len('refs/heads/'):]
+        self.branch = BRANCH_PREFIX + name
+        common_dir = os.path.join(self.host.repo_dir, self.git('rev-parse', '--git-common-dir'))
+        self.path = os.path.normpath(os.path.join(common_dir, WORKTREE_DIR, name.replace('/', '-')))
+
+    def pin_remote_urls(self):
+        """Make relative remote URLs resolve from the host checkout inside the worktree too
+
+        Git resolves a relative URL such as ../remote.git against the
+        checkout it runs in, which for the worktree is a directory inside the
+        host's .git. A url.<absolute>.insteadOf rewrite in the worktree's own
+        config points it back, without changing the remote for the host.
+        """
+        top = self.git('rev-parse', '--show-toplevel')
+        for key in ('url', 'pushurl'):
+            urls = self.host.query('config', '--get-all', f"remote.{self.remote}.{key}") or ''
+            for url in urls.splitlines():
+                if '://' in url or os.path.isabs(url) or ':' in url.split('/')[0]:
+                    continue
+                absolute = os.path.normpath(os.path.join(top, url))
+                self.git('config', '--worktree', f"url.{absolute}.insteadOf", url, cwd=self.path)
+
+    def registered(self):
+        """True if git knows the worktree; a registration whose directory is gone is pruned"""
+        listing = self.git('worktree', 'list', '--porcelain')
+        paths = [line[len('worktree '):] for line in listing.splitlines() if line.startswith('worktree ')]
+        if not any(os.path.realpath(path) == os.path.realpath(self.path) for path in paths):
+            return False
+        if os.path.exists(os.path.join(self.path, '.git')):
+            return True
+        self.git('worktree', 'prune')
+        return False
+
+    def base_commit(self):
+        """Where a new worktree branch starts: the remote branch, fetched if there is no copy yet"""
+        name = self.remote_ref[len('refs/heads/'):]
+        tracking = f"refs/remotes/{self.remote}/{name}"
+        if self.host.query('rev-parse', '--verify', '-q', tracking) is None:
+            self.log(f"Fetching {self.remote}/{name} for the sparse worktree")
+            self.host.run('fetch', '--quiet', self.remote, f"+{self.remote_ref}:{tracking}")
+        for ref in (tracking, f"refs/heads/{name}"):
+            commit = self.host.query('rev-parse', '--verify', '-q', f"{ref}^{{commit}}")
+            if commit:
+                return commit
+        raise WorktreeError(f"Branch {name} was found neither on {self.remote} nor locally")
+
+    def create(self):
+        """Add the worktree without a checkout, restrict it to the cone, then check that out"""
+        if self.host.query('rev-parse', '--verify', '-q', f"refs/heads/{self.branch}"):
+            # Kept from an earlier worktree; it may still hold unpushed commits
+            self.git('worktree', 'add', '--no-checkout', self.path, self.branch)
+        else:
+            self.git('worktree', 'add', '--no-checkout', '-b', self.branch, self.path, self.base_commit())
+        self.git('config', f"branch.{self.branch}.remote", self.remote)
+        self.git('config', f"branch.{self.branch}.merge", self.remote_ref)
+        self.git('sparse-checkout', 'set', '--cone', '--sparse-index', *self.dirs, cwd=self.path)
+        # sparse-checkout has switched the repository to per-worktree config
+        self.pin_remote_urls()
+        self.git('read-tree', '-mu', 'HEAD', cwd=self.path)
+        self.log(f"Created sparse worktree {self.describe()}")
+
+    def prepare(self):
+        """Create the worktree or reuse the existing one; returns its path"""
+        self.resolve_upstream()
+        if not self.registered():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.create()
+            return self.path
+        current = self.git('sparse-checkout', 'list', cwd=self.path).split()
+        if sorted(current) != self.dirs:
+            # Different target files than last time; widening or narrowing updates the checkout
+            self.git('sparse-checkout', 'set', '--cone', '--sparse-index', *self.dirs, cwd=self.path)
+        # The remote may have been re-pointed since the worktree was created
+        self.pin_remote_urls()
+        self.log(f"Using sparse worktree {self.describe()}")
+        return self.path
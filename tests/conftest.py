@@ -0,0 +1,10 @@
+"""
+Test setup
+The modules live at the repository root, next to this directory.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
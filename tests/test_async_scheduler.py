@@ -0,0 +1,64 @@
+"""
+Tests for the asyncio scheduler
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+
+from conftest import ROOT
+
+# A cycle that takes a moment and reports whether it was allowed to finish
+CYCLE = textwrap.dedent("""
+    import time
+    print("cycle started", flush=True)
+    time.sleep(1.5)
+    print("cycle finished", flush=True)
+""")
+
+# A scheduler that starts one cycle right away and otherwise waits for a signal
+SCHEDULER = textwrap.dedent("""
+    import asyncio, sys
+    from async_scheduler import AsyncScheduler
+
+    async def main():
+        scheduler = AsyncScheduler([sys.executable, '-c', sys.argv[1]], ['0 0 1 1 *'])
+        asyncio.get_running_loop().call_soon(scheduler.trigger, 'test')
+        await scheduler.run()
+
+    asyncio.run(main())
+""")
+
+
+@pytest.mark.skipif(not hasattr(os, 'killpg'), reason="needs POSIX process groups")
+def test_ctrl_c_lets_running_cycle_finish():
+    """SIGINT to the terminal's process group stops the scheduler, not the cycle it runs"""
+    scheduler = subprocess.Popen([sys.executable, '-c', SCHEDULER, CYCLE], cwd=ROOT,
+                                 stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                 start_new_session=True)
+    try:
+        lines = []
+        deadline = time.monotonic() + 20
+        while not any('cycle started' in line for line in lines):
+            assert time.monotonic() < deadline, "".join(lines)
+            line = scheduler.stdout.readline()
+            assert line, "".join(lines)
+            lines.append(line)
+        # What a Ctrl+C in the terminal does: signal the whole foreground group
+        os.killpg(scheduler.pid, signal.SIGINT)
+        output, _ = scheduler.communicate(timeout=20)
+    finally:
+        if scheduler.poll() is None:
+            scheduler.kill()
+    output = "".join(lines) + output
+
+    assert scheduler.returncode == 0, output
+    assert "Shutdown requested" in output
+    assert "[run 1] cycle finished" in output
+    assert "[run 1] finished with exit code 0" in output
+    assert "Traceback" not in output
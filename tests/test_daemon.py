@@ -0,0 +1,40 @@
+"""
+Tests for the daemon's control API
+"""
+
+import pytest
+
+from daemon import CommitDaemon, DaemonServer
+from daemon_client import DaemonClient, DaemonError
+
+
+@pytest.fixture
+def client():
+    daemon = CommitDaemon()
+    server = DaemonServer(daemon).start()
+    try:
+        yield DaemonClient(server.url, server.token)
+    finally:
+        daemon.shutdown()
+        server.stop()
+
+
+@pytest.mark.parametrize('body, message', [
+    ({'repo': 5}, "repo must be a string"),
+    ({'repo': '.', 'engine': ['pack']}, "engine must be a string"),
+    ({'repo': '.', 'fsync': 1}, "fsync must be a string"),
+    ({'repo': '.', 'files': ['a.txt']}, "files must be a string or null"),
+    ({'repo': '.', 'content': {}}, "content must be a string or null"),
+])
+def test_start_rejects_options_of_the_wrong_type(client, body, message):
+    with pytest.raises(DaemonError, match=message):
+        client.request('POST', '/runs', body)
+
+
+def test_unexpected_error_is_a_json_500(client, monkeypatch):
+    def broken(*args, **kwargs):
+        raise KeyError('runs')
+
+    monkeypatch.setattr(CommitDaemon, 'status', broken)
+    with pytest.raises(DaemonError, match="Internal error"):
+        client.status()
@@ -0,0 +1,80 @@
+"""
+Tests for pushing from AutoCommitter to a FakeRemote through MemoryBackend
+"""
+
+import pytest
+
+from auto_committer import AutoCommitter
+from memory_backend import FATAL_PUSH_ERROR, TRANSIENT_PUSH_ERROR, FakeRemote, MemoryBackend
+from push_policy import PushPolicy
+
+BRANCH = 'refs/heads/main'
+
+
+@pytest.fixture
+def remote():
+    return FakeRemote()
+
+
+@pytest.fixture
+def backend(remote):
+    return MemoryBackend(files={'changes.txt': "change me 100 times."}, remote=remote)
+
+
+def run_cycle(backend, commits=3):
+    """One cycle of `commits` commits, pushed once at the end; returns the committer and its log"""
+    messages = []
+    committer = AutoCommitter(engine='subprocess', backend=backend, max_commits=commits,
+                              push_policy=PushPolicy(), log_callback=messages.append, resume=False)
+    committer.pusher.sleep = lambda seconds: None
+    assert committer.run_commit_cycle() == commits
+    return committer, messages
+
+
+def test_push_lands_on_remote(backend, remote):
+    committer, _ = run_cycle(backend)
+    assert committer.last_push_ok
+    assert remote.refs[BRANCH] == backend.head
+    assert remote.commit_count() == 4
+
+
+def test_transient_push_errors_are_retried(backend, remote):
+    backend.fail('push', times=2, stderr=TRANSIENT_PUSH_ERROR)
+    committer, messages = run_cycle(backend)
+    assert committer.last_push_ok
+    assert remote.refs[BRANCH] == backend.head
+    assert sum('retrying in' in message for message in messages) == 2
+
+
+def test_fatal_push_error_is_not_retried(backend, remote):
+    backend.fail('push', times=1, stderr=FATAL_PUSH_ERROR)
+    committer, messages = run_cycle(backend)
+    assert not committer.last_push_ok
+    assert remote.commit_count() == 1
+    assert not any('retrying in' in message for message in messages)
+
+
+def test_non_fast_forward_push_rebases_onto_remote(backend, remote):
+    remote.advance(BRANCH, 'other.txt', "from another clone")
+    committer, messages = run_cycle(backend)
+    assert committer.last_push_ok
+    assert any('rebasing the local commits' in message for message in messages)
+    assert remote.refs[BRANCH] == backend.head
+    assert remote.commit_count() == 5
+    assert backend.read_file('other.txt') == "from another clone"
+    # The local commits were replayed on top of the remote one
+    assert backend.commit_messages()[3] == "Commit from another clone"
+
+
+def test_rebase_conflict_leaves_local_commits(backend, remote):
+    remote_tip = remote.advance(BRANCH, 'changes.txt', "edited in another clone")
+    before = backend.head
+    committer, messages = run_cycle(backend)
+    assert not committer.last_push_ok
+    assert any('Rebase onto origin/main failed' in message for message in messages)
+    assert remote.refs[BRANCH] == remote_tip
+    # The three local commits still sit on the initial commit, not on the remote one
+    history = backend.commit_messages()
+    assert len(history) == 4 and history[-1] == "Initial commit"
+    assert backend.commit_messages(before) == history[-1:]
+    assert "edited in another clone" not in backend.read_file('changes.txt')
@@ -0,0 +1,62 @@
+"""
+Tests for the repository run lock
+"""
+
+import json
+import os
+import socket
+import subprocess
+import time
+
+import pytest
+
+from run_lock import RunLock
+
+
+def dead_pid():
+    """The id of a process that has exited"""
+    process = subprocess.Popen(['git', '--version'], stdout=subprocess.DEVNULL)
+    process.wait()
+    return process.pid
+
+
+@pytest.fixture
+def repo(tmp_path):
+    subprocess.run(['git', 'init', '-q', str(tmp_path)], check=True)
+    return str(tmp_path)
+
+
+def write_lock(lock, pid, started):
+    record = {'pid': pid, 'host': socket.gethostname(), 'owner': 'test',
+              'commits': 1, 'merges': True, 'started': started}
+    with open(lock.path, 'w', encoding='utf-8') as f:
+        json.dump(record, f)
+    return record
+
+
+def test_stale_lock_is_broken(repo):
+    lock = RunLock(repo, log=lambda message: None)
+    write_lock(lock, dead_pid(), 1.0)
+    assert lock.try_acquire(1)
+    assert lock.holder()['pid'] == os.getpid()
+    assert os.listdir(os.path.dirname(lock.path)).count(os.path.basename(lock.path)) == 1
+    lock.release()
+    assert lock.holder() is None
+
+
+def test_lock_taken_by_faster_waiter_is_not_broken(repo, monkeypatch):
+    """Another waiter breaks the stale lock and takes it between our check and our break"""
+    lock = RunLock(repo, log=lambda message: None)
+    write_lock(lock, dead_pid(), 1.0)
+    judge = RunLock.stale_reason
+
+    def stale_then_replaced(self, info):
+        reason = judge(self, info)
+        write_lock(self, os.getppid(), time.time())
+        return reason
+
+    monkeypatch.setattr(RunLock, 'stale_reason', stale_then_replaced)
+    assert not lock.try_acquire(1)
+    assert lock.holder()['pid'] == os.getppid()
+    leftovers = [name for name in os.listdir(os.path.dirname(lock.path)) if '.stale-' in name]
+    assert leftovers == []
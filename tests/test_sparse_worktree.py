@@ -0,0 +1,71 @@
+"""
+Tests for cycles in the sparse worktree
+"""
+
+import hashlib
+import os
+import subprocess
+
+import pytest
+
+from auto_committer import AutoCommitter, prepare_sparse_worktree
+from content_generators import parse_generator
+
+FILES = 'logs/a.txt,logs/b.txt'
+
+
+def git(cwd, *args):
+    return subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True,
+                          text=True).stdout.strip()
+
+
+def make_host(tmp_path, url):
+    """A repository with a directory outside the cone, tracking `url` (relative to it or not)"""
+    remote = tmp_path / 'remote.git'
+    host = tmp_path / 'host'
+    git(tmp_path, 'init', '-q', '--bare', '-b', 'main', str(remote))
+    git(tmp_path, 'init', '-q', '-b', 'main', str(host))
+    git(host, 'config', 'user.name', 'Test')
+    git(host, 'config', 'user.email', 'test@example.invalid')
+    for name in ('big/one.txt', 'big/two.txt', 'logs/a.txt', 'changes.txt'):
+        os.makedirs(host / os.path.dirname(name), exist_ok=True)
+        (host / name).write_text(f"{name}\n")
+    git(host, 'add', '.')
+    git(host, 'commit', '-q', '-m', 'Initial commit')
+    git(host, 'remote', 'add', 'origin', url(remote))
+    git(host, 'push', '-q', '-u', 'origin', 'main')
+    return str(host), str(remote)
+
+
+def index_digest(host):
+    with open(os.path.join(host, '.git', 'index'), 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+@pytest.mark.parametrize('url', [str, lambda remote: '../remote.git'], ids=['absolute', 'relative'])
+def test_cycle_in_sparse_worktree(tmp_path, url):
+    host, remote = make_host(tmp_path, url)
+    head, index = git(host, 'rev-parse', 'HEAD'), index_digest(host)
+    generator = parse_generator(files=FILES)
+
+    # What --sparse-worktree does before running the cycle
+    worktree = prepare_sparse_worktree(host, generator, log=lambda message: None)
+    committer = AutoCommitter(repo_dir=worktree, generator=generator, max_commits=3,
+                              log_callback=lambda message: None, resume=False)
+    assert committer.run_commit_cycle() == 3
+    assert committer.last_push_ok
+
+    # The main checkout is left alone
+    assert git(host, 'rev-parse', 'HEAD') == head
+    assert index_digest(host) == index
+    assert git(host, 'status', '--porcelain') == ''
+    assert git(host, 'config', '--get-all', 'remote.origin.url') == url(remote)
+
+    # The worktree is a cone-mode checkout of the target directory only
+    assert git(worktree, 'config', 'core.sparseCheckoutCone') == 'true'
+    assert git(worktree, 'sparse-checkout', 'list').split() == ['logs']
+    assert not os.path.exists(os.path.join(worktree, 'big'))
+
+    # The commits landed on the upstream branch
+    assert git(remote, 'rev-parse', 'refs/heads/main') == git(worktree, 'rev-parse', 'HEAD')
+    assert git(remote, 'rev-list', '--count', 'refs/heads/main') == '4'
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Backdated commit timelines
+Spreads commits over a date range with per-day counts, weekday weights and
+random jitter, so months of history can be generated in one pass.
+"""
+
+import random
+from datetime import date, datetime, time as day_time, timedelta
+
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+# Each month of a timeline gets its own file so no blob grows without bound
+TIMELINE_PATH = 'changes/{:%Y-%m}.txt'
+
+
+def parse_date(text):
+    """Parse YYYY-MM-DD"""
+    try:
+        return datetime.strptime(text, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"Invalid date (expected YYYY-MM-DD): {text}")
+
+
+def parse_range(text, low=0):
+    """Parse 'N' or 'MIN-MAX' into a (min, max) tuple"""
+    parts = text.split('-', 1)
+    try:
+        first, last = int(parts[0]), int(parts[-1])
+    except ValueError:
+        raise ValueError(f"Invalid range: {text}")
+    if first < low or last < first:
+        raise ValueError(f"Invalid range: {text}")
+    return first, last
+
+
+def parse_weights(text):
+    """Parse weekday weights: seven numbers (Mon..Sun) or 'sat=0.3,sun=0' overrides"""
+    weights = [1.0] * 7
+    if '=' in text:
+        for item in text.split(','):
+            name, value = item.split('=', 1)
+            name = name.strip().lower()[:3]
+            if name not in WEEKDAYS:
+                raise ValueError(f"Unknown weekday: {name}")
+            weights[WEEKDAYS.index(name)] = float(value)
+    else:
+        values = [float(v) for v in text.split(',')]
+        if len(values) != 7:
+            raise ValueError("Weekday weights need 7 values (Mon..Sun)")
+        weights = values
+    if any(w < 0 for w in weights):
+        raise ValueError("Weekday weights cannot be negative")
+    return weights
+
+
+def day_count(rng, per_day, weight, jitter):
+    """Number of commits for one day: a base count scaled by weight and jitter"""
+    expected = rng.randint(*per_day) * weight
+    if jitter:
+        expected *= 1 + rng.uniform(-jitter, jitter)
+    # Round randomly so fractional weights still produce the right average
+    whole = int(expected)
+    return whole + (rng.random() < expected - whole)
+
+
+def generate_timeline(start, end, per_day=(1, 5), weekday_weights=None, jitter=0.0,
+                      hours=(9, 18), seed=None):
+    """Return sorted commit timestamps (epoch seconds) for every day from start to end
+
+    Each day gets a base count drawn from `per_day`, scaled by its weekday
+    weight and by up to +/- `jitter` (a fraction), at random seconds between
+    `hours[0]`:00 and `hours[1]`:00 local time.
+    """
+    if end < start:
+        raise ValueError("Timeline end is before its start")
+    if not 0 <= hours[0] < hours[1] <= 24:
+        raise ValueError(f"Invalid hour window: {hours[0]}-{hours[1]}")
+    if not 0 <= jitter <= 1:
+        raise ValueError("Jitter must be between 0 and 1")
+    weights = weekday_weights or [1.0] * 7
+    rng = random.Random(seed)
+
+    timestamps = []
+    day = start
+    while day <= end:
+        count = day_count(rng, per_day, weights[day.weekday()], jitter)
+        if count:
+            opening = datetime.combine(day, day_time()) + timedelta(hours=hours[0])
+            first = int(opening.timestamp())
+            last = int((opening + timedelta(hours=hours[1] - hours[0])).timestamp()) - 1
+            timestamps.extend(sorted(rng.randint(first, last) for _ in range(count)))
+        day += timedelta(days=1)
+    return timestamps
+
+
+def timeline_path(when):
+    """Repository path of the file a commit at `when` appends to"""
+    return TIMELINE_PATH.format(datetime.fromtimestamp(when))
+
+
+def describe(timestamps):
+    """One-line summary of a generated timeline"""
+    if not timestamps:
+        return "empty timeline"
+    first = datetime.fromtimestamp(timestamps[0])
+    last = datetime.fromtimestamp(timestamps[-1])
+    days = len({date.fromtimestamp(t) for t in timestamps})
+    return (f"{len(timestamps)} commits on {days} days "
+            f"from {first:%Y-%m-%d %H:%M} to {last:%Y-%m-%d %H:%M}")